@@ -1 +1 @@
-from ..core.auth import get_db, get_current_user 
\ No newline at end of file
+from ..core.auth import get_db, get_current_user, get_optional_user 
\ No newline at end of file
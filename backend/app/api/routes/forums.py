@@ -7,6 +7,7 @@ from datetime import datetime
 
 from ...db.models import ForumCategory, ForumThread, ForumReply, ForumVote, User, Problem
 from ..deps import get_db, get_current_user
+from ...utils.counter_buffer import counter_buffer
 
 router = APIRouter()
 
@@ -206,9 +207,8 @@ def get_thread(
     if not thread:
         raise HTTPException(status_code=404, detail="Thread not found")
     
-    # Increment view count
-    thread.view_count += 1
-    db.commit()
+    # Increment view count (buffered and written in batches)
+    counter_buffer.increment(ForumThread, thread.id, "view_count")
     
     # Get replies with pagination
     offset = (page - 1) * limit
@@ -260,7 +260,7 @@ def get_thread(
         "content": thread.content,
         "is_pinned": thread.is_pinned,
         "is_locked": thread.is_locked,
-        "view_count": thread.view_count,
+        "view_count": (thread.view_count or 0) + counter_buffer.pending(ForumThread, thread.id, "view_count"),
         "reply_count": thread.reply_count,
         "created_at": thread.created_at,
         "updated_at": thread.updated_at,
@@ -5,6 +5,7 @@ from typing import List
 from ...db import models, schemas
 from ...api import deps
 from ...utils.level_calculator import calculate_level
+from ...utils.friends_leaderboard import friends_leaderboard_cache, get_friends_leaderboard as get_friends_leaderboard_rows
 
 router = APIRouter()
 
@@ -173,6 +174,7 @@ def accept_friend_request(
     
     friendship.status = "accepted"
     db.commit()
+    friends_leaderboard_cache.invalidate_users([friendship.requester_id, friendship.addressee_id])
     
     return {"message": "Friend request accepted", "friendship_id": friendship.id}
 
@@ -286,6 +288,7 @@ def remove_friend(
     
     db.delete(friendship)
     db.commit()
+    friends_leaderboard_cache.invalidate_users([user.id, friend_id])
     
     return {"message": "Friend removed successfully"}
 
@@ -296,66 +299,12 @@ def get_friends_leaderboard(
 ):
     """Get leaderboard of friends sorted by XP."""
     try:
-        print(f"Getting leaderboard for user: {user.username} (ID: {user.id})")
-        # Get all friends
-        friendships = db.query(models.Friendship).filter(
-            or_(
-                models.Friendship.requester_id == user.id,
-                models.Friendship.addressee_id == user.id
-            ),
-            models.Friendship.status == "accepted"
-        ).all()
-        print(f"Found {len(friendships)} friendships for leaderboard")
-    except Exception as e:
-        print(f"Leaderboard query error: {e}")
-        import traceback
-        traceback.print_exc()
-        # Return just the current user if friendship table doesn't exist
-        friendships = []
-    
-    try:
-        # Collect friend IDs and include current user
-        friend_ids = [user.id]  # Include current user in leaderboard
-        for friendship in friendships:
-            friend_id = friendship.addressee_id if friendship.requester_id == user.id else friendship.requester_id
-            friend_ids.append(friend_id)
-        
-        # Get users with their stats
-        leaderboard = []
-        for friend_id in friend_ids:
-            friend = db.query(models.User).filter(models.User.id == friend_id).first()
-            if friend:
-                # Count problems solved
-                problems_solved = db.query(models.Submission.problem_id).filter(
-                    models.Submission.user_id == friend.id,
-                    models.Submission.overall_status == "pass"
-                ).distinct().count()
-                
-                level, title = calculate_level(friend.total_xp or 0)
-                leaderboard.append({
-                    "id": friend.id,
-                    "username": friend.username,
-                    "total_xp": friend.total_xp or 0,
-                    "problems_solved": problems_solved,
-                    "level": level,
-                    "title": title
-                })
-        
-        # Sort by XP descending
-        leaderboard.sort(key=lambda x: x["total_xp"], reverse=True)
-        
-        # Add ranks
+        # One aggregated query, cached per user (see utils/friends_leaderboard.py)
+        leaderboard = get_friends_leaderboard_rows(db, user.id)
         result = []
-        for i, entry in enumerate(leaderboard):
-            result.append({
-                "rank": i + 1,
-                "id": entry["id"],
-                "username": entry["username"],
-                "total_xp": entry["total_xp"],
-                "problems_solved": entry["problems_solved"],
-                "level": entry["level"],
-                "title": entry["title"]
-            })
+        for entry in leaderboard:
+            level, title = calculate_level(entry["total_xp"])
+            result.append({**entry, "level": level, "title": title})
         
         print(f"Returning leaderboard with {len(result)} entries")
         return result
@@ -2,151 +2,145 @@
 Global leaderboards API routes.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.orm import Session, joinedload
 from typing import List, Optional
 import logging
 
 from ...core.auth import get_db, get_current_user
-from ...db.models import User, LeaderboardEntry, Friendship
+from ...db.models import User, LeaderboardEntry
 from ...schemas import LeaderboardEntry as LeaderboardEntrySchema
-from ...utils.leaderboard_updater import (
-    update_global_leaderboard,
-    update_weekly_leaderboard, 
-    update_monthly_leaderboard,
-    update_all_leaderboards,
-    calculate_level,
-    get_problems_solved_count
-)
+from ...utils.leaderboard_updater import calculate_level, get_problems_solved_counts
+from ...utils.leaderboard_cache import leaderboard_cache
+from ...utils.friends_leaderboard import get_friends_leaderboard as get_friends_leaderboard_rows
+from ...utils.leaderboard_scheduler import leaderboard_scheduler
+from ...utils.rank_index import rank_index
+from ...utils.xp_rollup import CALENDAR_PERIODS, rolling_window, calendar_window, period_xp_query
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+def _board_page(leaderboard_type: str, after_rank: int, limit: int, db: Session) -> List[dict]:
+    """Read one page of a board: entries ranked after ``after_rank``, with their users joined in."""
+    # Ranks are contiguous, so seeking past a rank is the same page as an offset without scanning it
+    entries = db.query(LeaderboardEntry).options(joinedload(LeaderboardEntry.user)).filter(
+        LeaderboardEntry.leaderboard_type == leaderboard_type,
+        LeaderboardEntry.rank > after_rank
+    ).order_by(LeaderboardEntry.rank).limit(limit).all()
+    
+    # If no entries exist, have the scheduler build the board instead of doing it on this request
+    if not entries and after_rank == 0:
+        logger.info(f"No {leaderboard_type} leaderboard entries found, scheduling a refresh...")
+        leaderboard_scheduler.trigger([leaderboard_type])
+    
+    problems_solved = get_problems_solved_counts(db, [entry.user_id for entry in entries])
+    result = []
+    for entry in entries:
+        user = entry.user
+        level, title = calculate_level(user.total_xp)
+        result.append({
+            "rank": entry.rank,
+            "id": user.id,
+            "username": user.username,
+            # Global shows total XP, weekly/monthly the XP for the period
+            "total_xp": user.total_xp if leaderboard_type == "global" else entry.score,
+            "problems_solved": problems_solved[user.id],
+            "level": level,
+            "title": title
+        })
+    return result
+
+def _cached_board_response(leaderboard_type: str, request: Request, after_rank: Optional[int], offset: int,
+                           limit: int, db: Session) -> Response:
+    """Serve a board page from the cache, answering 304 when the client's ETag still matches."""
+    after_rank = after_rank if after_rank is not None else offset
+    cached = leaderboard_cache.get(leaderboard_type, after_rank, limit)
+    if cached is None:
+        version = leaderboard_cache.version(leaderboard_type)
+        cached = leaderboard_cache.put(leaderboard_type, version, after_rank, limit, _board_page(leaderboard_type, after_rank, limit, db))
+    body, etag = cached
+    
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 @router.get("/global", response_model=List[LeaderboardEntrySchema])
 def get_global_leaderboard(
+    request: Request,
     limit: int = Query(50, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    after_rank: Optional[int] = Query(None, ge=0),
     db: Session = Depends(get_db)
 ):
-    """Get the global leaderboard based on total XP."""
+    """Get the global leaderboard based on total XP. Pass after_rank (the last rank seen) to page."""
     try:
-        # Get leaderboard entries
-        entries = db.query(LeaderboardEntry).filter(
-            LeaderboardEntry.leaderboard_type == "global"
-        ).order_by(LeaderboardEntry.rank).offset(offset).limit(limit).all()
-        
-        # If no entries exist, update the leaderboard first
-        if not entries:
-            logger.info("No global leaderboard entries found, updating...")
-            update_result = update_global_leaderboard(db)
-            if update_result["success"]:
-                entries = db.query(LeaderboardEntry).filter(
-                    LeaderboardEntry.leaderboard_type == "global"
-                ).order_by(LeaderboardEntry.rank).offset(offset).limit(limit).all()
-        
-        # Convert to response format
-        result = []
-        for entry in entries:
-            user = entry.user
-            level, title = calculate_level(user.total_xp)
-            problems_solved = get_problems_solved_count(db, user.id)
-            
-            result.append(LeaderboardEntrySchema(
-                rank=entry.rank,
-                id=user.id,
-                username=user.username,
-                total_xp=user.total_xp,
-                problems_solved=problems_solved,
-                level=level,
-                title=title
-            ))
-        
-        return result
-        
+        return _cached_board_response("global", request, after_rank, offset, limit, db)
     except Exception as e:
         logger.error(f"Error getting global leaderboard: {e}")
         raise HTTPException(status_code=500, detail="Failed to get global leaderboard")
 
 @router.get("/weekly", response_model=List[LeaderboardEntrySchema])
 def get_weekly_leaderboard(
+    request: Request,
     limit: int = Query(50, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    after_rank: Optional[int] = Query(None, ge=0),
     db: Session = Depends(get_db)
 ):
     """Get the weekly leaderboard based on XP gained in the last 7 days."""
     try:
-        # Get leaderboard entries
-        entries = db.query(LeaderboardEntry).filter(
-            LeaderboardEntry.leaderboard_type == "weekly"
-        ).order_by(LeaderboardEntry.rank).offset(offset).limit(limit).all()
-        
-        # If no entries exist, update the leaderboard first
-        if not entries:
-            logger.info("No weekly leaderboard entries found, updating...")
-            update_result = update_weekly_leaderboard(db)
-            if update_result["success"]:
-                entries = db.query(LeaderboardEntry).filter(
-                    LeaderboardEntry.leaderboard_type == "weekly"
-                ).order_by(LeaderboardEntry.rank).offset(offset).limit(limit).all()
-        
-        # Convert to response format
-        result = []
-        for entry in entries:
-            user = entry.user
-            level, title = calculate_level(user.total_xp)
-            problems_solved = get_problems_solved_count(db, user.id)
-            
-            result.append(LeaderboardEntrySchema(
-                rank=entry.rank,
-                id=user.id,
-                username=user.username,
-                total_xp=entry.score,  # Weekly XP for this leaderboard
-                problems_solved=problems_solved,
-                level=level,
-                title=title
-            ))
-        
-        return result
-        
+        return _cached_board_response("weekly", request, after_rank, offset, limit, db)
     except Exception as e:
         logger.error(f"Error getting weekly leaderboard: {e}")
         raise HTTPException(status_code=500, detail="Failed to get weekly leaderboard")
 
 @router.get("/monthly", response_model=List[LeaderboardEntrySchema])
 def get_monthly_leaderboard(
+    request: Request,
     limit: int = Query(50, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    after_rank: Optional[int] = Query(None, ge=0),
     db: Session = Depends(get_db)
 ):
     """Get the monthly leaderboard based on XP gained in the last 30 days."""
     try:
-        # Get leaderboard entries
-        entries = db.query(LeaderboardEntry).filter(
-            LeaderboardEntry.leaderboard_type == "monthly"
-        ).order_by(LeaderboardEntry.rank).offset(offset).limit(limit).all()
-        
-        # If no entries exist, update the leaderboard first
-        if not entries:
-            logger.info("No monthly leaderboard entries found, updating...")
-            update_result = update_monthly_leaderboard(db)
-            if update_result["success"]:
-                entries = db.query(LeaderboardEntry).filter(
-                    LeaderboardEntry.leaderboard_type == "monthly"
-                ).order_by(LeaderboardEntry.rank).offset(offset).limit(limit).all()
+        return _cached_board_response("monthly", request, after_rank, offset, limit, db)
+    except Exception as e:
+        logger.error(f"Error getting monthly leaderboard: {e}")
+        raise HTTPException(status_code=500, detail="Failed to get monthly leaderboard")
+
+@router.get("/period", response_model=List[LeaderboardEntrySchema])
+def get_period_leaderboard(
+    days: Optional[int] = Query(None, ge=1, le=365),
+    calendar: Optional[str] = Query(None),
+    limit: int = Query(50, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db)
+):
+    """Get a leaderboard of XP gained in the last N days or the current calendar week/month."""
+    if (days is None) == (calendar is None):
+        raise HTTPException(status_code=400, detail="Pass exactly one of days or calendar")
+    if calendar is not None and calendar not in CALENDAR_PERIODS:
+        raise HTTPException(status_code=400, detail="calendar must be 'week' or 'month'")
+    
+    try:
+        # Computed on the fly from the daily XP rollup, at most one row per user per day
+        start_day, end_day = rolling_window(days) if days is not None else calendar_window(calendar)
+        rows = period_xp_query(db, start_day, end_day).offset(offset).limit(limit).all()
+        users = {user.id: user for user in db.query(User).filter(User.id.in_([user_id for user_id, _ in rows])).all()}
+        problems_solved = get_problems_solved_counts(db, list(users))
         
-        # Convert to response format
         result = []
-        for entry in entries:
-            user = entry.user
-            level, title = calculate_level(user.total_xp)
-            problems_solved = get_problems_solved_count(db, user.id)
-            
+        for rank, (user_id, xp) in enumerate(rows, offset + 1):
+            user = users[user_id]
+            level, title = calculate_level(user.total_xp or 0)
             result.append(LeaderboardEntrySchema(
-                rank=entry.rank,
+                rank=rank,
                 id=user.id,
                 username=user.username,
-                total_xp=entry.score,  # Monthly XP for this leaderboard
-                problems_solved=problems_solved,
+                total_xp=int(xp),  # XP for this period
+                problems_solved=problems_solved[user.id],
                 level=level,
                 title=title
             ))
@@ -154,8 +148,8 @@ def get_monthly_leaderboard(
         return result
         
     except Exception as e:
-        logger.error(f"Error getting monthly leaderboard: {e}")
-        raise HTTPException(status_code=500, detail="Failed to get monthly leaderboard")
+        logger.error(f"Error getting period leaderboard: {e}")
+        raise HTTPException(status_code=500, detail="Failed to get period leaderboard")
 
 @router.get("/friends", response_model=List[LeaderboardEntrySchema])
 def get_friends_leaderboard(
@@ -164,54 +158,10 @@ def get_friends_leaderboard(
 ):
     """Get leaderboard of friends sorted by total XP."""
     try:
-        # Get all friends
-        friendships = db.query(Friendship).filter(
-            (
-                (Friendship.requester_id == current_user.id) |
-                (Friendship.addressee_id == current_user.id)
-            ) &
-            (Friendship.status == "accepted")
-        ).all()
-        
-        # Collect friend IDs and include current user
-        friend_ids = [current_user.id]  # Include current user in leaderboard
-        
-        for friendship in friendships:
-            friend_id = friendship.addressee_id if friendship.requester_id == current_user.id else friendship.requester_id
-            friend_ids.append(friend_id)
-        
-        # Get users with their stats
-        users = db.query(User).filter(User.id.in_(friend_ids)).all()
-        
-        leaderboard = []
-        for user in users:
-            level, title = calculate_level(user.total_xp or 0)
-            problems_solved = get_problems_solved_count(db, user.id)
-            
-            leaderboard.append({
-                "id": user.id,
-                "username": user.username,
-                "total_xp": user.total_xp or 0,
-                "problems_solved": problems_solved,
-                "level": level,
-                "title": title
-            })
-        
-        # Sort by XP descending
-        leaderboard.sort(key=lambda x: x["total_xp"], reverse=True)
-        
-        # Add ranks and convert to schema
         result = []
-        for i, entry in enumerate(leaderboard):
-            result.append(LeaderboardEntrySchema(
-                rank=i + 1,
-                id=entry["id"],
-                username=entry["username"],
-                total_xp=entry["total_xp"],
-                problems_solved=entry["problems_solved"],
-                level=entry["level"],
-                title=entry["title"]
-            ))
+        for entry in get_friends_leaderboard_rows(db, current_user.id):
+            level, title = calculate_level(entry["total_xp"])
+            result.append(LeaderboardEntrySchema(**entry, level=level, title=title))
         
         return result
         
@@ -235,8 +185,11 @@ def get_user_rank(
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
-        # Get rank from cached value or leaderboard entry
-        if leaderboard_type == "global":
+        # The in-memory index is current between rebuilds; fall back to the
+        # cached value or leaderboard entry if it hasn't been loaded
+        if rank_index.is_loaded(leaderboard_type):
+            rank = rank_index.rank_of(leaderboard_type, user_id)
+        elif leaderboard_type == "global":
             rank = user.global_rank
         elif leaderboard_type == "weekly":
             rank = user.weekly_rank
@@ -244,7 +197,7 @@ def get_user_rank(
             rank = user.monthly_rank
         
         # If no cached rank, try to get from leaderboard entry
-        if rank is None:
+        if rank is None and not rank_index.is_loaded(leaderboard_type):
             entry = db.query(LeaderboardEntry).filter(
                 LeaderboardEntry.user_id == user_id,
                 LeaderboardEntry.leaderboard_type == leaderboard_type
@@ -266,32 +219,60 @@ def get_user_rank(
         logger.error(f"Error getting user rank: {e}")
         raise HTTPException(status_code=500, detail="Failed to get user rank")
 
+@router.get("/{leaderboard_type}/around/{user_id}", response_model=List[LeaderboardEntrySchema])
+def get_leaderboard_around_user(
+    leaderboard_type: str,
+    user_id: int,
+    radius: int = Query(5, ge=0, le=50),
+    db: Session = Depends(get_db)
+):
+    """Get the users ranked just above and below a user."""
+    if leaderboard_type not in ["global", "weekly", "monthly"]:
+        raise HTTPException(status_code=400, detail="Invalid leaderboard type")
+    if not rank_index.is_loaded(leaderboard_type):
+        rank_index.load(db, leaderboard_type)
+
+    try:
+        neighbours = rank_index.around(leaderboard_type, user_id, radius)
+        users = {user.id: user for user in db.query(User).filter(User.id.in_([uid for _, uid, _ in neighbours])).all()}
+        problems_solved = get_problems_solved_counts(db, list(users))
+
+        result = []
+        for rank, uid, score in neighbours:
+            user = users.get(uid)
+            if user is None:
+                continue
+            level, title = calculate_level(user.total_xp or 0)
+            result.append(LeaderboardEntrySchema(
+                rank=rank,
+                id=user.id,
+                username=user.username,
+                total_xp=score,
+                problems_solved=problems_solved[user.id],
+                level=level,
+                title=title
+            ))
+
+        return result
+
+    except Exception as e:
+        logger.error(f"Error getting leaderboard around user: {e}")
+        raise HTTPException(status_code=500, detail="Failed to get leaderboard around user")
+
 @router.post("/refresh")
-def refresh_leaderboards(
+async def refresh_leaderboards(
     leaderboard_type: Optional[str] = Query(None),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user)
 ):
-    """Refresh leaderboard rankings (admin only)."""
+    """Refresh leaderboard rankings (admin only). Joins any refresh already pending."""
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Admin access required")
+    if leaderboard_type not in (None, "global", "weekly", "monthly"):
+        raise HTTPException(status_code=400, detail="Invalid leaderboard type")
     
     try:
-        if leaderboard_type == "global":
-            result = update_global_leaderboard(db)
-        elif leaderboard_type == "weekly":
-            result = update_weekly_leaderboard(db)
-        elif leaderboard_type == "monthly":
-            result = update_monthly_leaderboard(db)
-        elif leaderboard_type is None:
-            result = update_all_leaderboards(db)
-        else:
-            raise HTTPException(status_code=400, detail="Invalid leaderboard type")
+        return await leaderboard_scheduler.refresh([leaderboard_type] if leaderboard_type else None)
         
-        return result
-        
-    except HTTPException:
-        raise
     except Exception as e:
         logger.error(f"Error refreshing leaderboards: {e}")
         raise HTTPException(status_code=500, detail="Failed to refresh leaderboards")
@@ -334,7 +315,9 @@ def get_leaderboard_stats(db: Session = Depends(get_db)):
             "monthly": {
                 "count": monthly_count,
                 "last_updated": last_updates["monthly"]
-            }
+            },
+            "scheduler": leaderboard_scheduler.stats(),
+            "cache": leaderboard_cache.stats()
         }
         
     except Exception as e:
@@ -9,6 +9,9 @@ from ...utils.problem_tracker import (
     get_trending_problems,
     get_problem_stats
 )
+from ...code_runner.result_cache import execution_cache, test_set_digest
+from ...code_runner.case_bundle import store_test_bundle
+from ...utils.user_stats import get_solved_problem_ids
 
 router = APIRouter()
 
@@ -56,7 +59,7 @@ def calculate_acceptance_rates(problems: list, db: Session) -> dict:
         return {problem.id: 0.0 for problem in problems}
 
 @router.get("/", response_model=list[schemas.ProblemOut])
-def list_problems(db: Session = Depends(deps.get_db)):
+def list_problems(db: Session = Depends(deps.get_db), user=Depends(deps.get_optional_user)):
     problems = db.query(models.Problem).options(joinedload(models.Problem.test_cases)).all()
     
     try:
@@ -68,6 +71,12 @@ def list_problems(db: Session = Depends(deps.get_db)):
         for problem in problems:
             problem.acceptance_rate = 0.0
     
+    if user is not None:
+        # Solved badges: one lookup in user_problem_status for the whole list
+        solved_ids = get_solved_problem_ids(db, user.id)
+        for problem in problems:
+            problem.solved = problem.id in solved_ids
+    
     return problems
 
 @router.get("/{problem_id}", response_model=schemas.ProblemOut)
@@ -109,6 +118,8 @@ def create_problem(problem: schemas.ProblemCreate, db: Session = Depends(deps.ge
         for tc in problem.test_cases:
             test_case = models.TestCase(input=tc.input, output=tc.output, problem_id=new_problem.id)
             db.add(test_case)
+        # Precompile the test cases once instead of parsing them on every run
+        store_test_bundle(db, new_problem.id, [{'input': tc.input, 'output': tc.output} for tc in problem.test_cases])
         db.commit()
     db.refresh(new_problem)
     return new_problem 
@@ -117,7 +128,7 @@ def create_problem(problem: schemas.ProblemCreate, db: Session = Depends(deps.ge
 def update_problem(problem_id: int, problem: schemas.ProblemCreate, db: Session = Depends(deps.get_db), user=Depends(deps.get_current_user)):
     if not getattr(user, 'is_admin', False):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
-    db_problem = db.query(models.Problem).filter(models.Problem.id == problem_id).first()
+    db_problem = db.query(models.Problem).options(joinedload(models.Problem.test_cases)).filter(models.Problem.id == problem_id).first()
     if not db_problem:
         raise HTTPException(status_code=404, detail="Problem not found")
     db_problem.title = problem.title
@@ -126,6 +137,14 @@ def update_problem(problem_id: int, problem: schemas.ProblemCreate, db: Session
     db_problem.sample_input = problem.sample_input
     db_problem.sample_output = problem.sample_output
     db_problem.reference_solution = problem.reference_solution
+    if problem.test_cases is not None:
+        # Replace the test cases and drop cached runs against the old set
+        # (sample runs only use the first test case, so that set is cached separately)
+        old_test_cases = [{'input': tc.input, 'output': tc.output} for tc in db_problem.test_cases]
+        db_problem.test_cases = [models.TestCase(input=tc.input, output=tc.output) for tc in problem.test_cases]
+        execution_cache.invalidate_test_set(test_set_digest(old_test_cases))
+        execution_cache.invalidate_test_set(test_set_digest(old_test_cases[:1]))
+        store_test_bundle(db, db_problem.id, [{'input': tc.input, 'output': tc.output} for tc in problem.test_cases])
     db.commit()
     db.refresh(db_problem)
     return db_problem 
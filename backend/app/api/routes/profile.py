@@ -5,6 +5,7 @@ from ...db import models
 from ...schemas import UserOut, UserPreferencesUpdate, UserProfileOut
 from ...core import auth
 from ...utils.level_calculator import calculate_level, get_level_progress
+from ...utils.user_stats import get_user_stats as get_stats_row
 
 router = APIRouter()
 
@@ -67,27 +68,13 @@ def get_user_submissions(user=Depends(deps.get_current_user), db: Session = Depe
 
 @router.get("/stats/", response_model=dict)
 def get_user_stats(user=Depends(deps.get_current_user), db: Session = Depends(deps.get_db)):
-    total_submissions = db.query(models.Submission).filter(models.Submission.user_id == user.id).count()
-    problems_solved = db.query(models.Submission.problem_id).filter(models.Submission.user_id == user.id, models.Submission.overall_status == "pass").distinct().count()
-    
-    # Calculate XP breakdown by difficulty
-    easy_solved = db.query(models.Submission.problem_id).join(models.Problem).filter(
-        models.Submission.user_id == user.id,
-        models.Submission.overall_status == "pass",
-        models.Problem.difficulty == "easy"
-    ).distinct().count()
-    
-    medium_solved = db.query(models.Submission.problem_id).join(models.Problem).filter(
-        models.Submission.user_id == user.id,
-        models.Submission.overall_status == "pass",
-        models.Problem.difficulty == "medium"
-    ).distinct().count()
-    
-    hard_solved = db.query(models.Submission.problem_id).join(models.Problem).filter(
-        models.Submission.user_id == user.id,
-        models.Submission.overall_status == "pass",
-        models.Problem.difficulty == "hard"
-    ).distinct().count()
+    # Counters are kept in user_stats as submissions are stored
+    stats = get_stats_row(db, user.id)
+    total_submissions = stats.total_submissions
+    problems_solved = stats.problems_solved
+    easy_solved = stats.easy_solved
+    medium_solved = stats.medium_solved
+    hard_solved = stats.hard_solved
     
     # Get streak information (with graceful error handling)
     current_streak = 0
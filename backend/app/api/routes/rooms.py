@@ -11,6 +11,22 @@ router = APIRouter()
 def generate_room_code(length=6):
     return ''.join(random.choices(string.ascii_uppercase + string.digits, k=length))
 
+async def _stream_test_cases(executor, code, test_case_data, channel, event_data, bundle=None):
+    """
+    Run test cases and emit a test_case_result event to ``channel`` (a room code or
+    a socket sid) as each one finishes. Nothing is emitted when channel is None.
+    Returns the run_all_test_cases summary.
+    """
+    summary = None
+    async for event in executor.stream_all_test_cases(code, test_case_data, function_name='solution', bundle=bundle):
+        if event['event'] == 'summary':
+            summary = event['summary']
+        elif channel:
+            await sio.emit("test_case_result", dict(
+                event_data, index=event['index'], total=event['total'], result=event['result']
+            ), room=channel)
+    return summary
+
 @router.post("/", response_model=schemas.RoomOut)
 async def create_room(room: schemas.RoomCreate, db: Session = Depends(deps.get_db), user=Depends(deps.get_current_user)):
     code = generate_room_code()
@@ -106,6 +122,8 @@ async def execute_code_in_room(room_code: str, data: dict = Body(...), db: Sessi
         raise HTTPException(status_code=403, detail="Access denied")
     
     from ...code_runner.executor import CodeExecutor
+    from ...code_runner.result_cache import execution_cache
+    from ...code_runner.case_bundle import get_test_bundle
     from ...db.models import Problem
     problem = db.query(Problem).filter(Problem.id == room.problem_id).first()
     if not problem:
@@ -116,14 +134,17 @@ async def execute_code_in_room(room_code: str, data: dict = Body(...), db: Sessi
     sample_only = data.get("sample_only", True)
     share_run_output = data.get("share_run_output", False)
     simple_run = data.get("simple_run", False)  # New parameter for simple execution
+    # Per-test-case results go to the whole room when sharing, otherwise to the caller's socket if given
+    stream_channel = room_code if share_run_output else data.get("sid")
+    stream_data = {"room": room_code, "user_id": user.id, "username": user.username, "sample_only": sample_only}
     
     try:
-        executor = CodeExecutor(timeout=5, memory_limit_mb=128)
+        executor = CodeExecutor(timeout=5, memory_limit_mb=128, parallel=True, cache=execution_cache)
         
         # Simple run mode - just execute the code to see print output
         if simple_run:
             input_data = problem.sample_input if problem.sample_input else ""
-            execution_result = executor.execute_python_code(code, input_data)
+            execution_result = await executor.execute_python_code_async(code, input_data)
             result = {
                 "simple_execution": True,
                 "success": execution_result["success"],
@@ -138,7 +159,7 @@ async def execute_code_in_room(room_code: str, data: dict = Body(...), db: Sessi
                     'input': problem.sample_input,
                     'output': problem.sample_output
                 }]
-                execution_results = executor.run_all_test_cases(code, test_case_data, function_name='solution')
+                execution_results = await _stream_test_cases(executor, code, test_case_data, stream_channel, stream_data)
                 result = execution_results
             else:
                 test_cases = problem.test_cases
@@ -148,7 +169,8 @@ async def execute_code_in_room(room_code: str, data: dict = Body(...), db: Sessi
                         'input': tc.input,
                         'output': tc.output
                     })
-                execution_results = executor.run_all_test_cases(code, test_case_data, function_name='solution')
+                test_bundle = get_test_bundle(db, problem.id, test_case_data) if test_case_data else None
+                execution_results = await _stream_test_cases(executor, code, test_case_data, stream_channel, stream_data, test_bundle)
                 result = execution_results
         
         # Emit run output to all users if share_run_output is true
@@ -172,14 +194,17 @@ async def submit_code_in_room(room_code: str, data: dict = Body(...), db: Sessio
     if user not in room.participants:
         raise HTTPException(status_code=403, detail="Access denied")
     from ...code_runner.executor import CodeExecutor
+    from ...code_runner.result_cache import execution_cache
+    from ...code_runner.case_bundle import get_test_bundle
     from ...db.models import Problem, Submission
+    from ...utils.user_stats import record_submission_stats
     problem = db.query(Problem).filter(Problem.id == room.problem_id).first()
     if not problem:
         raise HTTPException(status_code=404, detail="Problem not found")
     code = data.get("code", "")
     language = data.get("language", "python")
     try:
-        executor = CodeExecutor(timeout=5, memory_limit_mb=128)
+        executor = CodeExecutor(timeout=5, memory_limit_mb=128, parallel=True, cache=execution_cache)
         test_cases = problem.test_cases
         test_case_data = []
         for tc in test_cases:
@@ -187,10 +212,17 @@ async def submit_code_in_room(room_code: str, data: dict = Body(...), db: Sessio
                 'input': tc.input,
                 'output': tc.output
             })
-        execution_results = executor.run_all_test_cases(code, test_case_data, function_name='solution')
+        test_bundle = get_test_bundle(db, problem.id, test_case_data) if test_case_data else None
+        # Room members see each test case result as it finishes
+        execution_results = await _stream_test_cases(
+            executor, code, test_case_data, room_code,
+            {"room": room_code, "user_id": user.id, "username": user.username, "submission": True},
+            test_bundle
+        )
         results = execution_results.get('test_case_results', [])
         total_time = execution_results.get('total_execution_time', 0)
         overall_status = execution_results.get('overall_status', 'fail')
+        record_submission_stats(db, user.id, problem, overall_status, runtime=total_time)
         submission = Submission(
             user_id=user.id,
             problem_id=room.problem_id,
@@ -200,6 +232,7 @@ async def submit_code_in_room(room_code: str, data: dict = Body(...), db: Sessio
             runtime=f"{total_time:.3f}s",  # Legacy field
             test_case_results=results,
             execution_time=total_time,
+            memory_usage=execution_results.get('peak_memory_usage'),
             overall_status=overall_status
         )
         db.add(submission)
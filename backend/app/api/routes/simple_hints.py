@@ -6,6 +6,7 @@ from app.core.auth import get_db, get_current_user
 from app.db.models import User, Problem
 from app.schemas import ContextualHintRequest
 from app.utils.gemini_service import gemini_hint_generator
+from app.utils.leaderboard_updater import apply_xp_change
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -80,6 +81,11 @@ def get_contextual_hint(
         old_xp = current_user.total_xp
         new_xp = max(0, old_xp - xp_penalty)
         current_user.total_xp = new_xp
+        try:
+            apply_xp_change(db, current_user)
+        except Exception as e:
+            # The moves were rolled back; the penalty still applies and the next rebuild ranks it
+            logger.warning(f"Leaderboards not updated for hint penalty of user {current_user.id}: {e}")
         
         db.commit()
         db.refresh(current_user)
@@ -7,6 +7,7 @@ import logging
 
 from ...db.models import CodeSnippet, SnippetLike, SnippetComment, SnippetUsage, User
 from ..deps import get_db, get_current_user
+from ...utils.counter_buffer import counter_buffer
 from pydantic import BaseModel
 
 logger = logging.getLogger(__name__)
@@ -509,10 +510,9 @@ async def get_snippet(
                 detail="You don't have permission to view this snippet"
             )
         
-        # Increment view count (only if not the owner)
+        # Increment view count (only if not the owner; buffered and written in batches)
         if not current_user or snippet.user_id != current_user.id:
-            snippet.view_count += 1
-            db.commit()
+            counter_buffer.increment(CodeSnippet, snippet.id, "view_count")
         
         # Check if user liked this snippet
         is_liked = False
@@ -535,7 +535,7 @@ async def get_snippet(
             tags=snippet.tags,
             is_public=snippet.is_public,
             is_featured=snippet.is_featured,
-            view_count=snippet.view_count,
+            view_count=(snippet.view_count or 0) + counter_buffer.pending(CodeSnippet, snippet.id, "view_count"),
             like_count=snippet.like_count,
             is_liked=is_liked,
             created_at=snippet.created_at,
@@ -900,15 +900,14 @@ async def track_snippet_usage(
             snippet_id=snippet_id
         )
         db.add(usage)
-        
-        # Increment usage count
-        snippet.usage_count += 1
-        
         db.commit()
         
+        # Increment usage count (buffered and written in batches)
+        counter_buffer.increment(CodeSnippet, snippet.id, "usage_count")
+        
         return {
             "message": "Snippet usage tracked successfully",
-            "usage_count": snippet.usage_count
+            "usage_count": (snippet.usage_count or 0) + counter_buffer.pending(CodeSnippet, snippet.id, "usage_count")
         }
         
     except HTTPException:
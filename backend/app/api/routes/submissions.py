@@ -1,59 +1,44 @@
 from fastapi import APIRouter, Depends, HTTPException, Body
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session, joinedload
 from ...db import models, schemas
+from ...db.base import SessionLocal
 from ...api import deps
 from ...code_runner.executor import CodeExecutor
-from ...utils.xp_calculator import calculate_xp_for_problem, should_award_xp
+from ...code_runner.job_queue import QueueFullError, get_job_queue
+from ...code_runner.result_cache import execution_cache
+from ...code_runner.case_bundle import get_test_bundle
+from app.sockets import sio
+from ...utils.xp_calculator import calculate_xp_for_problem
 from ...utils.achievements import check_achievements
 from ...utils.level_calculator import calculate_level
-from ...utils.problem_tracker import increment_problem_attempt, increment_problem_solve
+from ...utils.problem_tracker import increment_problem_attempt
+from ...utils.leaderboard_updater import apply_xp_change
+from ...utils.xp_rollup import record_daily_xp
+from ...utils.user_stats import record_submission_stats
+from ...utils.submission_events import submission_events
+from ...utils.counter_buffer import counter_buffer
+import asyncio
 import datetime
+import json
 
 router = APIRouter()
 
-@router.post("/", response_model=schemas.SubmissionOut)
-async def submit_code(submission: schemas.SubmissionCreate = Body(...), db: Session = Depends(deps.get_db), user=Depends(deps.get_current_user)):
+execution_queue = get_job_queue()
+
+def _record_submission(db: Session, user, problem, payload: dict, execution_results: dict, job_id: str = None) -> schemas.SubmissionOut:
     """
-    Submit code for evaluation against test cases.
+    Store the submission together with its stats and, on a first solve, its XP, in one commit.
+    Counters, leaderboards, streaks and achievements follow in the background
+    (see the submission_recorded handlers below). Sample runs are returned without being stored.
     """
     try:
-        problem = db.query(models.Problem).options(joinedload(models.Problem.test_cases)).filter(models.Problem.id == submission.problem_id).first()
-        if not problem:
-            raise HTTPException(status_code=404, detail="Problem not found")
-        
-        # Initialize code executor
-        executor = CodeExecutor(timeout=5, memory_limit_mb=128)
-        
-        # Get test cases
-        test_cases = problem.test_cases
-        
-        # If sample_only is True, only run the first test case
-        if getattr(submission, 'sample_only', False):
-            test_cases = test_cases[:1] if test_cases else []
-        
-        if not test_cases:
-            raise HTTPException(status_code=400, detail="No test cases available for this problem")
-        
-        # Prepare test cases for execution
-        test_case_data = []
-        for tc in test_cases:
-            test_case_data.append({
-                'input': tc.input,
-                'output': tc.output
-            })
-        
-        # Determine function name (default to 'solution', or get from problem definition if available)
-        function_name = getattr(problem, 'function_name', None) or getattr(submission, 'function_name', None) or 'solution'
-        
-        # Execute code against test cases using dynamic function execution
-        execution_results = executor.run_all_test_cases(submission.code, test_case_data, function_name=function_name)
-
-        # Track problem attempt (every submission counts as an attempt)
-        increment_problem_attempt(problem.id, db)
-
         # Determine if all test cases failed due to error (collect errors)
-        all_failed = all(not tc['passed'] for tc in execution_results['test_case_results'])
-        error_messages = [tc['error'] for tc in execution_results['test_case_results'] if tc['error']]
+        # Cases a fail-fast run skipped never ran, so they neither pass nor fail
+        run_cases = [(i, tc) for i, tc in enumerate(execution_results['test_case_results']) if not tc.get('skipped')]
+        all_failed = all(not tc['passed'] for _, tc in run_cases)
+        error_messages = [tc['error'] for _, tc in run_cases if tc['error']]
         top_error_message = None
         if all_failed and error_messages:
             # If all failed and there are error messages, show the first one
@@ -64,18 +49,20 @@ async def submit_code(submission: schemas.SubmissionCreate = Body(...), db: Sess
         max_memory_usage = max(memory_usages) if memory_usages else 0
 
         # Add summary of passed/failed test cases
-        passed_cases = [i for i, tc in enumerate(execution_results['test_case_results']) if tc['passed']]
-        failed_cases = [i for i, tc in enumerate(execution_results['test_case_results']) if not tc['passed']]
+        passed_cases = [i for i, tc in run_cases if tc['passed']]
+        failed_cases = [i for i, tc in run_cases if not tc['passed']]
 
         # Create submission result
-        if getattr(submission, 'sample_only', False):
+        if payload['sample_only']:
+            # Sample runs still count as an attempt
+            increment_problem_attempt(problem.id, db)
             # Return only the sample run result, no DB write
             return schemas.SubmissionOut(
                 id=-1,
                 user_id=user.id,
                 problem_id=problem.id,
-                code=submission.code,
-                language=submission.language,
+                code=payload['code'],
+                language=payload['language'],
                 result=execution_results['overall_status'],
                 runtime=str(execution_results['total_execution_time']),
                 submission_time=datetime.datetime.utcnow(),
@@ -90,16 +77,19 @@ async def submit_code(submission: schemas.SubmissionCreate = Body(...), db: Sess
                 # failed_cases=failed_cases
             )
         else:
-            # Calculate XP and update streak if problem is solved successfully
+            # Calculate XP if problem is solved successfully
             xp_awarded = 0
-            newly_earned_achievements = []
-            streak_info = None
             level_up_info = None
             
-            if execution_results['overall_status'] == 'pass' and should_award_xp(user.id, problem.id, db):
-                # Track successful solve (only for first-time solves that award XP)
-                increment_problem_solve(problem.id, db)
-                
+            # Count the submission in the user's stats;
+            # XP is only awarded for the first solve of each problem
+            first_solve = record_submission_stats(
+                db, user.id, problem,
+                execution_results['overall_status'],
+                runtime=execution_results['total_execution_time']
+            )
+            
+            if first_solve:
                 xp_awarded = calculate_xp_for_problem(problem.difficulty)
                 old_xp = user.total_xp or 0
                 
@@ -109,6 +99,7 @@ async def submit_code(submission: schemas.SubmissionCreate = Body(...), db: Sess
                 # Update user's total XP
                 user.total_xp = old_xp + xp_awarded
                 db.add(user)
+                record_daily_xp(db, user.id, xp_awarded)
                 
                 # Check level after XP update
                 new_level, new_title = calculate_level(user.total_xp)
@@ -125,41 +116,15 @@ async def submit_code(submission: schemas.SubmissionCreate = Body(...), db: Sess
                     print(f"🎊 LEVEL UP! User {user.id} leveled up from {old_level} ({old_title}) to {new_level} ({new_title})")
                 
                 print(f"🎉 XP AWARDED: User {user.id} earned {xp_awarded} XP for {problem.difficulty} problem. Total XP: {old_xp} -> {user.total_xp}")
-                
-                # Update user's streak (with graceful error handling)
-                try:
-                    from ...utils.streak_calculator import update_user_streak
-                    streak_info = update_user_streak(user.id, db)
-                    if streak_info and streak_info.get("streak_updated"):
-                        print(f"🔥 STREAK UPDATED: User {user.id} current streak: {streak_info['current_streak']}, longest: {streak_info['longest_streak']}")
-                        if streak_info.get("is_new_record"):
-                            print(f"🏆 NEW STREAK RECORD: User {user.id} achieved a new personal best streak!")
-                except Exception as e:
-                    print(f"⚠️ Streak update failed (columns may not exist yet): {e}")
-                    streak_info = None
-                
-                # Check for achievements after successful submission
-                newly_earned_achievements = check_achievements(
-                    user.id, 
-                    "submission_success", 
-                    db,
-                    execution_time=execution_results['total_execution_time'],
-                    difficulty=problem.difficulty
-                )
-                
-                if newly_earned_achievements:
-                    print(f"🏆 ACHIEVEMENTS EARNED: User {user.id} earned {len(newly_earned_achievements)} new achievements!")
-                    for achievement in newly_earned_achievements:
-                        print(f"   - {achievement['name']}: {achievement['description']}")
             else:
-                print(f"❌ NO XP: User {user.id}, Status: {execution_results['overall_status']}, Should award: {should_award_xp(user.id, problem.id, db) if execution_results['overall_status'] == 'pass' else 'N/A (not passed)'}")
+                print(f"❌ NO XP: User {user.id}, Status: {execution_results['overall_status']}, First solve: {first_solve if execution_results['overall_status'] == 'pass' else 'N/A (not passed)'}")
             
             # Create new submission in database
             new_submission = models.Submission(
                 user_id=user.id,
                 problem_id=problem.id,
-                code=submission.code,
-                language=submission.language,
+                code=payload['code'],
+                language=payload['language'],
                 result=execution_results['overall_status'],  # Legacy field
                 runtime=str(execution_results['total_execution_time']),  # Legacy field
                 test_case_results=execution_results['test_case_results'],
@@ -167,13 +132,29 @@ async def submit_code(submission: schemas.SubmissionCreate = Body(...), db: Sess
                 memory_usage=max_memory_usage,
                 overall_status=execution_results['overall_status'],
                 error_message=top_error_message,
-                xp_awarded=xp_awarded
+                xp_awarded=xp_awarded,
+                submission_time=datetime.datetime.utcnow()
             )
             db.add(new_submission)
+            db.flush()
+            
+            # Everything else happens off the request path, from an outbox row
+            # committed with the submission so a restart can't lose it
+            submission_events.enqueue(db, 'submission_recorded', f"submission:{new_submission.id}", {
+                'submission_id': new_submission.id,
+                'user_id': user.id,
+                'problem_id': problem.id,
+                'difficulty': problem.difficulty,
+                'first_solve': first_solve,
+                'passed': new_submission.overall_status == "pass",
+                'submitted_at': new_submission.submission_time.isoformat(),
+                'xp_awarded': xp_awarded,
+                'execution_time': execution_results['total_execution_time'],
+                'job_id': job_id
+            }, shard=user.id)
             db.commit()
             db.refresh(new_submission)
-            if xp_awarded > 0:
-                db.refresh(user)  # Refresh user to get updated total_xp
+            
             return schemas.SubmissionOut(
                 id=new_submission.id,
                 user_id=new_submission.user_id,
@@ -189,13 +170,254 @@ async def submit_code(submission: schemas.SubmissionCreate = Body(...), db: Sess
                 overall_status=new_submission.overall_status,
                 error_message=new_submission.error_message,
                 xp_awarded=new_submission.xp_awarded,
-                newly_earned_achievements=newly_earned_achievements,
+                # Earned in the background and pushed as submission_rewards
+                newly_earned_achievements=[],
                 level_up_info=level_up_info
             )
     except Exception as e:
         print(f"Submission error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Submission failed: {str(e)}")
 
+def _update_problem_counters(db: Session, event: dict, results: dict):
+    """Count the attempt, and the solve on a first solve, on the problem (buffered once this handler commits)."""
+    counter_buffer.increment_on_commit(db, models.Problem, event['problem_id'], "attempt_count")
+    if event['first_solve']:
+        counter_buffer.increment_on_commit(db, models.Problem, event['problem_id'], "solve_count")
+
+def _update_leaderboards(db: Session, event: dict, results: dict):
+    """Move the user on the leaderboards by the XP the submission awarded (raises on failure, so it is retried)."""
+    if not event['xp_awarded']:
+        return None
+    user = db.get(models.User, event['user_id'])
+    return apply_xp_change(db, user, period_xp=event['xp_awarded']) if user else None
+
+def _update_streak(db: Session, event: dict, results: dict):
+    """Mark the submission's UTC day solved and update the user's streak on any passing submission."""
+    if not event.get('passed', event['first_solve']):
+        return None
+    from ...utils.streak_calculator import update_user_streak
+    # The submission's own time, so a delayed event still lands on the right day
+    when = datetime.datetime.fromisoformat(event['submitted_at']) if event.get('submitted_at') else None
+    streak_info = update_user_streak(event['user_id'], db, when=when)
+    if streak_info and streak_info.get("error"):
+        raise RuntimeError(streak_info["error"])
+    if streak_info and streak_info.get("streak_updated"):
+        print(f"🔥 STREAK UPDATED: User {event['user_id']} current streak: {streak_info['current_streak']}, longest: {streak_info['longest_streak']}")
+        if streak_info.get("is_new_record"):
+            print(f"🏆 NEW STREAK RECORD: User {event['user_id']} achieved a new personal best streak!")
+    return streak_info
+
+def _check_achievements(db: Session, event: dict, results: dict):
+    """
+    Award achievements unlocked by a first solve or, on any passing submission, by the
+    streak (runs after the streak update). A replayed event has no streak result, so the
+    streak achievements are checked whether or not this run extended the streak.
+    """
+    if event['first_solve']:
+        newly_earned_achievements = check_achievements(
+            event['user_id'],
+            "submission_success",
+            db,
+            execution_time=event['execution_time'],
+            difficulty=event['difficulty']
+        )
+    elif event.get('passed'):
+        newly_earned_achievements = check_achievements(event['user_id'], "streak_updated", db)
+    else:
+        return []
+    if newly_earned_achievements:
+        print(f"🏆 ACHIEVEMENTS EARNED: User {event['user_id']} earned {len(newly_earned_achievements)} new achievements!")
+        for achievement in newly_earned_achievements:
+            print(f"   - {achievement['name']}: {achievement['description']}")
+    return newly_earned_achievements
+
+def _notify_submission(db: Session, event: dict, results: dict):
+    """Push the streak and achievements to the clients watching the submission's job."""
+    loop = submission_events.loop
+    if not event.get('job_id') or loop is None or not (event['first_solve'] or results.get('achievements')):
+        return None
+    asyncio.run_coroutine_threadsafe(
+        sio.emit("submission_rewards", {
+            "job_id": event['job_id'],
+            "submission_id": event['submission_id'],
+            "newly_earned_achievements": results.get('achievements') or [],
+            "streak": results.get('streak')
+        }, room=f"submission_job_{event['job_id']}"),
+        loop
+    )
+
+submission_events.register('submission_recorded', 'problem_counters', _update_problem_counters)
+submission_events.register('submission_recorded', 'leaderboards', _update_leaderboards)
+submission_events.register('submission_recorded', 'streak', _update_streak)
+submission_events.register('submission_recorded', 'achievements', _check_achievements)
+submission_events.register('submission_recorded', 'notify', _notify_submission)
+
+def _execute_submission_job(job) -> schemas.SubmissionOut:
+    """
+    Execution queue handler for 'submission' jobs.
+    Runs on a queue worker thread, so it records the result with its own session.
+    """
+    payload = job.payload
+    executor = CodeExecutor(timeout=5, memory_limit_mb=128, parallel=True, cache=execution_cache)
+    # A final submit stops at the first failing test case
+    execution_results = executor.run_all_test_cases(
+        payload['code'],
+        payload['test_cases'],
+        function_name=payload['function_name'],
+        fail_fast=not payload['sample_only'],
+        on_result=job.report_progress,
+        bundle=payload.get('test_bundle')
+    )
+    db = SessionLocal()
+    try:
+        user = db.query(models.User).filter(models.User.id == job.user_id).first()
+        problem = db.query(models.Problem).filter(models.Problem.id == payload['problem_id']).first()
+        if not user or not problem:
+            raise HTTPException(status_code=404, detail="User or problem no longer exists")
+        return _record_submission(db, user, problem, payload, execution_results, job_id=job.id)
+    finally:
+        db.close()
+
+execution_queue.register_handler('submission', _execute_submission_job)
+
+def _push_job_event(loop, job, event: str, data: dict):
+    """Forward queue events to the job's Socket.IO room from a worker thread."""
+    asyncio.run_coroutine_threadsafe(
+        sio.emit(f"submission_{event}", data, room=f"submission_job_{job.id}"),
+        loop
+    )
+
+def _sse(event: str, data) -> str:
+    """Format one Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+def _enqueue_submission(submission: schemas.SubmissionCreate, db: Session, user, listener):
+    """
+    Validate a submission and put it on the execution queue.
+    Returns the queued Job; raises 404/400 for a bad problem and 429 when the queue is full.
+    """
+    problem = db.query(models.Problem).options(joinedload(models.Problem.test_cases)).filter(models.Problem.id == submission.problem_id).first()
+    if not problem:
+        raise HTTPException(status_code=404, detail="Problem not found")
+    
+    # Get test cases
+    test_cases = problem.test_cases
+    
+    # If sample_only is True, only run the first test case
+    if getattr(submission, 'sample_only', False):
+        test_cases = test_cases[:1] if test_cases else []
+    
+    if not test_cases:
+        raise HTTPException(status_code=400, detail="No test cases available for this problem")
+    
+    # Precompiled form of the full set; sample runs use its first entry
+    test_bundle = get_test_bundle(db, problem.id, [{'input': tc.input, 'output': tc.output} for tc in problem.test_cases])
+    
+    # Prepare test cases for execution
+    test_case_data = []
+    for tc in test_cases:
+        test_case_data.append({
+            'input': tc.input,
+            'output': tc.output
+        })
+    
+    # Determine function name (default to 'solution', or get from problem definition if available)
+    function_name = getattr(problem, 'function_name', None) or getattr(submission, 'function_name', None) or 'solution'
+    
+    payload = {
+        'code': submission.code,
+        'language': submission.language,
+        'problem_id': problem.id,
+        'function_name': function_name,
+        'sample_only': bool(getattr(submission, 'sample_only', False)),
+        'test_cases': test_case_data,
+        'test_bundle': test_bundle
+    }
+    try:
+        return execution_queue.submit(
+            'submission',
+            payload,
+            user_id=user.id,
+            total=len(test_case_data),
+            listener=listener
+        )
+    except QueueFullError:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many submissions are being processed right now. Please try again shortly.",
+            headers={"Retry-After": "2"}
+        )
+
+@router.post("/", response_model=schemas.SubmissionOut)
+async def submit_code(submission: schemas.SubmissionCreate = Body(...), wait: bool = True, db: Session = Depends(deps.get_db), user=Depends(deps.get_current_user)):
+    """
+    Submit code for evaluation against test cases.
+    The run goes through the execution queue. With wait=false the response is a
+    202 with a job id to poll at /jobs/{job_id}; per-test-case progress is pushed
+    to the Socket.IO room submission_job_<job_id>. Returns 429 when the queue is full.
+    """
+    loop = asyncio.get_running_loop()
+    job = _enqueue_submission(submission, db, user, lambda job, event, data: _push_job_event(loop, job, event, data))
+    
+    if not wait:
+        return JSONResponse(status_code=202, content=job.to_dict())
+    
+    await job.wait()
+    if job.status == 'failed':
+        raise HTTPException(status_code=job.status_code or 500, detail=job.error)
+    return job.result
+
+@router.post("/stream")
+async def stream_submission(submission: schemas.SubmissionCreate = Body(...), db: Session = Depends(deps.get_db), user=Depends(deps.get_current_user)):
+    """
+    Submit code and stream the run back as Server-Sent Events.
+    Sends a `queued` event with the job, a `progress` event as each test case
+    finishes and finally `completed` with the submission or `failed` with the error.
+    The same events also go to the Socket.IO room submission_job_<job_id>.
+    """
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+
+    def listener(job, event, data):
+        _push_job_event(loop, job, event, data)
+        loop.call_soon_threadsafe(events.put_nowait, (event, data))
+
+    job = _enqueue_submission(submission, db, user, listener)
+
+    async def event_stream():
+        yield _sse('queued', job.to_dict())
+        while True:
+            event, data = await events.get()
+            if event == 'completed':
+                yield _sse('completed', job.result)
+                return
+            if event == 'failed':
+                yield _sse('failed', {'job_id': job.id, 'status_code': job.status_code or 500, 'detail': job.error})
+                return
+            yield _sse(event, data)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        # Keep proxies from buffering the stream into one response
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/jobs/{job_id}")
+async def get_submission_job(job_id: str, user=Depends(deps.get_current_user)):
+    """
+    Get the status of a queued submission, including its result once completed.
+    """
+    if user is None:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    job = execution_queue.get_job(job_id)
+    if not job or job.user_id != user.id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    data = job.to_dict()
+    if job.status == 'completed':
+        data['result'] = jsonable_encoder(job.result)
+    return data
+
 @router.post("/run", response_model=schemas.SubmissionOut)
 async def run_code(submission: schemas.SubmissionCreate = Body(...), db: Session = Depends(deps.get_db), user=Depends(deps.get_current_user)):
     """
@@ -203,7 +425,7 @@ async def run_code(submission: schemas.SubmissionCreate = Body(...), db: Session
     """
     # Set sample_only to True for this endpoint
     submission.sample_only = True
-    return await submit_code(submission, db, user)
+    return await submit_code(submission, wait=True, db=db, user=user)
 
 @router.post("/test")
 async def test_run_code(data: dict = Body(...), db: Session = Depends(deps.get_db), user=Depends(deps.get_current_user)):
@@ -222,7 +444,7 @@ async def test_run_code(data: dict = Body(...), db: Session = Depends(deps.get_d
         
         # Simple run mode - just execute the code to see print output
         input_data = ""  # No input for simple test runs
-        execution_result = executor.execute_python_code(code, input_data)
+        execution_result = await executor.execute_python_code_async(code, input_data)
         
         result = {
             "simple_execution": True,
@@ -251,4 +473,4 @@ async def health_check():
     """
     Simple health check endpoint for submissions API.
     """
-    return {"status": "ok", "message": "Submissions API is working"} 
\ No newline at end of file
+    return {"status": "ok", "message": "Submissions API is working", "queue": execution_queue.stats(), "cache": execution_cache.stats(), "events": submission_events.stats(), "counters": counter_buffer.stats()} 
\ No newline at end of file
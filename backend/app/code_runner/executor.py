@@ -1,17 +1,39 @@
 import subprocess
 import tempfile
 import os
-import json
 import time
 import signal
-from typing import Dict, Any, Optional, Tuple
+import math
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, AsyncIterator, Callable, List, Optional, Tuple
 import resource
 import platform
+from .harness import EXCEPTION_MARKER, METRICS_FIELDS, NONCE_ENV, output_matches, parse_record
+from .worker_pool import HARNESS_PATH, WorkerError, get_worker_pool
+from .result_cache import ResultCache
+from .case_bundle import bundle_cases, canonicalize_output
+
+PARALLEL_WORKERS = int(os.getenv("EXECUTOR_PARALLEL_WORKERS", str(os.cpu_count() or 2)))
+
+ASYNC_THREADS = int(os.getenv("EXECUTOR_ASYNC_THREADS", str(max(4, (os.cpu_count() or 2) * 2))))
+
+# Extra lanes shared by every submission running in parallel mode
+_parallel_slots = threading.BoundedSemaphore(max(1, PARALLEL_WORKERS))
+
+# Threads that carry blocking executor calls off the asyncio event loop
+_async_threads = ThreadPoolExecutor(max_workers=ASYNC_THREADS, thread_name_prefix="code-executor")
 
 class CodeExecutor:
-    def __init__(self, timeout: int = 5, memory_limit_mb: int = 128):
+    def __init__(self, timeout: int = 5, memory_limit_mb: int = 128, use_pool: bool = True, parallel: bool = False,
+                 cache: Optional[ResultCache] = None):
         self.timeout = timeout
         self.memory_limit_mb = memory_limit_mb
+        self.use_pool = use_pool
+        self.parallel = parallel
+        self.cache = cache
     
     def execute_python_code(self, code: str, input_data: str = "") -> Dict[str, Any]:
         """
@@ -34,59 +56,31 @@ class CodeExecutor:
                 tmp_file.write(code)
                 tmp_file_path = tmp_file.name
             
-            # Set up process with resource limits
-            def limit_memory():
-                """Limit memory usage"""
-                resource.setrlimit(resource.RLIMIT_AS, (self.memory_limit_mb * 1024 * 1024, -1))
-            
-            # Execute the code
-            use_preexec = platform.system() == 'Linux'
-            process = subprocess.Popen(
-                ['python3', tmp_file_path],
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                preexec_fn=limit_memory if use_preexec else None
-            )
-            
             try:
-                # Send input and wait for completion
-                stdout, stderr = process.communicate(
-                    input=input_data,
-                    timeout=self.timeout
-                )
-                
-                execution_time = time.time() - start_time
-                
-                # Check if process completed successfully
-                if process.returncode == 0:
-                    return {
-                        'success': True,
-                        'output': stdout.strip(),
-                        'error': stderr.strip() if stderr.strip() else None,
-                        'execution_time': execution_time,
-                        'memory_usage': self._estimate_memory_usage(process.pid)
-                    }
-                else:
-                    return {
-                        'success': False,
-                        'output': stdout.strip() if stdout.strip() else None,
-                        'error': stderr.strip() or 'Runtime error occurred',
-                        'execution_time': execution_time,
-                        'memory_usage': self._estimate_memory_usage(process.pid)
-                    }
-                    
+                returncode, stdout, stderr, metrics = self._run_harness_process(['--script', tmp_file_path], input_data)
             except subprocess.TimeoutExpired:
-                # Kill the process if it times out
-                process.kill()
-                process.wait()
+                return self._timeout_result()
+            
+            execution_time = time.time() - start_time
+            
+            # Check if process completed successfully
+            if returncode == 0:
+                return {
+                    'success': True,
+                    'output': stdout.strip(),
+                    'error': stderr.strip() if stderr.strip() else None,
+                    'execution_time': execution_time,
+                    'cpu_time': metrics.get('cpu_time'),
+                    'memory_usage': metrics.get('peak_memory_mb', 0.0)
+                }
+            else:
                 return {
                     'success': False,
-                    'output': None,
-                    'error': f'Execution timed out after {self.timeout} seconds',
-                    'execution_time': self.timeout,
-                    'memory_usage': 0
+                    'output': stdout.strip() if stdout.strip() else None,
+                    'error': stderr.strip() or 'Runtime error occurred',
+                    'execution_time': execution_time,
+                    'cpu_time': metrics.get('cpu_time'),
+                    'memory_usage': metrics.get('peak_memory_mb', 0.0)
                 }
                 
         except Exception as e:
@@ -108,6 +102,8 @@ class CodeExecutor:
     def execute_python_function(self, user_code: str, function_name: str, input_args: str) -> Dict[str, Any]:
         """
         Execute a user-defined function with given input arguments.
+        Runs on a pre-warmed sandbox worker when the pool is available and
+        falls back to a fresh interpreter otherwise.
         Args:
             user_code: The user's function code as a string.
             function_name: The name of the function to call.
@@ -115,260 +111,172 @@ class CodeExecutor:
         Returns:
             Dict containing execution results (output, error, etc.)
         """
+        if self.use_pool:
+            pool = get_worker_pool(self.memory_limit_mb)
+            if pool is not None:
+                start_time = time.time()
+                try:
+                    response = pool.run(user_code, function_name, input_args, self.timeout)
+                except WorkerError as ex:
+                    print(f"⚠️ Sandbox worker failed, falling back to a fresh process: {ex}")
+                else:
+                    if response['timed_out']:
+                        return self._timeout_result()
+                    return self._function_result(
+                        response['returncode'], response['stdout'], response['stderr'],
+                        time.time() - start_time, response['peak_memory_mb'],
+                        cpu_time=response['cpu_time'], function_time=response.get('function_time')
+                    )
+        return self._execute_python_function_cold(user_code, function_name, input_args)
+
+    def _execute_python_function_cold(self, user_code: str, function_name: str, input_args: str) -> Dict[str, Any]:
+        """Run the harness in a brand new interpreter for a single call."""
         start_time = time.time()
         tmp_file_path = None
         try:
-            # Build the wrapper code as a list of lines to avoid triple-quote issues
-            wrapper_lines = [
-                "import sys",
-                "import json",
-                "",
-            ]
-            wrapper_lines.append(user_code)
-            wrapper_lines.append("")
-            wrapper_lines.extend([
-                "def parse_input(input_str):",
-                "    # Handle multi-line input (common for problems with multiple parameters)",
-                "    lines = [line.strip() for line in input_str.strip().split('\\n') if line.strip()]",
-                "    ",
-                "    if len(lines) == 0:",
-                "        return []",
-                "    elif len(lines) == 1:",
-                "        # Single line - try to parse as JSON first, then as simple value",
-                "        line = lines[0]",
-                "        try:",
-                "            parsed = json.loads(line)",
-                "            return [parsed]",
-                "        except:",
-                "            # Try to parse as number or string",
-                "            def try_num(x):",
-                "                try:",
-                "                    return int(x)",
-                "                except:",
-                "                    try:",
-                "                        return float(x)",
-                "                    except:",
-                "                        return x",
-                "            return [try_num(line)]",
-                "    else:",
-                "        # Multiple lines - each line is a separate argument",
-                "        args = []",
-                "        for line in lines:",
-                "            try:",
-                "                # Try to parse each line as JSON (handles arrays, objects, etc.)",
-                "                parsed = json.loads(line)",
-                "                args.append(parsed)",
-                "            except:",
-                "                # If JSON parsing fails, try to parse as number or string",
-                "                def try_num(x):",
-                "                    try:",
-                "                        return int(x)",
-                "                    except:",
-                "                        try:",
-                "                            return float(x)",
-                "                        except:",
-                "                            return x",
-                "                args.append(try_num(line))",
-                "        return args",
-                "",
-                "if __name__ == \"__main__\":",
-                "    input_str = sys.stdin.read().strip()",
-                "    if input_str:",
-                "        args = parse_input(input_str)",
-                "        if not isinstance(args, list):",
-                "            args = [args]",
-                "    else:",
-                "        args = []",
-                "    ",
-                "    try:",
-                f"        # Check if the function exists",
-                f"        if '{function_name}' not in globals():",
-                f"            print(\"__EXCEPTION__Function '{function_name}' is not defined. Make sure you have a function named '{function_name}' in your code.\", file=sys.stderr)",
-                "            sys.exit(1)",
-                "        ",
-                f"        result = {function_name}(*args)",
-                "        ",
-                "        # Output the result directly",
-                "        if result is not None:",
-                "            if isinstance(result, (str, int, float, bool)):",
-                "                print(result)",
-                "            elif isinstance(result, (list, dict)):",
-                "                print(json.dumps(result))",
-                "            else:",
-                "                print(str(result))",
-                "        else:",
-                "            print(\"\")",
-                "        ",
-                "    except TypeError as error:",
-                "        if \"takes\" in str(error) and \"positional argument\" in str(error):",
-                "            print(\"__EXCEPTION__Function signature mismatch. Check that your solution function accepts the correct number of parameters for the given input.\", file=sys.stderr)",
-                "        else:",
-                "            print(\"__EXCEPTION__\" + str(error), file=sys.stderr)",
-                "        sys.exit(1)",
-                "    except Exception as error:",
-                "        print(\"__EXCEPTION__\" + str(error), file=sys.stderr)",
-                "        sys.exit(1)",
-            ])
-            wrapper_code = "\n".join(wrapper_lines)
-            # Write the wrapper code to a temp file
+            # Write the user's code to a temp file for the harness to load
             with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as tmp_file:
-                tmp_file.write(wrapper_code)
+                tmp_file.write(user_code)
                 tmp_file_path = tmp_file.name
 
-            def limit_memory():
-                resource.setrlimit(resource.RLIMIT_AS, (self.memory_limit_mb * 1024 * 1024, -1))
+            try:
+                returncode, stdout, stderr, metrics = self._run_harness_process([tmp_file_path, function_name], input_args)
+            except subprocess.TimeoutExpired:
+                return self._timeout_result()
+            return self._function_result(
+                returncode, stdout, stderr, time.time() - start_time, metrics.get('peak_memory_mb', 0.0),
+                cpu_time=metrics.get('cpu_time'), function_time=metrics.get('function_time')
+            )
+        except Exception as ex:
+            return {
+                'success': False,
+                'output': None,
+                'error': f'Execution error: {str(ex)}',
+                'execution_time': time.time() - start_time,
+                'memory_usage': 0
+            }
+        finally:
+            try:
+                if tmp_file_path:
+                    os.unlink(tmp_file_path)
+            except:
+                pass
 
+    def _run_harness_process(self, harness_args: List[str], input_data: str) -> Tuple[int, str, str, Dict[str, Any]]:
+        """
+        Run the harness in a fresh resource-limited interpreter.
+        The harness reports its own CPU time, peak RSS and function time over a
+        pipe because Popen reaps the child without exposing its rusage. The user's
+        code can write to that pipe too, so a report without the run's nonce fails the run.
+        Returns (returncode, stdout, stderr, metrics); raises subprocess.TimeoutExpired.
+        """
+        def limit_memory():
+            resource.setrlimit(resource.RLIMIT_AS, (self.memory_limit_mb * 1024 * 1024, -1))
+
+        metrics_r, metrics_w = os.pipe()
+        nonce = os.urandom(16).hex()
+        try:
             use_preexec = platform.system() == 'Linux'
             process = subprocess.Popen(
-                ['python3', tmp_file_path],
+                ['python3', HARNESS_PATH] + harness_args + [str(metrics_w)],
                 stdin=subprocess.PIPE,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
                 text=True,
+                pass_fds=(metrics_w,),
+                env=dict(os.environ, **{NONCE_ENV: nonce}),
                 preexec_fn=limit_memory if use_preexec else None
             )
+            os.close(metrics_w)
+            metrics_w = None
             try:
                 stdout, stderr = process.communicate(
-                    input=input_args,
+                    input=input_data,
                     timeout=self.timeout
                 )
-                execution_time = time.time() - start_time
-                if process.returncode == 0:
-                    return {
-                        'success': True,
-                        'output': stdout.strip(),
-                        'error': None,
-                        'execution_time': execution_time,
-                        'memory_usage': self._estimate_memory_usage(process.pid)
-                    }
-                else:
-                    # Check for our custom exception marker
-                    if stderr and '__EXCEPTION__' in stderr:
-                        error_msg = stderr.strip().split('__EXCEPTION__')[-1]
-                    else:
-                        error_msg = stderr.strip() or 'Runtime error occurred'
-                    return {
-                        'success': False,
-                        'output': None,
-                        'error': error_msg,
-                        'execution_time': execution_time,
-                        'memory_usage': self._estimate_memory_usage(process.pid)
-                    }
             except subprocess.TimeoutExpired:
                 process.kill()
                 process.wait()
-                return {
-                    'success': False,
-                    'output': None,
-                    'error': f'Execution timed out after {self.timeout} seconds',
-                    'execution_time': self.timeout,
-                    'memory_usage': 0
-                }
-        except Exception as ex:
-            return {
-                'success': False,
-                'output': None,
-                'error': f'Execution error: {str(ex)}',
-                'execution_time': time.time() - start_time,
-                'memory_usage': 0
-            }
+                raise
+            metrics = self._read_metrics(metrics_r, nonce)
+            if metrics is None:
+                return 1, '', 'The solution wrote to the sandbox result channel', {}
+            return process.returncode, stdout, stderr, metrics
         finally:
-            try:
-                if tmp_file_path:
-                    os.unlink(tmp_file_path)
-            except:
-                pass
-    
-    def _estimate_memory_usage(self, pid: int) -> float:
-        """Estimate memory usage of the process in MB"""
+            for fd in (metrics_r, metrics_w):
+                if fd is not None:
+                    os.close(fd)
+
+    def _read_metrics(self, fd: int, nonce: str) -> Optional[Dict[str, Any]]:
+        """The harness's metrics report; {} if it wrote none and None if it isn't a valid one."""
+        # The harness has exited, so whatever it wrote is already in the pipe
+        os.set_blocking(fd, False)
+        data = b""
         try:
-            with open(f'/proc/{pid}/status', 'r') as f:
-                for line in f:
-                    if line.startswith('VmRSS:'):
-                        memory_kb = int(line.split()[1])
-                        return memory_kb / 1024.0  # Convert to MB
-        except:
+            while True:
+                chunk = os.read(fd, 65536)
+                if not chunk:
+                    break
+                data += chunk
+        except BlockingIOError:
             pass
-        return 0.0
+        if not data:
+            return {}
+        return parse_record(data.strip(), nonce, 0, METRICS_FIELDS)
+
+    def _function_result(self, returncode: int, stdout: str, stderr: str, execution_time: float, memory_usage: float,
+                         cpu_time: Optional[float] = None, function_time: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Build the result dict for a finished harness run.
+        execution_time is wall-clock time around the run, cpu_time is user+sys
+        time of the child, function_time is the time spent inside the user's
+        function alone and memory_usage is the child's peak RSS in MB.
+        """
+        if returncode == 0:
+            return {
+                'success': True,
+                'output': stdout.strip(),
+                'error': None,
+                'execution_time': execution_time,
+                'cpu_time': cpu_time,
+                'function_time': function_time,
+                'memory_usage': memory_usage
+            }
+        # Check for our custom exception marker
+        if stderr and EXCEPTION_MARKER in stderr:
+            error_msg = stderr.strip().split(EXCEPTION_MARKER)[-1]
+        else:
+            error_msg = stderr.strip() or 'Runtime error occurred'
+        return {
+            'success': False,
+            'output': None,
+            'error': error_msg,
+            'execution_time': execution_time,
+            'cpu_time': cpu_time,
+            'function_time': function_time,
+            'memory_usage': memory_usage
+        }
+
+    def _timeout_result(self) -> Dict[str, Any]:
+        return {
+            'success': False,
+            'output': None,
+            'error': f'Execution timed out after {self.timeout} seconds',
+            'execution_time': self.timeout,
+            'memory_usage': 0
+        }
     
-    def validate_output(self, actual_output: str, expected_output: str) -> bool:
+    def validate_output(self, actual_output: str, expected_output: str,
+                        canonical_expected: Optional[Dict[str, Any]] = None) -> bool:
         """
         Compare actual output with expected output.
         Handles different data types and formats.
+        canonical_expected is expected_output already run through
+        canonicalize_output, e.g. from a precompiled test bundle.
         """
-        # Strip whitespace and normalize
-        actual = actual_output.strip()
-        expected = expected_output.strip()
-        
-        # Direct comparison
-        if actual == expected:
-            return True
-        
-        # Handle multi-line outputs by comparing line by line
-        actual_lines = [line.strip() for line in actual.split('\n') if line.strip()]
-        expected_lines = [line.strip() for line in expected.split('\n') if line.strip()]
-        
-        # If both have same number of lines, compare each line
-        if len(actual_lines) == len(expected_lines):
-            all_match = True
-            for a_line, e_line in zip(actual_lines, expected_lines):
-                if not self._compare_single_output(a_line, e_line):
-                    all_match = False
-                    break
-            if all_match:
-                return True
-        
-        # Try comparing the last line (function return value) if there are print statements
-        if actual_lines and expected_lines:
-            if self._compare_single_output(actual_lines[-1], expected_lines[-1]):
-                return True
-        
-        # Fallback to single output comparison
-        return self._compare_single_output(actual, expected)
-    
-    def _compare_single_output(self, actual: str, expected: str) -> bool:
-        """Compare single line outputs with various type handling"""
-        # Direct comparison
-        if actual == expected:
-            return True
-        
-        # Try to parse as JSON for array/list comparisons
-        try:
-            actual_json = json.loads(actual)
-            expected_json = json.loads(expected)
-            return actual_json == expected_json
-        except:
-            pass
-        
-        # Try to parse as numbers
-        try:
-            actual_num = float(actual)
-            expected_num = float(expected)
-            return abs(actual_num - expected_num) < 1e-9  # Small tolerance for floating point
-        except:
-            pass
-        
-        # Try to parse as boolean
-        bool_map = {
-            'true': True, 'false': False,
-            'True': True, 'False': False,
-            '1': True, '0': False
-        }
-        if actual in bool_map and expected in bool_map:
-            return bool_map[actual] == bool_map[expected]
-        
-        # Handle list/array string representations
-        try:
-            # Remove brackets and spaces, then compare as comma-separated values
-            actual_clean = actual.replace('[', '').replace(']', '').replace(' ', '')
-            expected_clean = expected.replace('[', '').replace(']', '').replace(' ', '')
-            if actual_clean == expected_clean:
-                return True
-        except:
-            pass
-        
-        return False
-    
+        # The sandbox uses the same comparison to stop fail-fast batches
+        return output_matches(actual_output, canonical_expected or canonicalize_output(expected_output))
+
     def run_test_case(self, code: str, test_input: str, expected_output: str, function_name: str = "solution") -> Dict[str, Any]:
         """
         Run a single test case and return the result.
@@ -381,15 +289,28 @@ class CodeExecutor:
             Dict containing test case result
         """
         execution_result = self.execute_python_function(code, function_name, test_input)
+        return self._test_case_result(test_input, expected_output, execution_result)
+
+    def _test_case_result(self, test_input: str, expected_output: str, execution_result: Dict[str, Any],
+                          canonical_expected: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Validate an execution result against the expected output."""
+        # Rank by the time spent in the user's function when the harness measured it
+        function_time = execution_result.get('function_time')
+        metrics = {
+            'execution_time': function_time if function_time is not None else execution_result['execution_time'],
+            'wall_time': execution_result['execution_time'],
+            'cpu_time': execution_result.get('cpu_time'),
+            'memory_usage': execution_result.get('memory_usage')
+        }
         if execution_result['success']:
-            passed = self.validate_output(execution_result['output'], expected_output)
+            passed = self.validate_output(execution_result['output'], expected_output, canonical_expected)
             return {
                 'input': test_input,
                 'expected': expected_output,
                 'output': execution_result['output'],
                 'passed': passed,
-                'execution_time': execution_result['execution_time'],
-                'error': None
+                'error': None,
+                **metrics
             }
         else:
             return {
@@ -397,46 +318,268 @@ class CodeExecutor:
                 'expected': expected_output,
                 'output': None,
                 'passed': False,
-                'execution_time': execution_result['execution_time'],
-                'error': execution_result['error']
+                'error': execution_result['error'],
+                **metrics
             }
 
-    def run_all_test_cases(self, code: str, test_cases: list, function_name: str = "solution") -> Dict[str, Any]:
+    def execute_python_function_batch(self, user_code: str, function_name: str, inputs: List[str],
+                                      arguments: Optional[List[Optional[list]]] = None,
+                                      on_result: Optional[Callable[[int, Dict[str, Any]], None]] = None,
+                                      expected: Optional[List[Dict[str, Any]]] = None) -> List[Optional[Dict[str, Any]]]:
+        """
+        Execute a user-defined function once per input, loading the user's code only once.
+        Each input gets its own wall-clock and CPU budget of ``self.timeout`` seconds.
+        Falls back to one execute_python_function call per input when no worker pool is available.
+        Args:
+            user_code: The user's function code as a string.
+            function_name: The name of the function to call.
+            inputs: The argument strings, one per call.
+            arguments: Optional pre-parsed argument lists matching inputs (None entries are parsed from the string).
+            on_result: Called once with (index, execution result) as soon as each input finishes.
+            expected: Optional canonical expected outputs matching inputs; the inputs after
+                the first one whose output doesn't match are not run.
+        Returns:
+            List of execution result dicts, in the same order as inputs (None for inputs not run)
+        """
+        finished: Dict[int, Dict[str, Any]] = {}
+
+        def report(index: int, execution_result: Dict[str, Any]):
+            if index not in finished:
+                finished[index] = execution_result
+                if on_result:
+                    on_result(index, execution_result)
+
+        if self.use_pool and inputs:
+            pool = get_worker_pool(self.memory_limit_mb)
+            if pool is not None:
+                try:
+                    batch = inputs
+                    if arguments is not None:
+                        batch = [input_args if args is None else args for input_args, args in zip(inputs, arguments)]
+                    records = pool.run_batch(user_code, function_name, batch, self.timeout,
+                                             on_record=lambda index, record: report(index, self._batch_result(record)),
+                                             expected=expected)
+                except WorkerError as ex:
+                    print(f"⚠️ Sandbox worker failed, running test cases one by one: {ex}")
+                else:
+                    for index, record in enumerate(records):
+                        report(index, self._batch_result(record))
+        # Only inputs the worker didn't finish are run again
+        for index, input_args in enumerate(inputs):
+            if index not in finished:
+                report(index, self.execute_python_function(user_code, function_name, input_args))
+            if expected is not None and not self._execution_passed(finished[index], expected[index]):
+                break
+        return [finished.get(index) for index in range(len(inputs))]
+
+    def _execution_passed(self, execution_result: Dict[str, Any], expected: Dict[str, Any]) -> bool:
+        return execution_result['success'] and output_matches(execution_result['output'], expected)
+
+    def _batch_result(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        if record['timed_out']:
+            return self._timeout_result()
+        return self._function_result(
+            record['returncode'], record['stdout'], record['stderr'], record['time'],
+            record['peak_memory_mb'], cpu_time=record['cpu_time'], function_time=record.get('function_time')
+        )
+
+    def _run_test_case_lanes(self, code: str, test_cases: list, function_name: str, fail_fast: bool,
+                             on_result: Optional[Callable[[int, Dict[str, Any]], None]] = None,
+                             compiled: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+        """
+        Run test cases in chunks across one or more lanes, keeping results in input order.
+        Lanes beyond the first are borrowed from the global parallel slots only if
+        they are free, so a busy server degrades to sequential runs instead of queueing.
+        compiled holds the matching precompiled bundle entries, if any.
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(test_cases)
+        extra_lanes = 0
+        if self.parallel:
+            wanted = min(PARALLEL_WORKERS, len(test_cases)) - 1
+            while extra_lanes < wanted and _parallel_slots.acquire(blocking=False):
+                extra_lanes += 1
+        lanes = 1 + extra_lanes
+        chunk_size = max(1, math.ceil(len(test_cases) / lanes))
+        chunks = iter([range(i, min(i + chunk_size, len(test_cases))) for i in range(0, len(test_cases), chunk_size)])
+        chunks_lock = threading.Lock()
+        failed = threading.Event()
+
+        def finish(i: int, execution_result: Dict[str, Any]):
+            results[i] = self._test_case_result(
+                test_cases[i]['input'], test_cases[i]['output'], execution_result,
+                compiled[i]['expected'] if compiled else None
+            )
+            if on_result:
+                on_result(i, results[i])
+            if fail_fast and not results[i]['passed']:
+                failed.set()
+
+        def run_lane():
+            while not failed.is_set():
+                with chunks_lock:
+                    chunk = next(chunks, None)
+                if chunk is None:
+                    return
+                self.execute_python_function_batch(
+                    code,
+                    function_name,
+                    [test_cases[i]['input'] for i in chunk],
+                    [compiled[i]['args'] for i in chunk] if compiled else None,
+                    # Validate each case as soon as the worker reports it
+                    on_result=lambda position, execution_result, chunk=chunk: finish(chunk[position], execution_result),
+                    # The worker stops the chunk at its first failing case
+                    expected=[
+                        compiled[i]['expected'] if compiled else canonicalize_output(test_cases[i]['output'])
+                        for i in chunk
+                    ] if fail_fast else None
+                )
+
+        try:
+            if lanes == 1:
+                run_lane()
+            else:
+                with ThreadPoolExecutor(max_workers=lanes) as lane_pool:
+                    for future in [lane_pool.submit(run_lane) for _ in range(lanes)]:
+                        future.result()
+        finally:
+            for _ in range(extra_lanes):
+                _parallel_slots.release()
+
+        return [
+            result if result is not None else self._skipped_result(test_case)
+            for result, test_case in zip(results, test_cases)
+        ]
+
+    def _skipped_result(self, test_case: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'input': test_case['input'],
+            'expected': test_case['output'],
+            'output': None,
+            'passed': False,
+            'execution_time': 0,
+            # Not an error of the user's code, so it never becomes the submission's error message
+            'error': None,
+            'skipped': True
+        }
+
+    def run_all_test_cases(self, code: str, test_cases: list, function_name: str = "solution", fail_fast: bool = False,
+                           on_result: Optional[Callable[[int, Dict[str, Any]], None]] = None,
+                           bundle: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Run code against all test cases and return comprehensive results.
         Args:
             code: Python code to execute
             test_cases: List of test cases with input and output
             function_name: Name of the function to call in user code
+            fail_fast: Skip the remaining test cases once one fails
+            on_result: Called with (index, result) as each test case finishes
+            bundle: Precompiled test bundle of the problem; ignored if it doesn't match test_cases
         Returns:
             Dict containing all test case results
         """
-        results = []
+        cache_key = None
+        if self.cache is not None:
+            cache_key, test_set = self.cache.make_key(
+                code, function_name, test_cases,
+                timeout=self.timeout, memory_limit_mb=self.memory_limit_mb, fail_fast=fail_fast
+            )
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                if on_result:
+                    for i, result in enumerate(cached['test_case_results']):
+                        on_result(i, result)
+                return cached
+
+        results = self._run_test_case_lanes(code, test_cases, function_name, fail_fast, on_result,
+                                            bundle_cases(bundle, test_cases))
         total_time = 0
+        total_cpu_time = 0
+        peak_memory_usage = 0
         passed_count = 0
-        for test_case in test_cases:
-            result = self.run_test_case(
-                code,
-                test_case['input'],
-                test_case['output'],
-                function_name
-            )
-            results.append(result)
+        skipped_count = 0
+        for result in results:
             total_time += result['execution_time']
+            total_cpu_time += result.get('cpu_time') or 0
+            peak_memory_usage = max(peak_memory_usage, result.get('memory_usage') or 0)
             if result['passed']:
                 passed_count += 1
-        # Determine overall status
+            elif result.get('skipped'):
+                skipped_count += 1
+        # Determine overall status; skipped cases count as not passed, so a
+        # fail-fast run that stops on its first case is a fail
         if passed_count == len(test_cases):
             overall_status = 'pass'
         elif passed_count == 0:
             overall_status = 'fail'
         else:
             overall_status = 'partial'
-        return {
+        summary = {
             'test_case_results': results,
             'total_test_cases': len(test_cases),
             'passed_test_cases': passed_count,
+            'skipped_test_cases': skipped_count,
             'overall_status': overall_status,
             'total_execution_time': total_time,
-            'average_execution_time': total_time / len(test_cases) if test_cases else 0
-        } 
\ No newline at end of file
+            'average_execution_time': total_time / len(test_cases) if test_cases else 0,
+            'total_cpu_time': total_cpu_time,
+            'peak_memory_usage': peak_memory_usage
+        }
+        if cache_key is not None and self._is_cacheable(results):
+            self.cache.put(cache_key, test_set, summary)
+        return summary
+
+    def _is_cacheable(self, results: List[Dict[str, Any]]) -> bool:
+        """Timeouts and sandbox failures depend on server load, so never cache them."""
+        return not any(
+            result['error'] and result['error'].startswith(('Execution timed out', 'Execution error:'))
+            for result in results
+        )
+
+    async def run_all_test_cases_async(self, code: str, test_cases: list, function_name: str = "solution", fail_fast: bool = False,
+                                       bundle: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Awaitable version of run_all_test_cases for async routes.
+        The run happens on the executor thread pool so the event loop (and every
+        Socket.IO room on it) keeps serving while user code executes.
+        """
+        return await self._run_off_loop(self.run_all_test_cases, code, test_cases, function_name,
+                                        fail_fast=fail_fast, bundle=bundle)
+
+    async def stream_all_test_cases(self, code: str, test_cases: list, function_name: str = "solution", fail_fast: bool = False,
+                                    bundle: Optional[Dict[str, Any]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Run test cases off the event loop and yield each result as soon as it finishes.
+        Yields {'event': 'result', 'index': i, 'total': n, 'result': ...} per executed test
+        case, in completion order (parallel runs finish out of order), then a final
+        {'event': 'summary', 'summary': ...} holding what run_all_test_cases returns.
+        """
+        loop = asyncio.get_running_loop()
+        events: asyncio.Queue = asyncio.Queue()
+        total = len(test_cases)
+
+        def on_result(index: int, result: Dict[str, Any]):
+            loop.call_soon_threadsafe(events.put_nowait, {'event': 'result', 'index': index, 'total': total, 'result': result})
+
+        def run():
+            try:
+                return self.run_all_test_cases(code, test_cases, function_name, fail_fast=fail_fast,
+                                               on_result=on_result, bundle=bundle)
+            finally:
+                # Queued after every result, so the consumer sees them all first
+                loop.call_soon_threadsafe(events.put_nowait, None)
+
+        summary = loop.run_in_executor(_async_threads, run)
+        while True:
+            event = await events.get()
+            if event is None:
+                break
+            yield event
+        yield {'event': 'summary', 'summary': await summary}
+
+    async def execute_python_code_async(self, code: str, input_data: str = "") -> Dict[str, Any]:
+        """Awaitable version of execute_python_code for async routes."""
+        return await self._run_off_loop(self.execute_python_code, code, input_data)
+
+    async def _run_off_loop(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_async_threads, functools.partial(fn, *args, **kwargs))
@@ -0,0 +1,669 @@
+"""
+Sandbox harness for running user solutions.
+
+This file is executed directly by ``python3`` inside the sandbox, so it must
+not import anything from the ``app`` package. It supports two modes:
+
+    python3 harness.py <code_file> <function_name> [<metrics_fd>]   # one-shot run, input on stdin
+    python3 harness.py --script <code_file> [<metrics_fd>]          # plain script, no function call
+    python3 harness.py --zygote                                     # warm worker (see worker_pool.py)
+
+In zygote mode the process reads one JSON request per line from stdin, forks a
+fresh child for every request and writes one JSON response per line to stdout.
+The interpreter and this module are already loaded when the child is forked,
+so a run only pays for ``fork()`` instead of a full interpreter start.
+
+A request carrying ``inputs`` instead of ``input`` is a batch: the child
+compiles the user's code once and runs every input against a freshly executed
+copy of the module, so no module-level state carries over between inputs. Each
+input has its own wall-clock and CPU budget; a case that runs out of it is a
+timeout however the user's code reacted, and the remaining inputs run in a new
+child. An input is either the raw text or an argument list that was parsed
+ahead of time. With ``stream`` set, a ``{"index", "record"}`` line is written
+for every input as soon as it finishes, before the response. With
+``stop_on_fail`` and the canonical ``expected`` outputs, a batch stops after
+the first case that doesn't pass and its response only covers the inputs run.
+
+Children report records over a pipe that the user's code can also write to, so
+every record line carries a nonce the zygote picked for that child and the
+index of its input. A line that doesn't parse, carries the wrong nonce or index
+or doesn't have the record's fields fails the case it arrived during, and the
+child is killed.
+"""
+import sys
+import json
+import io
+import os
+import math
+import time
+import signal
+import selectors
+import types
+import traceback
+import resource
+
+EXCEPTION_MARKER = "__EXCEPTION__"
+
+# Output beyond this many bytes per stream is discarded by the zygote
+MAX_OUTPUT_BYTES = 8 * 1024 * 1024
+
+# Exit code of a batch child that stopped after a timed out case; the zygote
+# runs the remaining inputs in a new child
+BATCH_RESTART_EXIT = 75
+
+# Once a case's budget is spent, the timeout is raised again this often in case
+# the user's code swallows it (e.g. with a bare ``except:``)
+CASE_TIMEOUT_REPEAT_SECONDS = 0.05
+
+# Fields (and their types) of a batch record, of a single run's timings and of
+# a one-shot run's metrics
+RECORD_FIELDS = {
+    'returncode': int, 'stdout': str, 'stderr': str, 'timed_out': bool, 'time': float,
+    'function_time': (float, type(None)), 'cpu_time': float, 'peak_memory_mb': float
+}
+TIMING_FIELDS = {'function_time': (float, type(None))}
+METRICS_FIELDS = dict(TIMING_FIELDS, cpu_time=float, peak_memory_mb=float)
+
+# Environment variable carrying the nonce of a one-shot run's metrics
+NONCE_ENV = 'HARNESS_NONCE'
+
+
+def try_num(x):
+    try:
+        return int(x)
+    except:
+        try:
+            return float(x)
+        except:
+            return x
+
+
+def parse_input(input_str):
+    # Handle multi-line input (common for problems with multiple parameters)
+    lines = [line.strip() for line in input_str.strip().split('\n') if line.strip()]
+
+    if len(lines) == 0:
+        return []
+    elif len(lines) == 1:
+        # Single line - try to parse as JSON first, then as simple value
+        line = lines[0]
+        try:
+            return [json.loads(line)]
+        except:
+            return [try_num(line)]
+    else:
+        # Multiple lines - each line is a separate argument
+        args = []
+        for line in lines:
+            try:
+                args.append(json.loads(line))
+            except:
+                args.append(try_num(line))
+        return args
+
+
+def format_result(result):
+    """Render a function's return value the way the judge expects it on stdout."""
+    if result is None:
+        return ""
+    if isinstance(result, (str, int, float, bool)):
+        return str(result)
+    if isinstance(result, (list, dict)):
+        return json.dumps(result)
+    return str(result)
+
+
+def output_matches(actual_output, expected):
+    """
+    Compare a run's output with an expected output canonicalized by
+    case_bundle.canonicalize_output. Handles different data types and formats.
+    """
+    # Strip whitespace and normalize
+    actual = actual_output.strip()
+
+    # Direct comparison
+    if actual == expected['text']:
+        return True
+
+    # Handle multi-line outputs by comparing line by line
+    actual_lines = [line.strip() for line in actual.split('\n') if line.strip()]
+    expected_lines = expected['lines']
+
+    # If both have same number of lines, compare each line
+    if len(actual_lines) == len(expected_lines):
+        if all(line_matches(a_line, e_line) for a_line, e_line in zip(actual_lines, expected_lines)):
+            return True
+
+    # Try comparing the last line (function return value) if there are print statements
+    if actual_lines and expected_lines:
+        if line_matches(actual_lines[-1], expected_lines[-1]):
+            return True
+
+    # Fallback to single output comparison
+    return line_matches(actual, expected['whole'])
+
+
+def line_matches(actual, expected):
+    """Compare single line outputs with various type handling"""
+    # Direct comparison
+    if actual == expected['text']:
+        return True
+
+    # Try to parse as JSON for array/list comparisons
+    if 'json' in expected or expected.get('reparse'):
+        try:
+            actual_json = json.loads(actual)
+        except ValueError:
+            pass
+        else:
+            expected_json = expected['json'] if 'json' in expected else json.loads(expected['text'])
+            return actual_json == expected_json
+
+    # Try to parse as numbers
+    if 'number' in expected:
+        try:
+            actual_num = float(actual)
+        except ValueError:
+            pass
+        else:
+            if expected['number'] is None:
+                return False
+            return abs(actual_num - expected['number']) < 1e-9  # Small tolerance for floating point
+
+    # Try to parse as boolean
+    bool_map = {
+        'true': True, 'false': False,
+        'True': True, 'False': False,
+        '1': True, '0': False
+    }
+    if actual in bool_map and expected['text'] in bool_map:
+        return bool_map[actual] == bool_map[expected['text']]
+
+    # Handle list/array string representations
+    # Remove brackets and spaces, then compare as comma-separated values
+    actual_clean = actual.replace('[', '').replace(']', '').replace(' ', '')
+    return actual_clean == expected['clean']
+
+
+def record_passed(record, expected):
+    """Whether a batch record ran cleanly and its output matches the canonical ``expected``."""
+    return record['returncode'] == 0 and not record['timed_out'] and output_matches(record['stdout'], expected)
+
+
+class CaseTimeout(BaseException):
+    """Raised inside a batch child when a test case exceeds its time budget."""
+
+
+def load_solution(code):
+    """Execute user code (source or a compiled code object) as ``__main__`` and return its namespace."""
+    # User code historically ran in a module that already imported sys and json
+    namespace = {'__name__': '__main__', '__builtins__': __builtins__, 'sys': sys, 'json': json}
+    exec(code if isinstance(code, types.CodeType) else compile(code, '<solution>', 'exec'), namespace)
+    return namespace
+
+
+def _print_user_traceback(error, filename='<solution>'):
+    # Skip the harness frames so the traceback only shows the user's code
+    tb = error.__traceback__
+    while tb is not None and tb.tb_frame.f_code.co_filename != filename:
+        tb = tb.tb_next
+    traceback.print_exception(type(error), error, tb)
+
+
+def call_solution(namespace, function_name, input_str, timings=None):
+    """
+    Call ``function_name`` from a loaded namespace with the parsed input.
+    ``input_str`` may also be an argument list parsed ahead of time (see case_bundle.py).
+
+    Prints the result to stdout and errors (prefixed with EXCEPTION_MARKER) to
+    stderr. Returns the process exit code. When ``timings`` is given, the time
+    spent inside the user's function alone is stored in ``timings['function_time']``.
+    """
+    if isinstance(input_str, list):
+        args = input_str
+    else:
+        args = parse_input(input_str) if input_str.strip() else []
+    if not isinstance(args, list):
+        args = [args]
+
+    try:
+        if function_name not in namespace:
+            print(f"{EXCEPTION_MARKER}Function '{function_name}' is not defined. Make sure you have a function named '{function_name}' in your code.", file=sys.stderr)
+            return 1
+        started = time.perf_counter()
+        try:
+            result = namespace[function_name](*args)
+        finally:
+            if timings is not None:
+                timings['function_time'] = time.perf_counter() - started
+        print(format_result(result))
+    except TypeError as error:
+        if "takes" in str(error) and "positional argument" in str(error):
+            print(f"{EXCEPTION_MARKER}Function signature mismatch. Check that your solution function accepts the correct number of parameters for the given input.", file=sys.stderr)
+        else:
+            print(EXCEPTION_MARKER + str(error), file=sys.stderr)
+        return 1
+    except Exception as error:
+        print(EXCEPTION_MARKER + str(error), file=sys.stderr)
+        return 1
+    return 0
+
+
+def run_solution(code, function_name, input_str, timings=None):
+    """Load user code and call ``function_name`` once. Returns the process exit code."""
+    try:
+        namespace = load_solution(code)
+    except (SystemExit, KeyboardInterrupt, CaseTimeout):
+        raise
+    except BaseException as error:
+        _print_user_traceback(error)
+        return 1
+    return call_solution(namespace, function_name, input_str, timings)
+
+
+def run_script(path):
+    """Run a plain script as ``__main__``, like ``python3 <path>`` would. Returns the exit code."""
+    with open(path, 'r') as script_file:
+        source = script_file.read()
+    namespace = {'__name__': '__main__', '__file__': path, '__builtins__': __builtins__}
+    try:
+        exec(compile(source, path, 'exec'), namespace)
+    except (SystemExit, KeyboardInterrupt):
+        raise
+    except BaseException as error:
+        _print_user_traceback(error, path)
+        return 1
+    return 0
+
+
+def usage_snapshot():
+    """CPU seconds (user+sys) used so far and peak RSS in MB for this process."""
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime, usage.ru_maxrss / 1024.0
+
+
+_case_timer = {'fired': False}
+
+
+def _raise_case_timeout(signum, frame):
+    _case_timer['fired'] = True
+    raise CaseTimeout()
+
+
+def _arm_case_timers(timeout):
+    # Wall-clock and CPU (user+sys) budgets for a single test case
+    _case_timer['fired'] = False
+    signal.setitimer(signal.ITIMER_REAL, timeout, CASE_TIMEOUT_REPEAT_SECONDS)
+    signal.setitimer(signal.ITIMER_PROF, timeout, CASE_TIMEOUT_REPEAT_SECONDS)
+
+
+def _disarm_case_timers():
+    signal.setitimer(signal.ITIMER_REAL, 0)
+    signal.setitimer(signal.ITIMER_PROF, 0)
+
+
+def _run_captured(fn, timeout):
+    """
+    Run ``fn(timings)`` with stdout/stderr captured and the per-case timers armed.
+    Returns a result record with returncode, stdout, stderr, timed_out, time,
+    function_time, cpu_time and peak_memory_mb.
+    """
+    real_stdout, real_stderr = sys.stdout, sys.stderr
+    out, err = io.StringIO(), io.StringIO()
+    sys.stdout, sys.stderr = out, err
+    timings = {}
+    timed_out = False
+    cpu_before, _ = usage_snapshot()
+    started = time.perf_counter()
+    try:
+        try:
+            _arm_case_timers(timeout)
+            returncode = fn(timings)
+        finally:
+            _disarm_case_timers()
+    except CaseTimeout:
+        timed_out = True
+        returncode = 1
+    except SystemExit as error:
+        returncode = _exit_code(error)
+    except BaseException as error:
+        _print_user_traceback(error)
+        returncode = 1
+    finally:
+        sys.stdout, sys.stderr = real_stdout, real_stderr
+    if _case_timer['fired']:
+        # Even if the user's code caught the timeout and went on to return
+        timed_out = True
+        returncode = 1
+    elapsed = time.perf_counter() - started
+    cpu_after, peak_memory_mb = usage_snapshot()
+    return {
+        'returncode': returncode,
+        'stdout': out.getvalue(),
+        'stderr': err.getvalue(),
+        'timed_out': timed_out,
+        'time': elapsed,
+        'function_time': timings.get('function_time'),
+        'cpu_time': cpu_after - cpu_before,
+        # The process high-water mark, which includes the interpreter itself
+        'peak_memory_mb': peak_memory_mb
+    }
+
+
+def run_batch(code, function_name, inputs, timeout, result_fd, expected=None, nonce=None):
+    """
+    Compile user code once and call ``function_name`` for every input.
+
+    Every input gets a fresh copy of the module, like a one-shot run, and its
+    own wall-clock and CPU budget of ``timeout`` seconds, which also covers
+    executing the module. One JSON record per input is written to ``result_fd``
+    as soon as it finishes, signed with ``nonce``. With ``expected`` (canonical
+    expected outputs matching inputs) the batch stops after the first case that
+    doesn't pass.
+    Returns:
+        0, or BATCH_RESTART_EXIT if a case timed out before the last input
+    """
+    signal.signal(signal.SIGALRM, _raise_case_timeout)
+    signal.signal(signal.SIGPROF, _raise_case_timeout)
+
+    try:
+        compiled = compile(code, '<solution>', 'exec')
+    except Exception:
+        # Every case reports the error, the way each one-shot run would
+        compiled = code
+
+    for index, input_str in enumerate(inputs):
+        record = _run_captured(
+            lambda timings: run_solution(compiled, function_name, input_str, timings), timeout)
+        _write_all(result_fd, record_line(nonce, index, record))
+        if expected is not None and not record_passed(record, expected[index]):
+            return 0
+        if record['timed_out'] and index + 1 < len(inputs):
+            # Whatever the timed out case left running dies with this child
+            return BATCH_RESTART_EXIT
+    return 0
+
+
+def record_line(nonce, index, record):
+    """Encode a result record for the pipe it is reported over."""
+    return (json.dumps({'nonce': nonce, 'index': index, 'record': record}) + "\n").encode('utf-8')
+
+
+def parse_record(line, nonce, index, fields):
+    """
+    Decode a line written by record_line.
+    Returns the record, or None unless the line carries ``nonce``, ``index``
+    and a record with exactly ``fields`` (a name -> type mapping).
+    """
+    try:
+        message = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(message, dict) or message.get('nonce') != nonce or message.get('index') != index:
+        return None
+    record = message.get('record')
+    if not isinstance(record, dict) or set(record) != set(fields):
+        return None
+    for name, kind in fields.items():
+        value = record[name]
+        # JSON turns whole floats into ints and bools are ints too
+        if kind is float or (isinstance(kind, tuple) and float in kind):
+            if isinstance(value, int) and not isinstance(value, bool):
+                value = record[name] = float(value)
+        if kind is int and isinstance(value, bool):
+            return None
+        if not isinstance(value, kind):
+            return None
+    return record
+
+
+def _invalid_record():
+    return {
+        'returncode': 1,
+        'stdout': '',
+        'stderr': 'The solution wrote to the sandbox result channel',
+        'timed_out': False,
+        'time': 0.0,
+        'function_time': None,
+        'cpu_time': 0.0,
+        'peak_memory_mb': 0.0,
+        'invalid': True
+    }
+
+
+def _exit_code(error):
+    """Translate a SystemExit into a process exit code like the interpreter does."""
+    if error.code is None:
+        return 0
+    if isinstance(error.code, int):
+        return error.code
+    print(error.code, file=sys.stderr)
+    return 1
+
+
+def _write_all(fd, data):
+    while data:
+        written = os.write(fd, data)
+        data = data[written:]
+
+
+def _run_child(request, out_w, err_w, result_w, close_fds, nonce):
+    """Body of a forked child. Never returns."""
+    code = 1
+    try:
+        os.setpgid(0, 0)
+        os.dup2(out_w, 1)
+        os.dup2(err_w, 2)
+        for fd in (out_w, err_w) + close_fds:
+            os.close(fd)
+        signal.signal(signal.SIGPIPE, signal.SIG_DFL)
+        timeout = request.get('timeout', 5)
+        inputs = request.get('inputs')
+        try:
+            # Backstop for the whole child; batches also get per-case budgets
+            cpu_seconds = int(math.ceil(timeout)) * (len(inputs) + 1 if inputs is not None else 1) + 1
+            resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+        except (ValueError, OSError):
+            pass
+        if inputs is not None:
+            expected = request['expected'] if request.get('stop_on_fail') else None
+            code = run_batch(request['code'], request['function_name'], inputs, timeout, result_w, expected, nonce)
+        else:
+            timings = {}
+            try:
+                code = run_solution(request['code'], request['function_name'], request.get('input', ''), timings)
+            finally:
+                _write_all(result_w, record_line(nonce, 0, {'function_time': timings.get('function_time')}))
+    except SystemExit as error:
+        code = _exit_code(error)
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        except BaseException:
+            pass
+        os._exit(code)
+
+
+def _collect(pid, out_r, err_r, result_r, timeout, nonce, fields, on_record=None):
+    """
+    Read a child's output until it closes its pipes or the deadline passes.
+
+    Records written to ``result_r`` (batch results, or the timings of a single
+    run) are parsed as they arrive, passed to ``on_record`` if given, and every
+    record pushes the deadline out by another ``timeout``. A line that isn't a
+    record signed with ``nonce`` (see parse_record) becomes a failed record
+    marked ``invalid`` and the child is killed. CPU time and peak RSS come from
+    the child's rusage. Returns (response, records).
+    """
+    buffers = {out_r: bytearray(), err_r: bytearray(), result_r: bytearray()}
+    readers = [out_r, err_r, result_r]
+    records = []
+    selector = selectors.DefaultSelector()
+    for fd in readers:
+        selector.register(fd, selectors.EVENT_READ)
+    deadline = time.monotonic() + timeout
+    timed_out = False
+    tampered = False
+    open_fds = len(readers)
+    while open_fds and not tampered:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            timed_out = True
+            break
+        for key, _ in selector.select(remaining):
+            chunk = os.read(key.fd, 65536)
+            if not chunk:
+                selector.unregister(key.fd)
+                open_fds -= 1
+            elif key.fd == result_r:
+                buffers[result_r] += chunk
+                while b"\n" in buffers[result_r] and not tampered:
+                    line, _, rest = bytes(buffers[result_r]).partition(b"\n")
+                    buffers[result_r] = bytearray(rest)
+                    record = parse_record(line, nonce, len(records), fields)
+                    if record is None:
+                        record = _invalid_record()
+                        tampered = True
+                    records.append(record)
+                    if on_record:
+                        on_record(record)
+                    deadline = time.monotonic() + timeout
+            elif len(buffers[key.fd]) < MAX_OUTPUT_BYTES:
+                buffers[key.fd] += chunk
+    selector.close()
+    if timed_out or tampered:
+        # The child runs in its own process group so grandchildren die too
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except OSError:
+            pass
+    _, status, usage = os.wait4(pid, 0)
+    for fd in readers:
+        os.close(fd)
+    returncode = os.waitstatus_to_exitcode(status)
+    response = {
+        'returncode': returncode,
+        'stdout': buffers[out_r].decode('utf-8', errors='replace'),
+        'stderr': buffers[err_r].decode('utf-8', errors='replace'),
+        # Hitting RLIMIT_CPU is a timeout as far as the user is concerned
+        'timed_out': timed_out or returncode == -signal.SIGXCPU,
+        'cpu_time': usage.ru_utime + usage.ru_stime,
+        'peak_memory_mb': usage.ru_maxrss / 1024.0
+    }
+    return response, records
+
+
+def _fork_child(request, proto_fds, on_record=None):
+    out_r, out_w = os.pipe()
+    err_r, err_w = os.pipe()
+    result_r, result_w = os.pipe()
+    nonce = os.urandom(16).hex()
+    pid = os.fork()
+    if pid == 0:
+        _run_child(request, out_w, err_w, result_w, (out_r, err_r, result_r) + proto_fds, nonce)
+    os.close(out_w)
+    os.close(err_w)
+    os.close(result_w)
+    fields = RECORD_FIELDS if 'inputs' in request else TIMING_FIELDS
+    return _collect(pid, out_r, err_r, result_r, request.get('timeout', 5), nonce, fields, on_record)
+
+
+def _serve_batch(request, proto_fds, on_result=None):
+    """
+    Run every input of a batch request, re-forking past any case that kills the child.
+    ``on_result(index, record)`` is called as soon as each input's record is known.
+    With ``stop_on_fail`` the inputs after the first failing case are left out.
+    """
+    inputs = request['inputs']
+    expected = request['expected'] if request.get('stop_on_fail') else None
+    results = []
+
+    def add(record):
+        if len(results) < len(inputs):
+            results.append(record)
+            if on_result:
+                on_result(len(results) - 1, record)
+
+    def stopped():
+        return expected is not None and bool(results) and not record_passed(results[-1], expected[len(results) - 1])
+
+    while len(results) < len(inputs) and not stopped():
+        before = len(results)
+        remaining = dict(request, inputs=inputs[len(results):])
+        if expected is not None:
+            remaining['expected'] = expected[len(results):]
+        response, _ = _fork_child(remaining, proto_fds, add)
+        # A child that stopped itself after a timed out case, or was killed for
+        # a bad record, has nothing to charge
+        restarted = len(results) > before and (
+            response['returncode'] == BATCH_RESTART_EXIT and results[-1]['timed_out'] or results[-1].get('invalid'))
+        if len(results) < len(inputs) and not restarted and not stopped():
+            # The child died on the case it was running; charge that case with it
+            response['time'] = request.get('timeout', 5) if response['timed_out'] else 0.0
+            add(response)
+    return {'results': results}
+
+
+def serve_zygote():
+    """Fork one child per request read from stdin until stdin is closed."""
+    # Keep private copies of the protocol pipes and point fds 0/1 elsewhere so
+    # nothing a child (or this process) prints can corrupt the protocol stream.
+    proto_in = os.dup(0)
+    proto_out = os.dup(1)
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+    os.close(devnull)
+
+    with os.fdopen(proto_in, 'rb') as requests:
+        for line in requests:
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            if 'inputs' in request:
+                on_result = None
+                if request.get('stream'):
+                    # Send each record ahead of the final response as it finishes
+                    def on_result(index, record):
+                        _write_all(proto_out, (json.dumps({'index': index, 'record': record}) + "\n").encode('utf-8'))
+                response = _serve_batch(request, (proto_in, proto_out), on_result)
+            else:
+                response, records = _fork_child(request, (proto_in, proto_out))
+                if records and records[0].get('invalid'):
+                    response.update(returncode=1, stderr=records[0]['stderr'])
+                response['function_time'] = records[0].get('function_time') if records else None
+            _write_all(proto_out, (json.dumps(response) + "\n").encode('utf-8'))
+
+
+def main(argv):
+    if len(argv) == 2 and argv[1] == '--zygote':
+        serve_zygote()
+        return 0
+    if len(argv) not in (3, 4):
+        print("usage: harness.py <code_file> <function_name> [<metrics_fd>] | --script <code_file> [<metrics_fd>] | --zygote", file=sys.stderr)
+        return 2
+    metrics_fd = int(argv[3]) if len(argv) == 4 else None
+    # Out of the environment the user's code sees
+    nonce = os.environ.pop(NONCE_ENV, None)
+    timings = {}
+    try:
+        if argv[1] == '--script':
+            return run_script(argv[2])
+        with open(argv[1], 'r') as code_file:
+            code = code_file.read()
+        input_str = sys.stdin.read()
+        return run_solution(code, argv[2], input_str, timings)
+    finally:
+        if metrics_fd is not None:
+            # Report our own usage since the parent can't get rusage from Popen
+            cpu_time, peak_memory_mb = usage_snapshot()
+            metrics = {'function_time': timings.get('function_time'), 'cpu_time': cpu_time, 'peak_memory_mb': peak_memory_mb}
+            _write_all(metrics_fd, record_line(nonce, 0, metrics))
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,224 @@
+"""
+Bounded job queue for code execution.
+
+Requests enqueue a job and either await it or poll its status, while a fixed
+number of worker threads drain the queue. Each worker runs at most one job at
+a time on top of the sandbox worker pool, so the number of concurrent user
+programs stays bounded no matter how many requests arrive. When the queue is
+full, ``submit`` raises QueueFullError and the route answers 429.
+
+Jobs are described by a handler name plus a JSON-serializable payload, so the
+in-process broker can be swapped for one backed by SQLite, Redis, etc. A
+broker only needs ``put_nowait(job_id)`` (raising ``queue.Full``),
+``get(timeout)`` (raising ``queue.Empty``) and ``qsize()``.
+"""
+import os
+import uuid
+import queue
+import asyncio
+import threading
+import datetime
+from typing import Dict, Any, Callable, List, Optional
+
+QUEUE_WORKERS = int(os.getenv("EXECUTION_QUEUE_WORKERS", str(os.cpu_count() or 2)))
+QUEUE_MAX_PENDING = int(os.getenv("EXECUTION_QUEUE_MAX_PENDING", "100"))
+JOB_TTL_SECONDS = int(os.getenv("EXECUTION_JOB_TTL_SECONDS", "600"))
+
+
+class QueueFullError(Exception):
+    """Raised when the queue can't accept more jobs."""
+
+
+class InProcessBroker:
+    def __init__(self, max_pending: int):
+        self._queue = queue.Queue(maxsize=max_pending)
+
+    def put_nowait(self, job_id: str):
+        self._queue.put_nowait(job_id)
+
+    def get(self, timeout: Optional[float] = None) -> str:
+        return self._queue.get(timeout=timeout)
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+
+class Job:
+    def __init__(self, kind: str, payload: Dict[str, Any], user_id: Optional[int] = None, total: int = 0):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.payload = payload
+        self.user_id = user_id
+        self.status = 'queued'  # queued, running, completed, failed
+        self.total = total
+        self.completed = 0
+        self.result = None
+        self.error = None
+        self.status_code = None
+        self.created_at = datetime.datetime.utcnow()
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[['Job', str, Dict[str, Any]], None]] = []
+        self._waiters = []
+
+    def add_listener(self, listener: Callable[['Job', str, Dict[str, Any]], None]):
+        """Register a callback for job events ('progress', 'completed', 'failed')."""
+        self._listeners.append(listener)
+
+    def _notify(self, event: str, data: Dict[str, Any]):
+        for listener in self._listeners:
+            try:
+                listener(self, event, data)
+            except Exception as e:
+                print(f"⚠️ Job listener failed for {self.id}: {e}")
+
+    def report_progress(self, index: int, test_case_result: Dict[str, Any]):
+        """Record one finished test case and tell listeners about it."""
+        with self._lock:
+            self.completed += 1
+            completed = self.completed
+        self._notify('progress', {
+            'job_id': self.id,
+            'index': index,
+            'completed': completed,
+            'total': self.total,
+            'result': test_case_result
+        })
+
+    def _finish(self, status: str, result=None, error: Optional[str] = None, status_code: Optional[int] = None):
+        with self._lock:
+            self.status = status
+            self.result = result
+            self.error = error
+            self.status_code = status_code
+            self.finished_at = datetime.datetime.utcnow()
+            waiters, self._waiters = self._waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(lambda f=future: f.done() or f.set_result(None))
+        self._notify(status, {'job_id': self.id, 'status': status, 'error': error})
+
+    @property
+    def done(self) -> bool:
+        return self.status in ('completed', 'failed')
+
+    async def wait(self):
+        """Wait for the job to finish without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self.done:
+                return
+            future = loop.create_future()
+            self._waiters.append((loop, future))
+        await future
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'job_id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'completed_test_cases': self.completed,
+            'total_test_cases': self.total,
+            'error': self.error,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+class JobQueue:
+    def __init__(self, workers: int = QUEUE_WORKERS, max_pending: int = QUEUE_MAX_PENDING, broker=None):
+        self.workers = max(1, workers)
+        self.broker = broker or InProcessBroker(max_pending)
+        self._handlers: Dict[str, Callable[[Job], Any]] = {}
+        self._jobs: Dict[str, Job] = {}
+        self._jobs_lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self._running = 0
+        self._started = False
+
+    def register_handler(self, kind: str, handler: Callable[[Job], Any]):
+        """Handlers receive the Job and return its result; raising marks the job failed."""
+        self._handlers[kind] = handler
+
+    def _start(self):
+        with self._jobs_lock:
+            if self._started:
+                return
+            self._started = True
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker_loop, name=f"execution-queue-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, kind: str, payload: Dict[str, Any], user_id: Optional[int] = None, total: int = 0,
+               listener: Optional[Callable[[Job, str, Dict[str, Any]], None]] = None) -> Job:
+        """Enqueue a job. Raises QueueFullError when saturated."""
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for job kind '{kind}'")
+        self._start()
+        self._prune()
+        job = Job(kind, payload, user_id=user_id, total=total)
+        if listener:
+            job.add_listener(listener)
+        with self._jobs_lock:
+            self._jobs[job.id] = job
+        try:
+            self.broker.put_nowait(job.id)
+        except queue.Full:
+            with self._jobs_lock:
+                self._jobs.pop(job.id, None)
+            raise QueueFullError("Execution queue is full")
+        return job
+
+    def get_job(self, job_id: str) -> Optional[Job]:
+        with self._jobs_lock:
+            return self._jobs.get(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'workers': self.workers,
+            'running': self._running,
+            'pending': self.broker.qsize(),
+            'tracked_jobs': len(self._jobs)
+        }
+
+    def _prune(self):
+        cutoff = datetime.datetime.utcnow() - datetime.timedelta(seconds=JOB_TTL_SECONDS)
+        with self._jobs_lock:
+            expired = [job_id for job_id, job in self._jobs.items() if job.done and job.finished_at < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+    def _worker_loop(self):
+        while True:
+            job_id = self.broker.get()
+            job = self.get_job(job_id)
+            if job is None:
+                continue
+            with self._jobs_lock:
+                self._running += 1
+            job.status = 'running'
+            job.started_at = datetime.datetime.utcnow()
+            try:
+                result = self._handlers[job.kind](job)
+            except Exception as e:
+                job._finish('failed', error=getattr(e, 'detail', None) or str(e), status_code=getattr(e, 'status_code', 500))
+            else:
+                job._finish('completed', result=result)
+            finally:
+                with self._jobs_lock:
+                    self._running -= 1
+
+
+_job_queue: Optional[JobQueue] = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """Return the shared execution queue, creating it on first use."""
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue()
+        return _job_queue
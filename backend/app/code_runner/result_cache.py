@@ -0,0 +1,100 @@
+"""
+Content-addressed cache for run_all_test_cases results.
+
+Entries are keyed by a hash of the normalized code, the function name, the
+test-case set and the executor limits, so re-running unchanged code (or a
+room member running the same shared code) skips execution entirely. A change
+to a problem's test cases changes the key, and update_problem additionally
+drops the old entries through invalidate_test_set.
+"""
+import os
+import copy
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Set
+
+CACHE_MAX_ENTRIES = int(os.getenv("EXECUTION_CACHE_MAX_ENTRIES", "1024"))
+CACHE_TTL_SECONDS = int(os.getenv("EXECUTION_CACHE_TTL_SECONDS", "600"))
+
+
+def normalize_code(code: str) -> str:
+    """Ignore line endings and trailing whitespace, which never change behaviour."""
+    return "\n".join(line.rstrip() for line in code.replace('\r\n', '\n').split('\n')).strip()
+
+
+def test_set_digest(test_cases: List[Dict[str, Any]]) -> str:
+    """Version of a test-case set: a hash of every input and expected output in order."""
+    data = json.dumps([[tc['input'], tc['output']] for tc in test_cases])
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl_seconds: int = CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, digest, value)
+        self._keys_by_test_set: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def make_key(self, code: str, function_name: str, test_cases: List[Dict[str, Any]], **options) -> tuple:
+        """Return (key, test set digest) for a run; options are executor settings that affect results."""
+        digest = test_set_digest(test_cases)
+        data = json.dumps([normalize_code(code), function_name, digest, sorted(options.items())])
+        return hashlib.sha256(data.encode('utf-8')).hexdigest(), digest
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            value = entry[2]
+        # Callers are free to mutate what they get back
+        return copy.deepcopy(value)
+
+    def put(self, key: str, digest: str, value: Dict[str, Any]):
+        value = copy.deepcopy(value)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, digest, value)
+            self._keys_by_test_set.setdefault(digest, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_test_set(self, digest: str) -> int:
+        """Drop every entry computed against a test-case set. Returns how many were dropped."""
+        with self._lock:
+            keys = list(self._keys_by_test_set.get(digest, ()))
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_test_set.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+    def _remove(self, key: str):
+        # Caller must hold self._lock
+        _, digest, _ = self._entries.pop(key)
+        keys = self._keys_by_test_set.get(digest)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_test_set[digest]
+
+
+execution_cache = ResultCache()
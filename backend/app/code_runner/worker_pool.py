@@ -0,0 +1,270 @@
+"""
+Pool of pre-warmed sandbox workers for the code executor.
+
+Each worker is a long-lived ``python3 harness.py --zygote`` process started
+under the same resource limits as a one-shot run. The zygote has the harness
+already imported and forks a fresh child per request, so user code never runs
+in the zygote itself and every run starts from a clean interpreter state.
+Workers are recycled after ``max_runs`` requests, after a timeout or a crash,
+and whenever they stop answering.
+"""
+import os
+import json
+import time
+import atexit
+import select
+import signal
+import platform
+import threading
+import subprocess
+from typing import Dict, Any, Callable, List, Optional
+import resource
+
+HARNESS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'harness.py')
+
+POOL_ENABLED = os.getenv("EXECUTOR_POOL_ENABLED", "true").lower() == "true"
+POOL_SIZE = int(os.getenv("EXECUTOR_POOL_SIZE", str(os.cpu_count() or 2)))
+WORKER_MAX_RUNS = int(os.getenv("EXECUTOR_WORKER_MAX_RUNS", "100"))
+
+# Extra time the zygote gets to report back after the child's own timeout
+RESPONSE_GRACE_SECONDS = 2.0
+
+
+class WorkerError(Exception):
+    """Raised when a sandbox worker dies or stops responding."""
+
+
+class SandboxWorker:
+    def __init__(self, memory_limit_mb: int):
+        self.memory_limit_mb = memory_limit_mb
+        self.runs = 0
+        self._buffer = b""
+
+        def limit_memory():
+            resource.setrlimit(resource.RLIMIT_AS, (self.memory_limit_mb * 1024 * 1024, -1))
+
+        use_preexec = platform.system() == 'Linux'
+        self.process = subprocess.Popen(
+            ['python3', HARNESS_PATH, '--zygote'],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            bufsize=0,
+            start_new_session=True,
+            preexec_fn=limit_memory if use_preexec else None
+        )
+
+    def run(self, code: str, function_name: str, input_args: str, timeout: float) -> Dict[str, Any]:
+        """
+        Run one request in a forked child of this worker.
+        Returns a dict with returncode, stdout, stderr and timed_out.
+        """
+        return self._request({
+            'code': code,
+            'function_name': function_name,
+            'input': input_args,
+            'timeout': timeout
+        }, timeout + RESPONSE_GRACE_SECONDS)
+
+    def run_batch(self, code: str, function_name: str, inputs: List[str], timeout: float,
+                  on_record: Optional[Callable[[int, Dict[str, Any]], None]] = None,
+                  expected: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+        """
+        Load the code once in a forked child and call the function for every input.
+        Returns one dict per input with returncode, stdout, stderr, timed_out and time.
+        on_record(index, record) is called for each input as soon as it finishes.
+        With expected (canonical expected outputs matching inputs) the batch stops
+        after the first failing case and only the inputs run up to it are returned.
+        """
+        payload = {
+            'code': code,
+            'function_name': function_name,
+            'inputs': inputs,
+            'timeout': timeout
+        }
+        if expected is not None:
+            payload['stop_on_fail'] = True
+            payload['expected'] = expected
+        if on_record is None:
+            return self._request(payload, (timeout + RESPONSE_GRACE_SECONDS) * (len(inputs) + 1))['results']
+        payload['stream'] = True
+        self._send(payload)
+        deadline = time.monotonic() + (timeout + RESPONSE_GRACE_SECONDS) * (len(inputs) + 1)
+        while True:
+            message = self._receive(deadline - time.monotonic())
+            if 'results' in message:
+                self.runs += 1
+                return message['results']
+            on_record(message['index'], message['record'])
+
+    def _request(self, payload: Dict[str, Any], response_timeout: float) -> Dict[str, Any]:
+        self._send(payload)
+        response = self._receive(response_timeout)
+        self.runs += 1
+        return response
+
+    def _send(self, payload: Dict[str, Any]):
+        try:
+            data = (json.dumps(payload) + "\n").encode('utf-8')
+            fd = self.process.stdin.fileno()
+            while data:
+                written = os.write(fd, data)
+                data = data[written:]
+        except OSError as e:
+            raise WorkerError(f"Sandbox worker is not accepting requests: {e}")
+
+    def _receive(self, timeout: float) -> Dict[str, Any]:
+        line = self._read_line(timeout)
+        try:
+            return json.loads(line)
+        except ValueError as e:
+            raise WorkerError(f"Sandbox worker sent an invalid response: {e}")
+
+    def _read_line(self, timeout: float) -> bytes:
+        fd = self.process.stdout.fileno()
+        deadline = time.monotonic() + timeout
+        while b"\n" not in self._buffer:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise WorkerError("Sandbox worker did not respond in time")
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if ready:
+                chunk = os.read(fd, 65536)
+                if not chunk:
+                    raise WorkerError("Sandbox worker exited unexpectedly")
+                self._buffer += chunk
+        line, self._buffer = self._buffer.split(b"\n", 1)
+        return line
+
+    def is_alive(self) -> bool:
+        return self.process.poll() is None
+
+    def close(self):
+        """Kill the worker and anything left in its process group."""
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except OSError:
+            pass
+        try:
+            self.process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            pass
+        for stream in (self.process.stdin, self.process.stdout):
+            try:
+                stream.close()
+            except OSError:
+                pass
+
+
+class WorkerPool:
+    def __init__(self, size: int, memory_limit_mb: int, max_runs: int = WORKER_MAX_RUNS):
+        self.size = max(1, size)
+        self.memory_limit_mb = memory_limit_mb
+        self.max_runs = max_runs
+        self._cond = threading.Condition()
+        self._idle: List[SandboxWorker] = []
+        self._live = 0
+        self._closed = False
+
+    def warm(self):
+        """Start workers until the pool is full so the first requests don't pay for startup."""
+        with self._cond:
+            while not self._closed and self._live < self.size:
+                self._idle.append(self._spawn())
+            self._cond.notify_all()
+
+    def _spawn(self) -> SandboxWorker:
+        # Caller must hold self._cond
+        worker = SandboxWorker(self.memory_limit_mb)
+        self._live += 1
+        return worker
+
+    def _checkout(self) -> SandboxWorker:
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise WorkerError("Worker pool is closed")
+                if self._idle:
+                    return self._idle.pop()
+                if self._live < self.size:
+                    return self._spawn()
+                self._cond.wait()
+
+    def _checkin(self, worker: SandboxWorker, recycle: bool):
+        with self._cond:
+            if self._closed or recycle or worker.runs >= self.max_runs or not worker.is_alive():
+                worker.close()
+                self._live -= 1
+                if not self._closed:
+                    # Replace it right away so the new zygote warms up while idle
+                    try:
+                        self._idle.append(self._spawn())
+                    except OSError as e:
+                        print(f"⚠️ Could not start replacement sandbox worker: {e}")
+            else:
+                self._idle.append(worker)
+            self._cond.notify()
+
+    def run(self, code: str, function_name: str, input_args: str, timeout: float) -> Dict[str, Any]:
+        """Run a request on an idle worker, blocking until one is available."""
+        worker = self._checkout()
+        recycle = True
+        try:
+            response = worker.run(code, function_name, input_args, timeout)
+            recycle = response['timed_out'] or response['returncode'] < 0
+            return response
+        finally:
+            self._checkin(worker, recycle)
+
+    def run_batch(self, code: str, function_name: str, inputs: List[str], timeout: float,
+                  on_record: Optional[Callable[[int, Dict[str, Any]], None]] = None,
+                  expected: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+        """Run a whole batch of inputs on one idle worker."""
+        worker = self._checkout()
+        recycle = True
+        try:
+            results = worker.run_batch(code, function_name, inputs, timeout, on_record, expected)
+            recycle = any(r['timed_out'] or r['returncode'] < 0 for r in results)
+            return results
+        finally:
+            self._checkin(worker, recycle)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            for worker in self._idle:
+                worker.close()
+            self._live -= len(self._idle)
+            self._idle = []
+            self._cond.notify_all()
+
+
+_pools: Dict[int, WorkerPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_worker_pool(memory_limit_mb: int) -> Optional[WorkerPool]:
+    """
+    Return the shared pool for a memory limit, creating and warming it on first use.
+    Returns None when pooling is disabled or the platform can't fork.
+    """
+    if not POOL_ENABLED or not hasattr(os, 'fork'):
+        return None
+    with _pools_lock:
+        pool = _pools.get(memory_limit_mb)
+        if pool is None:
+            pool = WorkerPool(POOL_SIZE, memory_limit_mb)
+            _pools[memory_limit_mb] = pool
+    try:
+        pool.warm()
+    except OSError as e:
+        print(f"⚠️ Could not pre-warm sandbox workers: {e}")
+    return pool
+
+
+@atexit.register
+def shutdown_worker_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
@@ -83,4 +83,11 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         print(f"Unexpected error in get_current_user: {e}")
         import traceback
         traceback.print_exc()
-        raise credentials_exception 
\ No newline at end of file
+        raise credentials_exception
+
+def get_optional_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    """Like get_current_user, but an invalid or expired token counts as anonymous (None) instead of a 401."""
+    try:
+        return get_current_user(token, db)
+    except HTTPException:
+        return None
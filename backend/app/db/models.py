@@ -71,6 +71,14 @@ class Submission(Base):
     user = relationship("User", back_populates="submissions")
     problem = relationship("Problem", back_populates="submissions")
 
+    # Indexes matched to the hot query shapes
+    __table_args__ = (
+        sa.Index('ix_submissions_user_status_problem', 'user_id', 'overall_status', 'problem_id'),  # Solves per user, streaks
+        sa.Index('ix_submissions_user_problem_time', 'user_id', 'problem_id', 'submission_time'),  # A user's attempts at a problem
+        sa.Index('ix_submissions_problem_status', 'problem_id', 'overall_status'),  # Acceptance rates
+        sa.Index('ix_submissions_time_user', 'submission_time', 'user_id'),  # Recent activity
+    )
+
 RoomParticipant = Table(
     "room_participants",
     Base.metadata,
@@ -87,6 +95,15 @@ class Room(Base):
     participants = relationship("User", secondary=RoomParticipant, backref="rooms")
     problem = relationship("Problem")
 
+class ProblemTestBundle(Base):
+    """Precompiled test cases of a problem (see code_runner/case_bundle.py)"""
+    __tablename__ = "problem_test_bundles"
+    problem_id = Column(Integer, ForeignKey("problems.id", ondelete="CASCADE"), primary_key=True)
+    format = Column(Integer, nullable=False)
+    digest = Column(String(64), nullable=False)  # test_set_digest of the cases it was built from
+    bundle = Column(JSON, nullable=False)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
 class TestCase(Base):
     __tablename__ = "test_cases"
     id = Column(Integer, primary_key=True, index=True)
@@ -108,6 +125,7 @@ class Bookmark(Base):
     # Ensure unique bookmark pairs
     __table_args__ = (
         sa.UniqueConstraint('user_id', 'problem_id', name='unique_bookmark'),
+        sa.Index('ix_bookmarks_user_created', 'user_id', 'created_at'),
     )
 
 class Friendship(Base):
@@ -126,6 +144,8 @@ class Friendship(Base):
     # Ensure unique friendship pairs
     __table_args__ = (
         sa.UniqueConstraint('requester_id', 'addressee_id', name='unique_friendship'),
+        sa.Index('ix_friendships_requester_status', 'requester_id', 'status'),
+        sa.Index('ix_friendships_addressee_status', 'addressee_id', 'status'),
     )
 
 class Achievement(Base):
@@ -149,6 +169,10 @@ class UserAchievement(Base):
     
     user = relationship("User", backref="earned_achievements")
 
+    __table_args__ = (
+        sa.Index('ix_user_achievements_user', 'user_id', 'achievement_id'),
+    )
+
 
 class Challenge(Base):
     __tablename__ = "challenges"
@@ -168,6 +192,11 @@ class Challenge(Base):
     challenged = relationship("User", foreign_keys=[challenged_id])
     problem = relationship("Problem")
 
+    __table_args__ = (
+        sa.Index('ix_challenges_challenger_created', 'challenger_id', 'created_at'),
+        sa.Index('ix_challenges_challenged_created', 'challenged_id', 'created_at'),
+    )
+
 class ChallengeResult(Base):
     __tablename__ = "challenge_results"
     id = Column(Integer, primary_key=True, index=True)
@@ -182,6 +211,10 @@ class ChallengeResult(Base):
     user = relationship("User")
     submission = relationship("Submission")
 
+    __table_args__ = (
+        sa.Index('ix_challenge_results_challenge', 'challenge_id'),
+    )
+
 class LeaderboardEntry(Base):
     __tablename__ = "leaderboard_entries"
     id = Column(Integer, primary_key=True, index=True)
@@ -201,6 +234,82 @@ class LeaderboardEntry(Base):
         sa.Index('ix_user_leaderboard_type', 'user_id', 'leaderboard_type'),
     )
 
+class UserStats(Base):
+    """Per-user submission counters, maintained on write (see utils/user_stats.py)"""
+    __tablename__ = "user_stats"
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    total_submissions = Column(Integer, nullable=False, default=0)
+    problems_solved = Column(Integer, nullable=False, default=0)  # Distinct problems with a passing submission
+    easy_solved = Column(Integer, nullable=False, default=0)
+    medium_solved = Column(Integer, nullable=False, default=0)
+    hard_solved = Column(Integer, nullable=False, default=0)
+    first_try_solves = Column(Integer, nullable=False, default=0)  # Problems whose first submission passed
+    first_submission_at = Column(DateTime, nullable=True)
+    first_solve_at = Column(DateTime, nullable=True)
+    last_solve_at = Column(DateTime, nullable=True)  # Last time a problem was solved for the first time
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+class UserProblemStatus(Base):
+    """Solve state of one problem for one user, maintained on write (see utils/user_stats.py)"""
+    __tablename__ = "user_problem_status"
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    problem_id = Column(Integer, ForeignKey("problems.id", ondelete="CASCADE"), primary_key=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    first_attempt_at = Column(DateTime, nullable=True)
+    first_pass_at = Column(DateTime, nullable=True)  # None until the problem is solved
+    best_runtime = Column(Float, nullable=True)  # Fastest passing execution time in seconds
+    last_status = Column(String, nullable=True)  # overall_status of the latest submission
+    last_submission_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        sa.Index('ix_user_problem_status_problem', 'problem_id'),
+    )
+
+class UserSolveDays(Base):
+    """UTC days with at least one passing submission, as a bitmap (see utils/solve_days.py)"""
+    __tablename__ = "user_solve_days"
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    start_day = Column(Integer, nullable=True)  # date.toordinal() of bit 0
+    bitmap = Column(sa.LargeBinary, nullable=False, default=b"")  # Little-endian, bit i = start_day + i
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class ProcessedEvent(Base):
+    """Handlers that already ran for an event, for idempotent retries (see utils/submission_events.py)"""
+    __tablename__ = "processed_events"
+    idempotency_key = Column(String, primary_key=True)  # e.g. 'submission:42'
+    handler = Column(String, primary_key=True)
+    processed_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        sa.Index('ix_processed_events_processed_at', 'processed_at'),
+    )
+
+class EventOutbox(Base):
+    """Events written with the data they describe, until every handler has run (see utils/submission_events.py)"""
+    __tablename__ = "event_outbox"
+    id = Column(Integer, primary_key=True)
+    event = Column(String, nullable=False)
+    idempotency_key = Column(String, nullable=False, unique=True)
+    payload = Column(JSON, nullable=False)
+    shard = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    processed_at = Column(DateTime, nullable=True)  # None while pending
+
+    __table_args__ = (
+        sa.Index('ix_event_outbox_processed_at', 'processed_at'),
+    )
+
+class UserDailyXP(Base):
+    """Submission XP per user per UTC day, maintained on write (see utils/xp_rollup.py)"""
+    __tablename__ = "user_daily_xp"
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(sa.Date, primary_key=True)
+    xp = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        sa.Index('ix_user_daily_xp_day', 'day'),
+    )
+
 class Hint(Base):
     __tablename__ = "hints"
     id = Column(Integer, primary_key=True, index=True)
@@ -259,6 +368,10 @@ class ForumThread(Base):
     author = relationship("User")
     problem = relationship("Problem")
 
+    __table_args__ = (
+        sa.Index('ix_forum_threads_category_updated', 'category_id', 'updated_at'),
+    )
+
 class ForumReply(Base):
     __tablename__ = "forum_replies"
     id = Column(Integer, primary_key=True, index=True)
@@ -276,6 +389,10 @@ class ForumReply(Base):
     author = relationship("User")
     parent = relationship("ForumReply", remote_side=[id])
 
+    __table_args__ = (
+        sa.Index('ix_forum_replies_thread_created', 'thread_id', 'created_at'),
+    )
+
 class ForumVote(Base):
     __tablename__ = "forum_votes"
     id = Column(Integer, primary_key=True, index=True)
@@ -290,6 +407,7 @@ class ForumVote(Base):
     # Ensure unique vote pairs
     __table_args__ = (
         sa.UniqueConstraint('user_id', 'reply_id', name='unique_forum_vote'),
+        sa.Index('ix_forum_votes_reply', 'reply_id'),
     )
 
 # Code Snippets Models
@@ -313,6 +431,10 @@ class CodeSnippet(Base):
     
     user = relationship("User")
 
+    __table_args__ = (
+        sa.Index('ix_code_snippets_user_created', 'user_id', 'created_at'),
+    )
+
 class SnippetUsage(Base):
     __tablename__ = "snippet_usage"
     id = Column(Integer, primary_key=True, index=True)
@@ -336,6 +458,7 @@ class SnippetLike(Base):
     # Ensure unique like pairs
     __table_args__ = (
         sa.UniqueConstraint('user_id', 'snippet_id', name='unique_snippet_like'),
+        sa.Index('ix_snippet_likes_snippet', 'snippet_id'),
     )
 
 class SnippetComment(Base):
@@ -348,4 +471,8 @@ class SnippetComment(Base):
     updated_at = Column(DateTime, default=datetime.datetime.utcnow)
     
     user = relationship("User")
-    snippet = relationship("CodeSnippet")
\ No newline at end of file
+    snippet = relationship("CodeSnippet")
+
+    __table_args__ = (
+        sa.Index('ix_snippet_comments_snippet_created', 'snippet_id', 'created_at'),
+    )
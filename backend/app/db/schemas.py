@@ -42,6 +42,7 @@ class ProblemOut(ProblemBase):
     solve_count: int = 0
     attempt_count: int = 0
     acceptance_rate: Optional[float] = 0.0
+    solved: Optional[bool] = None  # Whether the current user has solved it; None when signed out
     test_cases: list[TestCaseOut] = []
     class Config:
         from_attributes = True
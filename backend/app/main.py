@@ -16,8 +16,38 @@ from app.db.models import Room, User
 from app.sockets import sio
 from fastapi.responses import JSONResponse
 from typing import List, Dict
-
-app = FastAPI()
+from contextlib import asynccontextmanager
+from app.utils.leaderboard_scheduler import leaderboard_scheduler, LEADERBOARD_REFRESH_ENABLED
+from app.utils.submission_events import submission_events
+from app.utils.counter_buffer import counter_buffer
+import asyncio
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Post-submission handlers push Socket.IO notifications through this loop
+    submission_events.attach_loop(asyncio.get_running_loop())
+    # Re-queue submission events a crash or restart left unfinished
+    try:
+        replayed = await asyncio.to_thread(submission_events.replay)
+        if replayed:
+            print(f"🔄 Replaying {replayed} unfinished submission events")
+        await asyncio.to_thread(submission_events.prune)
+    except Exception as e:
+        print(f"⚠️ Submission event replay failed: {e}")
+    # Batched writes of view/attempt/solve counters
+    counter_buffer.start()
+    # Rebuild leaderboards in the background so no request ever waits on it
+    if LEADERBOARD_REFRESH_ENABLED:
+        await leaderboard_scheduler.start()
+        print(f"✓ Leaderboard scheduler started (every {leaderboard_scheduler.interval}s)")
+    yield
+    await leaderboard_scheduler.stop()
+    # Finish queued submission events; whatever is left is replayed on the next start
+    await asyncio.to_thread(submission_events.drain)
+    # Write the counters still buffered before the process exits
+    await asyncio.to_thread(counter_buffer.stop)
+
+app = FastAPI(lifespan=lifespan)
 
 allowed_origins = os.getenv("ALLOWED_ORIGINS", "http://localhost:3000,https://structures-nine.vercel.app").split(",")
 print(f"Allowed CORS origins: {allowed_origins}")
@@ -128,6 +158,71 @@ try:
 except Exception as e:
     print(f"⚠ Database table creation failed: {e}")
 
+# Fill the daily XP rollup from submission history the first time it exists
+try:
+    from .db.models import UserDailyXP, Submission
+    from .utils.xp_rollup import backfill_daily_xp
+    rollup_db = SessionLocal()
+    try:
+        if rollup_db.query(UserDailyXP).first() is None and rollup_db.query(Submission).filter(Submission.xp_awarded > 0).first() is not None:
+            print("🔄 Backfilling daily XP rollup...")
+            buckets = backfill_daily_xp(rollup_db)
+            rollup_db.commit()
+            print(f"✅ Backfilled {buckets} daily XP buckets")
+    finally:
+        rollup_db.close()
+except Exception as e:
+    print(f"⚠️ Daily XP rollup backfill failed: {e}")
+
+# Fill user_stats and user_problem_status from submission history the first time they exist
+try:
+    from .db.models import UserStats, UserProblemStatus, Submission
+    from .utils.user_stats import backfill_user_stats, backfill_problem_status
+    stats_db = SessionLocal()
+    try:
+        if stats_db.query(UserStats).first() is None and stats_db.query(Submission).first() is not None:
+            print("🔄 Backfilling user stats...")
+            rows = backfill_user_stats(stats_db)
+            stats_db.commit()
+            print(f"✅ Backfilled stats for {rows} users")
+        elif stats_db.query(UserProblemStatus).first() is None and stats_db.query(Submission).first() is not None:
+            print("🔄 Backfilling problem status...")
+            rows = backfill_problem_status(stats_db)
+            stats_db.commit()
+            print(f"✅ Backfilled {rows} problem status rows")
+    finally:
+        stats_db.close()
+except Exception as e:
+    print(f"⚠️ User stats backfill failed (run backfill_user_stats.py): {e}")
+
+# Fill the solve-day bitmaps from submission history the first time they exist
+try:
+    from .db.models import UserSolveDays, Submission
+    from .utils.solve_days import backfill_solve_days
+    days_db = SessionLocal()
+    try:
+        if days_db.query(UserSolveDays).first() is None and days_db.query(Submission).filter(Submission.overall_status == "pass").first() is not None:
+            print("🔄 Backfilling solve days...")
+            rows = backfill_solve_days(days_db)
+            days_db.commit()
+            print(f"✅ Backfilled solve days for {rows} users")
+    finally:
+        days_db.close()
+except Exception as e:
+    print(f"⚠️ Solve day backfill failed: {e}")
+
+# Load the in-memory leaderboard rank index
+try:
+    from .utils.rank_index import rank_index
+    index_db = SessionLocal()
+    try:
+        counts = rank_index.load_all(index_db)
+        print(f"✓ Leaderboard rank index loaded: {counts}")
+    finally:
+        index_db.close()
+except Exception as e:
+    print(f"⚠️ Leaderboard rank index not loaded (ranks come from the database): {e}")
+
 # Import deps after app is created
 from .api import deps
 
@@ -527,5 +622,12 @@ async def code_submitted(sid, data):
         "passed": passed
     }, room=room)
 
+@sio.event
+async def watch_submission_job(sid, data):
+    # Subscribe to progress events of a queued submission (see submissions.submit_code)
+    job_id = data.get("job_id")
+    if job_id:
+        await sio.enter_room(sid, f"submission_job_{job_id}")
+
 # Ensure this is at the very end of the file, at top-level scope
 sio_app = socketio.ASGIApp(sio, app) 
\ No newline at end of file
@@ -0,0 +1,54 @@
+"""
+Per-user cache of the achievements page.
+
+get_user_achievements derives every achievement's progress from one counters
+read; the result is kept here until the user's next stored submission or
+newly earned achievement or streak update commits. Entries also expire after
+ACHIEVEMENT_PROGRESS_CACHE_TTL_SECONDS to pick up changes made by other worker
+processes. Callers get their own copy, so mutating a result never changes the cache.
+"""
+
+import copy
+import os
+import time
+import threading
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+ACHIEVEMENT_PROGRESS_CACHE_TTL_SECONDS = int(os.getenv("ACHIEVEMENT_PROGRESS_CACHE_TTL_SECONDS", "300"))
+
+
+class AchievementProgressCache:
+    def __init__(self, ttl: int = ACHIEVEMENT_PROGRESS_CACHE_TTL_SECONDS):
+        self.ttl = ttl
+        self._entries: Dict[int, tuple] = {}  # user id -> (expires_at, result)
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            cached = self._entries.get(user_id)
+            if cached is None or cached[0] < time.monotonic():
+                return None
+        return copy.deepcopy(cached[1])
+
+    def put(self, user_id: int, result: Dict[str, Any]):
+        result = copy.deepcopy(result)
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, result)
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def invalidate_on_commit(self, db: Session, user_id: int):
+        """Drop the user's entry once the session's pending changes are visible to readers."""
+        event.listen(db, "after_commit", lambda session: self.invalidate(user_id), once=True)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+achievement_progress_cache = AchievementProgressCache()
@@ -1,6 +1,7 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from ..db.models import Achievement, UserAchievement, User, Submission, Problem
+from ..db.models import Achievement, UserAchievement, User, UserStats
+from .leaderboard_updater import apply_xp_change
+from .achievement_progress import achievement_progress_cache
 import datetime
 from typing import List, Dict, Any
 
@@ -124,101 +125,124 @@ def initialize_default_achievements(db: Session):
     
     db.commit()
 
+# Counter each condition type is compared against (see get_achievement_counters)
+CONDITION_COUNTERS = {
+    "first_solve": "problems_solved",
+    "count": "problems_solved",
+    "difficulty_easy": "easy_solved",
+    "difficulty_medium": "medium_solved",
+    "difficulty_hard": "hard_solved",
+    "streak": "longest_streak",
+    "perfect_streak": "first_try_solves"
+}
+
+# Condition types each event can satisfy; other events re-check every counter condition
+EVENT_CONDITIONS = {
+    "submission_success": tuple(CONDITION_COUNTERS) + ("speed",),
+    "manual_check": tuple(CONDITION_COUNTERS),
+    # A passing re-solve can extend the streak without solving anything new
+    "streak_updated": ("streak",)
+}
+
+def get_achievement_counters(db: Session, user_id: int) -> Dict[str, int]:
+    """
+    Every counter an achievement condition can read, in one query over the
+    user's row and their user_stats row.
+    """
+    row = db.query(
+        UserStats.problems_solved,
+        UserStats.easy_solved,
+        UserStats.medium_solved,
+        UserStats.hard_solved,
+        UserStats.first_try_solves,
+        User.current_streak,
+        User.longest_streak
+    ).select_from(User).outerjoin(UserStats, UserStats.user_id == User.id).filter(User.id == user_id).first()
+    row = row._asdict() if row is not None else {}
+    return {
+        "problems_solved": row.get("problems_solved") or 0,
+        "easy_solved": row.get("easy_solved") or 0,
+        "medium_solved": row.get("medium_solved") or 0,
+        "hard_solved": row.get("hard_solved") or 0,
+        "first_try_solves": row.get("first_try_solves") or 0,
+        "longest_streak": max(row.get("longest_streak") or 0, row.get("current_streak") or 0)
+    }
+
 def check_achievements(user_id: int, event_type: str, db: Session, **kwargs) -> List[Dict[str, Any]]:
     """
-    Check for new achievements based on user actions
+    Check for new achievements based on user actions. Only the not yet earned
+    achievements whose condition the event can change are loaded, the counters
+    are read once, and everything earned is awarded together.
     Returns list of newly earned achievements
     """
-    newly_earned = []
+    condition_types = EVENT_CONDITIONS.get(event_type, tuple(CONDITION_COUNTERS))
     
-    # Get all achievements that the user hasn't earned yet
+    # Get the relevant achievements that the user hasn't earned yet
     earned_achievement_ids = db.query(UserAchievement.achievement_id).filter(
         UserAchievement.user_id == user_id
-    ).subquery()
-    
+    )
     available_achievements = db.query(Achievement).filter(
+        Achievement.condition_type.in_(condition_types),
         ~Achievement.id.in_(earned_achievement_ids)
     ).all()
+    if not available_achievements:
+        return []
     
-    for achievement in available_achievements:
-        if check_achievement_condition(user_id, achievement, db, event_type, **kwargs):
-            # Award the achievement
-            user_achievement = UserAchievement(
-                user_id=user_id,
-                achievement_id=achievement.id,
-                progress=achievement.condition_value or 1
-            )
-            db.add(user_achievement)
-            
-            # Award XP
-            user = db.query(User).filter(User.id == user_id).first()
-            if user:
-                user.total_xp += achievement.xp_reward
-            
-            newly_earned.append({
-                "id": achievement.id,
-                "name": achievement.name,
-                "description": achievement.description,
-                "icon": achievement.icon,
-                "xp_reward": achievement.xp_reward
-            })
-    
-    if newly_earned:
-        db.commit()
-    
-    return newly_earned
-
-def check_achievement_condition(user_id: int, achievement: Achievement, db: Session, event_type: str, **kwargs) -> bool:
-    """Check if a specific achievement condition is met"""
-    
-    if achievement.condition_type == "first_solve":
-        # Check if user has any successful submissions
-        successful_submissions = db.query(Submission).filter(
-            Submission.user_id == user_id,
-            Submission.overall_status == "pass"
-        ).count()
-        return successful_submissions >= achievement.condition_value
+    counters = get_achievement_counters(db, user_id)
+    earned = [
+        achievement for achievement in available_achievements
+        if check_achievement_condition(achievement, counters, event_type, **kwargs)
+    ]
+    if not earned:
+        return []
     
-    elif achievement.condition_type == "count":
-        # Count total solved problems (unique problems with at least one successful submission)
-        solved_problems = db.query(func.count(func.distinct(Submission.problem_id))).filter(
-            Submission.user_id == user_id,
-            Submission.overall_status == "pass"
-        ).scalar()
-        return solved_problems >= achievement.condition_value
+    db.add_all([
+        UserAchievement(user_id=user_id, achievement_id=achievement.id, progress=achievement.condition_value or 1)
+        for achievement in earned
+    ])
     
-    elif achievement.condition_type.startswith("difficulty_"):
-        difficulty = achievement.condition_type.split("_")[1].capitalize()
-        # Count solved problems of specific difficulty
-        solved_count = db.query(func.count(func.distinct(Submission.problem_id))).join(
-            Problem, Submission.problem_id == Problem.id
-        ).filter(
-            Submission.user_id == user_id,
-            Submission.overall_status == "pass",
-            Problem.difficulty == difficulty
-        ).scalar()
-        return solved_count >= achievement.condition_value
+    # Award the XP of every new achievement in one update
+    xp_reward = sum(achievement.xp_reward or 0 for achievement in earned)
+    user = db.get(User, user_id)
+    if user and xp_reward:
+        user.total_xp = (user.total_xp or 0) + xp_reward
+        apply_xp_change(db, user)
+    db.commit()
+    achievement_progress_cache.invalidate(user_id)
     
-    elif achievement.condition_type == "streak":
-        # This would need streak tracking - for now return False
-        # Will be implemented with Feature 7 (Streak Tracking)
-        return False
+    return [
+        {
+            "id": achievement.id,
+            "name": achievement.name,
+            "description": achievement.description,
+            "icon": achievement.icon,
+            "xp_reward": achievement.xp_reward
+        }
+        for achievement in earned
+    ]
+
+def check_achievement_condition(achievement: Achievement, counters: Dict[str, int], event_type: str, **kwargs) -> bool:
+    """Check if a specific achievement condition is met, given the user's counters"""
     
-    elif achievement.condition_type == "speed":
+    if achievement.condition_type == "speed":
         # Check if the current submission (if any) was fast enough
         if event_type == "submission_success" and "execution_time" in kwargs:
             return kwargs["execution_time"] <= achievement.condition_value
         return False
     
-    elif achievement.condition_type == "perfect_streak":
-        # Check for consecutive first-try successes
-        # This is a complex query - simplified for now
+    counter = CONDITION_COUNTERS.get(achievement.condition_type)
+    if counter is None:
         return False
-    
-    return False
+    return counters[counter] >= (achievement.condition_value or 1)
 
 def get_user_achievements(user_id: int, db: Session) -> Dict[str, Any]:
-    """Get all achievements for a user with progress"""
+    """
+    Get all achievements for a user with progress. Progress comes from one
+    counters read, and the result is cached until the user's next submission.
+    """
+    cached = achievement_progress_cache.get(user_id)
+    if cached is not None:
+        return cached
     
     # Get all achievements
     all_achievements = db.query(Achievement).all()
@@ -229,6 +253,7 @@ def get_user_achievements(user_id: int, db: Session) -> Dict[str, Any]:
     ).all()
     
     earned_dict = {ua.achievement_id: ua for ua in earned_achievements}
+    counters = get_achievement_counters(db, user_id)
     
     result = {
         "total_achievements": len(all_achievements),
@@ -256,33 +281,22 @@ def get_user_achievements(user_id: int, db: Session) -> Dict[str, Any]:
             achievement_data["earned_at"] = user_achievement.earned_at.isoformat()
             achievement_data["progress"] = user_achievement.progress
         else:
-            # Calculate current progress
-            achievement_data["progress"] = get_achievement_progress(user_id, achievement, db)
+            # Derive current progress from the counters
+            achievement_data["progress"] = get_achievement_progress(user_id, achievement, db, counters)
         
         result["achievements"].append(achievement_data)
     
+    achievement_progress_cache.put(user_id, result)
     return result
 
-def get_achievement_progress(user_id: int, achievement: Achievement, db: Session) -> int:
+def get_achievement_progress(user_id: int, achievement: Achievement, db: Session, counters: Dict[str, int] = None) -> int:
     """Get current progress towards an achievement"""
     
-    if achievement.condition_type == "first_solve" or achievement.condition_type == "count":
-        solved_problems = db.query(func.count(func.distinct(Submission.problem_id))).filter(
-            Submission.user_id == user_id,
-            Submission.overall_status == "pass"
-        ).scalar()
-        return min(solved_problems, achievement.condition_value or 1)
-    
-    elif achievement.condition_type.startswith("difficulty_"):
-        difficulty = achievement.condition_type.split("_")[1].capitalize()
-        solved_count = db.query(func.count(func.distinct(Submission.problem_id))).join(
-            Problem, Submission.problem_id == Problem.id
-        ).filter(
-            Submission.user_id == user_id,
-            Submission.overall_status == "pass",
-            Problem.difficulty == difficulty
-        ).scalar()
-        return min(solved_count, achievement.condition_value or 1)
+    counter = CONDITION_COUNTERS.get(achievement.condition_type)
+    if counter is None:
+        # Per-event conditions like speed have no running total
+        return 0
     
-    # For other types, return 0 for now
-    return 0
\ No newline at end of file
+    if counters is None:
+        counters = get_achievement_counters(db, user_id)
+    return min(counters[counter], achievement.condition_value or 1)
@@ -0,0 +1,154 @@
+"""
+Write-behind buffer for hot counters (problem views/attempts/solves, forum
+thread views, snippet views and uses).
+
+Increments are summed in memory and written every COUNTER_FLUSH_SECONDS as
+one batched ``UPDATE ... SET col = col + :delta`` per table and column set, so
+a popular row takes one write per interval instead of one locked UPDATE and
+commit per request. The app starts the flush thread on startup and flushes
+whatever is left on shutdown; a failed flush keeps its increments for the
+next one. Counts read from the database lag by up to one interval.
+"""
+
+import os
+import logging
+import threading
+from collections import defaultdict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from sqlalchemy import bindparam, event, func, update
+from sqlalchemy.orm import Session
+
+from ..db.base import SessionLocal
+
+COUNTER_FLUSH_SECONDS = float(os.getenv("COUNTER_FLUSH_SECONDS", "5"))
+
+logger = logging.getLogger(__name__)
+
+
+class CounterBuffer:
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal, interval: float = COUNTER_FLUSH_SECONDS):
+        self.session_factory = session_factory
+        self.interval = interval
+        self._pending: Dict[Tuple[Any, int], Dict[str, int]] = defaultdict(dict)  # (model, row id) -> {column: delta}
+        self._in_flight: Dict[Tuple[Any, int], Dict[str, int]] = {}  # what the running flush is writing
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.increments = 0
+        self.flushes = 0
+        self.rows_written = 0
+        self.failures = 0
+
+    def increment(self, model, row_id: int, column: str, amount: int = 1):
+        """Add ``amount`` to ``model.column`` of row ``row_id`` at the next flush."""
+        if not amount:
+            return
+        with self._lock:
+            columns = self._pending[(model, row_id)]
+            columns[column] = columns.get(column, 0) + amount
+            self.increments += 1
+
+    def increment_on_commit(self, db: Session, model, row_id: int, column: str, amount: int = 1):
+        """Buffer the increment only once ``db`` commits, so a rolled back or retried transaction doesn't count twice."""
+        event.listen(db, "after_commit", lambda session: self.increment(model, row_id, column, amount), once=True)
+
+    def pending(self, model, row_id: int, column: str) -> int:
+        """
+        Increments not yet written for a row, to add to a value read from the database.
+        Includes those a running flush is writing until its commit lands; a read
+        that races with that commit may count them twice, never zero times.
+        """
+        with self._lock:
+            return (self._pending.get((model, row_id), {}).get(column, 0)
+                    + self._in_flight.get((model, row_id), {}).get(column, 0))
+
+    def flush(self) -> int:
+        """
+        Write every buffered increment. Blocking.
+        Returns:
+            The number of rows updated
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, defaultdict(dict)
+                self._in_flight = pending
+            if not pending:
+                return 0
+
+            # One executemany per (table, set of columns), rows in id order to keep lock order stable
+            batches = defaultdict(list)
+            for (model, row_id), columns in sorted(pending.items(), key=lambda item: (item[0][0].__tablename__, item[0][1])):
+                batches[(model, tuple(sorted(columns)))].append(
+                    dict({"row_id": row_id}, **{f"delta_{column}": delta for column, delta in columns.items()})
+                )
+
+            db = None
+            try:
+                db = self.session_factory()
+                for (model, columns), params in batches.items():
+                    table = model.__table__
+                    statement = update(table).where(table.c.id == bindparam("row_id")).values({
+                        column: func.coalesce(table.c[column], 0) + bindparam(f"delta_{column}") for column in columns
+                    })
+                    db.execute(statement, params)
+                db.commit()
+            except Exception as e:
+                if db is not None:
+                    db.rollback()
+                self.failures += 1
+                logger.error(f"Counter flush failed, keeping {len(pending)} rows for the next one: {e}")
+                with self._lock:
+                    for key, columns in pending.items():
+                        for column, delta in columns.items():
+                            current = self._pending[key]
+                            current[column] = current.get(column, 0) + delta
+                    self._in_flight = {}
+                return 0
+            finally:
+                if db is not None:
+                    db.close()
+
+            with self._lock:
+                self._in_flight = {}
+
+            self.flushes += 1
+            self.rows_written += len(pending)
+            return len(pending)
+
+    def start(self):
+        """Start flushing every ``interval`` seconds on a background thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="counter-buffer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the flush thread and write what is still buffered."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending_rows = len(self._pending)
+        return {
+            "interval_seconds": self.interval,
+            "running": self._thread is not None and self._thread.is_alive(),
+            "pending_rows": pending_rows,
+            "increments": self.increments,
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "failures": self.failures
+        }
+
+
+counter_buffer = CounterBuffer()
@@ -0,0 +1,121 @@
+"""
+Friends leaderboard service, shared by /api/friends/leaderboard and
+/api/leaderboards/friends.
+
+A user's board (their accepted friends plus themselves) is read with one
+aggregated query and cached per user. The cache remembers which users appear
+on which boards, so an XP change or friendship change drops exactly the boards
+it affects. Entries also expire after FRIENDS_LEADERBOARD_CACHE_TTL_SECONDS to
+pick up changes made by other worker processes.
+"""
+
+import os
+import time
+import threading
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import and_, func, select, union
+from sqlalchemy.orm import Session
+
+from ..db.models import Friendship, User, UserStats
+
+FRIENDS_LEADERBOARD_CACHE_TTL_SECONDS = int(os.getenv("FRIENDS_LEADERBOARD_CACHE_TTL_SECONDS", "60"))
+
+logger = logging.getLogger(__name__)
+
+
+class FriendsLeaderboardCache:
+    def __init__(self, ttl: int = FRIENDS_LEADERBOARD_CACHE_TTL_SECONDS):
+        self.ttl = ttl
+        self._boards: Dict[int, tuple] = {}  # owner id -> (expires_at, rows)
+        self._owners: Dict[int, Set[int]] = {}  # member id -> owners whose board shows them
+        self._lock = threading.Lock()
+
+    def get(self, owner_id: int) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            cached = self._boards.get(owner_id)
+            if cached is None or cached[0] < time.monotonic():
+                return None
+            return cached[1]
+
+    def put(self, owner_id: int, rows: List[Dict[str, Any]]):
+        with self._lock:
+            self._drop(owner_id)
+            self._boards[owner_id] = (time.monotonic() + self.ttl, rows)
+            for row in rows:
+                self._owners.setdefault(row["id"], set()).add(owner_id)
+
+    def invalidate_users(self, user_ids: Iterable[int]):
+        """Drop every cached board that shows any of these users, and their own boards."""
+        with self._lock:
+            for user_id in user_ids:
+                for owner_id in list(self._owners.get(user_id, ())) + [user_id]:
+                    self._drop(owner_id)
+
+    def clear(self):
+        with self._lock:
+            self._boards.clear()
+            self._owners.clear()
+
+    def _drop(self, owner_id: int):
+        cached = self._boards.pop(owner_id, None)
+        if cached is None:
+            return
+        for row in cached[1]:
+            owners = self._owners.get(row["id"])
+            if owners is not None:
+                owners.discard(owner_id)
+                if not owners:
+                    del self._owners[row["id"]]
+
+
+friends_leaderboard_cache = FriendsLeaderboardCache()
+
+
+def friend_ids_select(user_id: int):
+    """SELECT of the ids of a user's accepted friends."""
+    accepted = Friendship.status == "accepted"
+    return union(
+        select(Friendship.addressee_id).where(and_(Friendship.requester_id == user_id, accepted)),
+        select(Friendship.requester_id).where(and_(Friendship.addressee_id == user_id, accepted))
+    )
+
+
+def get_friends_leaderboard(db: Session, user_id: int) -> List[Dict[str, Any]]:
+    """
+    Get a user's friends and the user themselves ranked by total XP.
+    Args:
+        user_id: Whose friends to rank
+    Returns:
+        Rows of {'rank', 'id', 'username', 'total_xp', 'problems_solved'}; callers add level/title
+    """
+    cached = friends_leaderboard_cache.get(user_id)
+    if cached is not None:
+        return cached
+
+    # Friends, XP and solved counts (from user_stats) in one query
+    total_xp = func.coalesce(User.total_xp, 0)
+    rows = db.query(
+        User.id,
+        User.username,
+        total_xp.label("total_xp"),
+        func.coalesce(UserStats.problems_solved, 0).label("problems_solved")
+    ).outerjoin(
+        UserStats, UserStats.user_id == User.id
+    ).filter(
+        (User.id == user_id) | User.id.in_(friend_ids_select(user_id))
+    ).order_by(total_xp.desc(), User.id).all()
+
+    board = [
+        {
+            "rank": rank,
+            "id": row.id,
+            "username": row.username,
+            "total_xp": row.total_xp,
+            "problems_solved": row.problems_solved
+        }
+        for rank, row in enumerate(rows, 1)
+    ]
+    friends_leaderboard_cache.put(user_id, board)
+    return board
@@ -0,0 +1,80 @@
+"""
+Response cache for leaderboard pages.
+
+Pages are cached per (type, starting rank, size) as the encoded JSON body plus
+its ETag. Every board has a version counter that is bumped when a rebuild or
+an incremental XP change commits; a page cached under an older version is
+never served. The counters are per process, so entries also expire after
+LEADERBOARD_CACHE_TTL_SECONDS to pick up changes committed by other workers.
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+LEADERBOARD_CACHE_MAX_ENTRIES = int(os.getenv("LEADERBOARD_CACHE_MAX_ENTRIES", "512"))
+LEADERBOARD_CACHE_TTL_SECONDS = int(os.getenv("LEADERBOARD_CACHE_TTL_SECONDS", "30"))
+
+
+class LeaderboardCache:
+    def __init__(self, max_entries: int = LEADERBOARD_CACHE_MAX_ENTRIES, ttl: int = LEADERBOARD_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._versions: Dict[str, int] = {}
+        self._entries: "OrderedDict[Tuple, Tuple[float, bytes, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def version(self, leaderboard_type: str) -> int:
+        with self._lock:
+            return self._versions.get(leaderboard_type, 0)
+
+    def bump(self, *leaderboard_types: str):
+        """Invalidate every cached page of the given boards."""
+        with self._lock:
+            for leaderboard_type in leaderboard_types:
+                self._versions[leaderboard_type] = self._versions.get(leaderboard_type, 0) + 1
+
+    def get(self, leaderboard_type: str, after_rank: int, limit: int) -> Optional[Tuple[bytes, str]]:
+        """Return (body, etag) for a page cached under the board's current version."""
+        with self._lock:
+            key = (leaderboard_type, self._versions.get(leaderboard_type, 0), after_rank, limit)
+            cached = self._entries.get(key)
+            if cached is None or cached[0] < time.monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return cached[1], cached[2]
+
+    def put(self, leaderboard_type: str, version: int, after_rank: int, limit: int, payload: Any) -> Tuple[bytes, str]:
+        """
+        Encode and store a page read while the board was at ``version``.
+        Returns:
+            (body, etag)
+        """
+        body = json.dumps(payload, separators=(",", ":")).encode()
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        with self._lock:
+            # A page read before a bump would be stored under the old version and never served
+            self._entries[(leaderboard_type, version, after_rank, limit)] = (time.monotonic() + self.ttl, body, etag)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return body, etag
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "versions": dict(self._versions)
+            }
+
+
+leaderboard_cache = LeaderboardCache()
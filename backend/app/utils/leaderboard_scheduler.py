@@ -0,0 +1,159 @@
+"""
+Background leaderboard refreshes.
+
+An asyncio task started with the app rebuilds the boards every
+LEADERBOARD_REFRESH_SECONDS, and on demand when ``trigger`` or ``refresh`` is
+called. Requests that arrive while a run is pending or in progress are
+coalesced into the next single run, and the rebuild itself runs in a thread,
+so neither reads nor the event loop ever wait on it.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from .leaderboard_updater import update_global_leaderboard, update_weekly_leaderboard, update_monthly_leaderboard
+from .rank_index import LEADERBOARD_TYPES
+
+LEADERBOARD_REFRESH_ENABLED = os.getenv("LEADERBOARD_REFRESH_ENABLED", "true").lower() == "true"
+LEADERBOARD_REFRESH_SECONDS = int(os.getenv("LEADERBOARD_REFRESH_SECONDS", "300"))
+
+logger = logging.getLogger(__name__)
+
+REFRESHERS = {
+    "global": update_global_leaderboard,
+    "weekly": update_weekly_leaderboard,
+    "monthly": update_monthly_leaderboard
+}
+
+
+def refresh_leaderboards(leaderboard_types: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Rebuild the given boards, each with its own session. Blocking."""
+    return {leaderboard_type: REFRESHERS[leaderboard_type]() for leaderboard_type in leaderboard_types}
+
+
+class LeaderboardScheduler:
+    def __init__(self, interval: int = LEADERBOARD_REFRESH_SECONDS,
+                 refresh: Callable[[List[str]], Dict[str, Dict[str, Any]]] = refresh_leaderboards):
+        self.interval = interval
+        self._refresh = refresh
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._pending = set()
+        self._waiters: List[asyncio.Future] = []
+        self.running = False
+        self.runs = 0
+        self.triggers = 0
+        self.coalesced = 0
+        self.last_run: Optional[Dict[str, Any]] = None
+
+    @property
+    def started(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        """Start the refresh loop on the running event loop. The first run builds every board."""
+        if self.started:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._add(None)
+        self._task = asyncio.create_task(self._run_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def trigger(self, leaderboard_types: Optional[Iterable[str]] = None):
+        """Ask for a refresh without waiting for it. Safe to call from any thread."""
+        if not self.started:
+            return
+        self._loop.call_soon_threadsafe(self._add, leaderboard_types)
+
+    async def refresh(self, leaderboard_types: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """Request a refresh and wait for the run that includes it."""
+        if not self.started:
+            # No loop running the scheduler (e.g. disabled): rebuild here, still off the event loop
+            return await asyncio.to_thread(self._run_sync, sorted(set(leaderboard_types or LEADERBOARD_TYPES)))
+        waiter = self._loop.create_future()
+        self._add(leaderboard_types, waiter)
+        return await waiter
+
+    def _add(self, leaderboard_types: Optional[Iterable[str]], waiter: Optional[asyncio.Future] = None):
+        self.triggers += 1
+        if self._pending:
+            self.coalesced += 1
+        self._pending.update(leaderboard_types or LEADERBOARD_TYPES)
+        if waiter is not None:
+            self._waiters.append(waiter)
+        self._wakeup.set()
+
+    async def _run_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                self._pending.update(LEADERBOARD_TYPES)
+            self._wakeup.clear()
+            # Anything requested from here on waits for the next run
+            leaderboard_types = [t for t in LEADERBOARD_TYPES if t in self._pending]
+            waiters, self._pending, self._waiters = self._waiters, set(), []
+
+            self.running = True
+            try:
+                result = await asyncio.to_thread(self._run_sync, leaderboard_types)
+            finally:
+                self.running = False
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(result)
+
+    def _run_sync(self, leaderboard_types: List[str]) -> Dict[str, Any]:
+        started_at = datetime.utcnow()
+        start = time.perf_counter()
+        try:
+            results = self._refresh(leaderboard_types)
+            error = None
+        except Exception as e:
+            logger.error(f"Leaderboard refresh failed: {e}")
+            results, error = {}, str(e)
+        run = {
+            "success": error is None and all(result.get("success") for result in results.values()),
+            "leaderboard_types": leaderboard_types,
+            "started_at": started_at.isoformat(),
+            "duration": time.perf_counter() - start,
+            "rows": {t: result.get("users_updated", 0) for t, result in results.items()},
+            "results": results
+        }
+        if error is not None:
+            run["error"] = error
+        self.runs += 1
+        self.last_run = run
+        logger.info(f"Leaderboards {leaderboard_types} refreshed in {run['duration']:.3f}s: {run['rows']}")
+        return run
+
+    def stats(self) -> Dict[str, Any]:
+        last_run = {k: v for k, v in self.last_run.items() if k != "results"} if self.last_run else None
+        return {
+            "enabled": LEADERBOARD_REFRESH_ENABLED,
+            "started": self.started,
+            "interval_seconds": self.interval,
+            "running": self.running,
+            "pending": [t for t in LEADERBOARD_TYPES if t in self._pending],
+            "runs": self.runs,
+            "triggers": self.triggers,
+            "coalesced": self.coalesced,
+            "last_run": last_run
+        }
+
+
+leaderboard_scheduler = LeaderboardScheduler()
@@ -1,15 +1,25 @@
 """
 Leaderboard calculation and update utilities.
+
+XP changes update the boards incrementally through apply_xp_change; the
+update_*_leaderboard functions rebuild a board from scratch and are kept as
+the periodic repair job. Both keep the in-memory rank_index in step.
 """
 
 from sqlalchemy.orm import Session
-from sqlalchemy import text, desc, func
+from sqlalchemy import text, desc, func, select, insert, update, delete, literal, DateTime, event
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+import threading
 import logging
 
 from ..db.models import User, LeaderboardEntry, Submission
 from ..db.base import SessionLocal
+from .rank_index import rank_index
+from .user_stats import get_user_stats, get_solved_counts
+from .leaderboard_cache import leaderboard_cache
+from .friends_leaderboard import friends_leaderboard_cache
+from .xp_rollup import rolling_window, period_xp_select
 
 logger = logging.getLogger(__name__)
 
@@ -38,10 +48,214 @@ def calculate_level(total_xp: int) -> tuple[int, str]:
 
 def get_problems_solved_count(db: Session, user_id: int) -> int:
     """Get the number of problems solved by a user."""
-    return db.query(Submission).filter(
-        Submission.user_id == user_id,
-        Submission.overall_status == "pass"
-    ).distinct(Submission.problem_id).count()
+    return get_user_stats(db, user_id).problems_solved
+
+def get_problems_solved_counts(db: Session, user_ids: List[int]) -> Dict[int, int]:
+    """Get the number of distinct problems solved by each of several users in one query."""
+    return get_solved_counts(db, user_ids)
+
+# Cached rank column on User for each leaderboard type
+RANK_COLUMNS = {
+    "global": User.global_rank,
+    "weekly": User.weekly_rank,
+    "monthly": User.monthly_rank
+}
+
+# Serializes incremental moves within this process. Across processes,
+# _lock_boards holds a transaction-level lock on PostgreSQL until the mover
+# commits; SQLite already allows only one writing transaction at a time.
+_incremental_lock = threading.Lock()
+LEADERBOARD_LOCK_KEY = 727001  # pg_advisory_xact_lock key shared by every board writer
+
+def _lock_boards(db: Session):
+    """Hold the leaderboard write lock until the caller's transaction ends (PostgreSQL only)."""
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": LEADERBOARD_LOCK_KEY})
+
+def _shift_ranks(db: Session, leaderboard_type: str, low: int, high: Optional[int], delta: int):
+    """Add delta to every rank in [low, high] (high=None means to the bottom) of a board and its cached user ranks."""
+    rank_column = RANK_COLUMNS[leaderboard_type]
+    entries = db.query(LeaderboardEntry).filter(
+        LeaderboardEntry.leaderboard_type == leaderboard_type,
+        LeaderboardEntry.rank >= low
+    )
+    users = db.query(User).filter(rank_column >= low)
+    if high is not None:
+        entries = entries.filter(LeaderboardEntry.rank <= high)
+        users = users.filter(rank_column <= high)
+    entries.update({LeaderboardEntry.rank: LeaderboardEntry.rank + delta}, synchronize_session=False)
+    users.update({rank_column: rank_column + delta}, synchronize_session=False)
+
+def move_leaderboard_entry(db: Session, leaderboard_type: str, user_id: int, new_score: int) -> Optional[int]:
+    """
+    Set one user's score on a board and shift only the ranks between their old and new position.
+    Ranks are kept as the 1..n order a full rebuild produces (score descending,
+    ties by user id); a user whose score reaches 0 drops off the board. Boards
+    that haven't been built yet are left alone for the next full rebuild.
+    Does not commit.
+    Returns the user's new rank, or None if they are not on the board.
+    """
+    entries = db.query(LeaderboardEntry).filter(LeaderboardEntry.leaderboard_type == leaderboard_type)
+    any_entry = entries.first()
+    if any_entry is None:
+        return None
+    entry = entries.filter(LeaderboardEntry.user_id == user_id).first()
+    # Everyone who ranks ahead of (new_score, user_id), in the rebuild's order
+    ahead = entries.filter(
+        LeaderboardEntry.user_id != user_id,
+        (LeaderboardEntry.score > new_score) | ((LeaderboardEntry.score == new_score) & (LeaderboardEntry.user_id < user_id))
+    )
+
+    if entry is None:
+        if new_score <= 0:
+            return None
+        new_rank = ahead.count() + 1
+        _shift_ranks(db, leaderboard_type, new_rank, None, 1)
+        db.add(LeaderboardEntry(
+            user_id=user_id,
+            leaderboard_type=leaderboard_type,
+            score=new_score,
+            rank=new_rank,
+            period_start=any_entry.period_start,
+            period_end=any_entry.period_end,
+            updated_at=datetime.utcnow()
+        ))
+    elif new_score <= 0:
+        _shift_ranks(db, leaderboard_type, entry.rank + 1, None, -1)
+        db.delete(entry)
+        db.query(User).filter(User.id == user_id).update({RANK_COLUMNS[leaderboard_type]: None}, synchronize_session=False)
+        db.flush()
+        return None
+    elif new_score > entry.score:
+        # Everyone passed sits between the new and the old rank
+        new_rank = ahead.count() + 1
+        _shift_ranks(db, leaderboard_type, new_rank, entry.rank - 1, 1)
+    elif new_score < entry.score:
+        new_rank = ahead.count() + 1
+        _shift_ranks(db, leaderboard_type, entry.rank + 1, new_rank, -1)
+    else:
+        return entry.rank
+
+    if entry is not None:
+        entry.score = new_score
+        entry.rank = new_rank
+        entry.updated_at = datetime.utcnow()
+    db.query(User).filter(User.id == user_id).update({RANK_COLUMNS[leaderboard_type]: new_rank}, synchronize_session=False)
+    # Sessions don't autoflush, and the next move must see this one
+    db.flush()
+    return new_rank
+
+def apply_xp_change(db: Session, user: User, period_xp: int = 0) -> Dict[str, Optional[int]]:
+    """
+    Update the leaderboards for one user's XP change instead of rebuilding them.
+    Call after changing user.total_xp; the caller commits. The moves run in a
+    savepoint: if one fails, the boards are left as they were, the caller's
+    transaction stays usable and the error is raised for the caller to handle.
+    Args:
+        user: The user whose total_xp changed
+        period_xp: XP that also counts toward the weekly and monthly boards
+            (those boards only count XP awarded by submissions)
+    Returns:
+        The user's new rank per board that was updated
+    """
+    ranks = {}
+    scores = {}
+    # Cached pages and friends boards are dropped once the change is visible to readers
+    changed = ("global", "weekly", "monthly") if period_xp else ("global",)
+    user_id = user.id
+
+    with _incremental_lock:
+        _lock_boards(db)
+        savepoint = db.begin_nested()
+        try:
+            ranks["global"] = move_leaderboard_entry(db, "global", user_id, user.total_xp or 0)
+            # A board that isn't built yet has no rank for anyone
+            scores["global"] = (user.total_xp or 0) if ranks["global"] else 0
+            if period_xp:
+                for leaderboard_type in ("weekly", "monthly"):
+                    entry = db.query(LeaderboardEntry).filter(
+                        LeaderboardEntry.leaderboard_type == leaderboard_type,
+                        LeaderboardEntry.user_id == user_id
+                    ).first()
+                    old_score = entry.score if entry else 0
+                    ranks[leaderboard_type] = move_leaderboard_entry(db, leaderboard_type, user_id, old_score + period_xp)
+                    scores[leaderboard_type] = (old_score + period_xp) if ranks[leaderboard_type] else 0
+            savepoint.commit()
+        except Exception as e:
+            savepoint.rollback()
+            logger.error(f"Incremental leaderboard update failed for user {user_id}: {e}")
+            raise
+
+    def publish(session):
+        # The rank index and caches only follow once the moves are committed
+        for leaderboard_type, score in scores.items():
+            rank_index.set_score(leaderboard_type, user_id, score)
+        leaderboard_cache.bump(*changed)
+        friends_leaderboard_cache.invalidate_users([user_id])
+
+    event.listen(db, "after_commit", publish, once=True)
+    return ranks
+
+def _supports_window_functions(db: Session) -> bool:
+    dialect = db.get_bind().dialect
+    if dialect.name != "sqlite":
+        return True
+    # SQLite only has window functions from 3.25
+    return (dialect.dbapi.sqlite_version_info if dialect.dbapi else (0,)) >= (3, 25)
+
+def rebuild_leaderboard(db: Session, leaderboard_type: str, scores, period_start: Optional[datetime] = None,
+                        period_end: Optional[datetime] = None) -> int:
+    """
+    Replace a board with set-based SQL: one INSERT ... SELECT ranking the scores
+    with a window function and one UPDATE copying the ranks onto users.
+    Everything happens in the caller's transaction, so readers keep seeing the
+    old board until it commits. Does not commit.
+    Args:
+        scores: SELECT of (user_id, score) columns, positive scores only
+    Returns:
+        The number of users on the new board
+    """
+    scores = scores.subquery()
+    now = datetime.utcnow()
+    entries = LeaderboardEntry.__table__
+    rank_column = RANK_COLUMNS[leaderboard_type]
+
+    with _incremental_lock:
+        _lock_boards(db)
+        db.execute(delete(entries).where(entries.c.leaderboard_type == leaderboard_type))
+        columns = ["user_id", "leaderboard_type", "score", "rank", "period_start", "period_end", "updated_at"]
+        if _supports_window_functions(db):
+            # ROW_NUMBER rather than RANK: ties get distinct ranks by user id,
+            # the order the incremental moves and the rank index keep
+            ranked = select(
+                scores.c.user_id,
+                literal(leaderboard_type),
+                scores.c.score,
+                func.row_number().over(order_by=(scores.c.score.desc(), scores.c.user_id)),
+                literal(period_start, DateTime),
+                literal(period_end, DateTime),
+                literal(now, DateTime)
+            )
+            db.execute(insert(entries).from_select(columns, ranked))
+        else:
+            rows = db.execute(select(scores.c.user_id, scores.c.score).order_by(scores.c.score.desc(), scores.c.user_id)).all()
+            if rows:
+                db.execute(insert(entries), [
+                    dict(zip(columns, (user_id, leaderboard_type, score, rank, period_start, period_end, now)))
+                    for rank, (user_id, score) in enumerate(rows, 1)
+                ])
+
+        board = select(entries.c.user_id, entries.c.rank).where(entries.c.leaderboard_type == leaderboard_type)
+        if db.get_bind().dialect.name == "postgresql":
+            db.execute(update(User).where(rank_column.isnot(None)).values({rank_column: None}))
+            board = board.subquery()
+            db.execute(update(User).where(User.id == board.c.user_id).values({rank_column: board.c.rank}))
+        else:
+            # Portable fallback: a correlated subquery, which also clears users who left the board
+            db.execute(update(User).values({
+                rank_column: board.with_only_columns(entries.c.rank).where(entries.c.user_id == User.id).scalar_subquery()
+            }))
+        return db.execute(select(func.count()).select_from(entries).where(entries.c.leaderboard_type == leaderboard_type)).scalar()
 
 def update_global_leaderboard(db: Session = None) -> Dict[str, Any]:
     """Update the global leaderboard based on total XP."""
@@ -54,34 +268,14 @@ def update_global_leaderboard(db: Session = None) -> Dict[str, Any]:
     try:
         logger.info("Starting global leaderboard update...")
         
-        # Get all users ordered by total XP
-        users = db.query(User).filter(
-            User.total_xp > 0
-        ).order_by(desc(User.total_xp)).all()
-        
-        # Clear existing global leaderboard entries
-        db.query(LeaderboardEntry).filter(
-            LeaderboardEntry.leaderboard_type == "global"
-        ).delete()
-        
-        # Create new leaderboard entries and update user ranks
-        updated_users = 0
-        for rank, user in enumerate(users, 1):
-            # Create leaderboard entry
-            entry = LeaderboardEntry(
-                user_id=user.id,
-                leaderboard_type="global",
-                score=user.total_xp,
-                rank=rank,
-                updated_at=datetime.utcnow()
-            )
-            db.add(entry)
-            
-            # Update user's cached rank
-            user.global_rank = rank
-            updated_users += 1
+        updated_users = rebuild_leaderboard(
+            db, "global",
+            select(User.id.label("user_id"), User.total_xp.label("score")).where(User.total_xp > 0)
+        )
         
         db.commit()
+        rank_index.load(db, "global")
+        leaderboard_cache.bump("global")
         logger.info(f"Global leaderboard updated with {updated_users} users")
         
         return {
@@ -103,8 +297,15 @@ def update_global_leaderboard(db: Session = None) -> Dict[str, Any]:
         if should_close:
             db.close()
 
-def update_weekly_leaderboard(db: Session = None) -> Dict[str, Any]:
-    """Update the weekly leaderboard based on XP gained in the last 7 days."""
+def update_period_leaderboard(db: Session, leaderboard_type: str, days: int) -> Dict[str, Any]:
+    """
+    Rebuild a rolling leaderboard from the daily XP rollup.
+    Args:
+        leaderboard_type: "weekly" or "monthly"
+        days: Number of UTC days in the window, today included
+    Returns:
+        The update result
+    """
     if db is None:
         db = SessionLocal()
         should_close = True
@@ -112,64 +313,25 @@ def update_weekly_leaderboard(db: Session = None) -> Dict[str, Any]:
         should_close = False
     
     try:
-        logger.info("Starting weekly leaderboard update...")
+        logger.info(f"Starting {leaderboard_type} leaderboard update...")
         
-        # Calculate date range for this week
+        # Sum at most `days` daily buckets per user instead of scanning submissions
+        start_day, end_day = rolling_window(days)
+        start_date = datetime.combine(start_day, datetime.min.time())
         end_date = datetime.utcnow()
-        start_date = end_date - timedelta(days=7)
-        
-        # Get XP gained by each user in the last 7 days
-        weekly_xp_query = db.query(
-            Submission.user_id,
-            func.sum(Submission.xp_awarded).label('weekly_xp')
-        ).filter(
-            Submission.submission_time >= start_date,
-            Submission.submission_time <= end_date,
-            Submission.xp_awarded > 0
-        ).group_by(Submission.user_id).subquery()
-        
-        # Get users with their weekly XP, ordered by weekly XP
-        users_with_weekly_xp = db.query(
-            User,
-            weekly_xp_query.c.weekly_xp
-        ).join(
-            weekly_xp_query,
-            User.id == weekly_xp_query.c.user_id
-        ).order_by(desc(weekly_xp_query.c.weekly_xp)).all()
-        
-        # Clear existing weekly leaderboard entries
-        db.query(LeaderboardEntry).filter(
-            LeaderboardEntry.leaderboard_type == "weekly"
-        ).delete()
-        
-        # Reset all users' weekly ranks
-        db.query(User).update({User.weekly_rank: None})
-        
-        # Create new leaderboard entries and update user ranks
-        updated_users = 0
-        for rank, (user, weekly_xp) in enumerate(users_with_weekly_xp, 1):
-            # Create leaderboard entry
-            entry = LeaderboardEntry(
-                user_id=user.id,
-                leaderboard_type="weekly",
-                score=int(weekly_xp or 0),
-                rank=rank,
-                period_start=start_date,
-                period_end=end_date,
-                updated_at=datetime.utcnow()
-            )
-            db.add(entry)
-            
-            # Update user's cached rank
-            user.weekly_rank = rank
-            updated_users += 1
+        updated_users = rebuild_leaderboard(
+            db, leaderboard_type, period_xp_select(start_day, end_day),
+            period_start=start_date, period_end=end_date
+        )
         
         db.commit()
-        logger.info(f"Weekly leaderboard updated with {updated_users} users")
+        rank_index.load(db, leaderboard_type)
+        leaderboard_cache.bump(leaderboard_type)
+        logger.info(f"{leaderboard_type.capitalize()} leaderboard updated with {updated_users} users")
         
         return {
             "success": True,
-            "leaderboard_type": "weekly",
+            "leaderboard_type": leaderboard_type,
             "users_updated": updated_users,
             "period_start": start_date.isoformat(),
             "period_end": end_date.isoformat(),
@@ -177,104 +339,31 @@ def update_weekly_leaderboard(db: Session = None) -> Dict[str, Any]:
         }
         
     except Exception as e:
-        logger.error(f"Error updating weekly leaderboard: {e}")
+        logger.error(f"Error updating {leaderboard_type} leaderboard: {e}")
         db.rollback()
         return {
             "success": False,
             "error": str(e),
-            "leaderboard_type": "weekly"
+            "leaderboard_type": leaderboard_type
         }
     finally:
         if should_close:
             db.close()
 
+def update_weekly_leaderboard(db: Session = None) -> Dict[str, Any]:
+    """Update the weekly leaderboard based on XP gained in the last 7 days."""
+    return update_period_leaderboard(db, "weekly", 7)
+
 def update_monthly_leaderboard(db: Session = None) -> Dict[str, Any]:
     """Update the monthly leaderboard based on XP gained in the last 30 days."""
-    if db is None:
-        db = SessionLocal()
-        should_close = True
-    else:
-        should_close = False
-    
-    try:
-        logger.info("Starting monthly leaderboard update...")
-        
-        # Calculate date range for this month
-        end_date = datetime.utcnow()
-        start_date = end_date - timedelta(days=30)
-        
-        # Get XP gained by each user in the last 30 days
-        monthly_xp_query = db.query(
-            Submission.user_id,
-            func.sum(Submission.xp_awarded).label('monthly_xp')
-        ).filter(
-            Submission.submission_time >= start_date,
-            Submission.submission_time <= end_date,
-            Submission.xp_awarded > 0
-        ).group_by(Submission.user_id).subquery()
-        
-        # Get users with their monthly XP, ordered by monthly XP
-        users_with_monthly_xp = db.query(
-            User,
-            monthly_xp_query.c.monthly_xp
-        ).join(
-            monthly_xp_query,
-            User.id == monthly_xp_query.c.user_id
-        ).order_by(desc(monthly_xp_query.c.monthly_xp)).all()
-        
-        # Clear existing monthly leaderboard entries
-        db.query(LeaderboardEntry).filter(
-            LeaderboardEntry.leaderboard_type == "monthly"
-        ).delete()
-        
-        # Reset all users' monthly ranks
-        db.query(User).update({User.monthly_rank: None})
-        
-        # Create new leaderboard entries and update user ranks
-        updated_users = 0
-        for rank, (user, monthly_xp) in enumerate(users_with_monthly_xp, 1):
-            # Create leaderboard entry
-            entry = LeaderboardEntry(
-                user_id=user.id,
-                leaderboard_type="monthly",
-                score=int(monthly_xp or 0),
-                rank=rank,
-                period_start=start_date,
-                period_end=end_date,
-                updated_at=datetime.utcnow()
-            )
-            db.add(entry)
-            
-            # Update user's cached rank
-            user.monthly_rank = rank
-            updated_users += 1
-        
-        db.commit()
-        logger.info(f"Monthly leaderboard updated with {updated_users} users")
-        
-        return {
-            "success": True,
-            "leaderboard_type": "monthly",
-            "users_updated": updated_users,
-            "period_start": start_date.isoformat(),
-            "period_end": end_date.isoformat(),
-            "updated_at": datetime.utcnow().isoformat()
-        }
-        
-    except Exception as e:
-        logger.error(f"Error updating monthly leaderboard: {e}")
-        db.rollback()
-        return {
-            "success": False,
-            "error": str(e),
-            "leaderboard_type": "monthly"
-        }
-    finally:
-        if should_close:
-            db.close()
+    return update_period_leaderboard(db, "monthly", 30)
 
 def update_all_leaderboards(db: Session = None) -> Dict[str, Any]:
-    """Update all leaderboard types."""
+    """
+    Rebuild all leaderboard types from scratch.
+    XP changes keep the boards current through apply_xp_change, so this is the
+    periodic repair job: it drops expired weekly/monthly XP and fixes any drift.
+    """
     if db is None:
         db = SessionLocal()
         should_close = True
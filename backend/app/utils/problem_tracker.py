@@ -1,6 +1,7 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
 from ..db.models import Problem, Submission
+from .counter_buffer import counter_buffer
 from datetime import datetime, timedelta
 import logging
 
@@ -8,69 +9,48 @@ logger = logging.getLogger(__name__)
 
 def increment_problem_view(problem_id: int, db: Session) -> bool:
     """
-    Increment the view count for a problem.
+    Increment the view count for a problem. The increment is buffered and
+    written in a batch by the counter buffer (see utils/counter_buffer.py).
     
     Args:
         problem_id: The ID of the problem
         db: Database session
         
     Returns:
-        bool: True if successful, False otherwise
+        bool: True once the increment is buffered
     """
-    try:
-        result = db.query(Problem).filter(Problem.id == problem_id).update(
-            {Problem.view_count: Problem.view_count + 1}
-        )
-        db.commit()
-        return result > 0
-    except Exception as e:
-        logger.error(f"Failed to increment view count for problem {problem_id}: {e}")
-        db.rollback()
-        return False
+    counter_buffer.increment(Problem, problem_id, "view_count")
+    return True
 
 def increment_problem_attempt(problem_id: int, db: Session) -> bool:
     """
-    Increment the attempt count for a problem.
+    Increment the attempt count for a problem. The increment is buffered and
+    written in a batch by the counter buffer (see utils/counter_buffer.py).
     
     Args:
         problem_id: The ID of the problem
         db: Database session
         
     Returns:
-        bool: True if successful, False otherwise
+        bool: True once the increment is buffered
     """
-    try:
-        result = db.query(Problem).filter(Problem.id == problem_id).update(
-            {Problem.attempt_count: Problem.attempt_count + 1}
-        )
-        db.commit()
-        return result > 0
-    except Exception as e:
-        logger.error(f"Failed to increment attempt count for problem {problem_id}: {e}")
-        db.rollback()
-        return False
+    counter_buffer.increment(Problem, problem_id, "attempt_count")
+    return True
 
 def increment_problem_solve(problem_id: int, db: Session) -> bool:
     """
-    Increment the solve count for a problem.
+    Increment the solve count for a problem. The increment is buffered and
+    written in a batch by the counter buffer (see utils/counter_buffer.py).
     
     Args:
         problem_id: The ID of the problem
         db: Database session
         
     Returns:
-        bool: True if successful, False otherwise
+        bool: True once the increment is buffered
     """
-    try:
-        result = db.query(Problem).filter(Problem.id == problem_id).update(
-            {Problem.solve_count: Problem.solve_count + 1}
-        )
-        db.commit()
-        return result > 0
-    except Exception as e:
-        logger.error(f"Failed to increment solve count for problem {problem_id}: {e}")
-        db.rollback()
-        return False
+    counter_buffer.increment(Problem, problem_id, "solve_count")
+    return True
 
 def get_popular_problems(db: Session, limit: int = 10):
     """
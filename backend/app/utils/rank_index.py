@@ -0,0 +1,132 @@
+"""
+In-memory rank index for the leaderboards.
+
+Each leaderboard type keeps its users as a sorted list of (-score, user_id)
+keys plus a user_id -> score map, so rank-of, top-k and range-around-user are
+bisect lookups instead of a table sort. Ties are ordered by user id.
+
+The index is loaded from leaderboard_entries on startup and after every full
+rebuild, and apply_xp_change keeps it current between rebuilds. It is
+per-process: with several workers, each one catches up on the others' changes
+at the next rebuild.
+"""
+
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Tuple
+import threading
+import logging
+
+from sqlalchemy.orm import Session
+
+from ..db.models import LeaderboardEntry
+
+logger = logging.getLogger(__name__)
+
+LEADERBOARD_TYPES = ("global", "weekly", "monthly")
+
+
+class BoardIndex:
+    """
+    Sorted (-score, user_id) keys of one leaderboard.
+
+    Lookups are O(log n) bisects. Updates are O(n): finding the position is a
+    bisect, but inserting into or deleting from the list shifts the keys after
+    it. That shift is a single memmove, which costs well under a millisecond
+    at 100k users. A board with far more users, or with far more updates than
+    reads, would want a balanced tree or skip list instead.
+    """
+
+    def __init__(self, scores: Optional[Dict[int, int]] = None):
+        self.scores = dict(scores or {})
+        self.keys = sorted((-score, user_id) for user_id, score in self.scores.items())
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def set_score(self, user_id: int, score: int):
+        """Insert or move a user; a score of 0 or less removes them. O(n), see the class docstring."""
+        self.remove(user_id)
+        if score > 0:
+            self.scores[user_id] = score
+            insort(self.keys, (-score, user_id))
+
+    def remove(self, user_id: int):
+        score = self.scores.pop(user_id, None)
+        if score is not None:
+            del self.keys[bisect_left(self.keys, (-score, user_id))]
+
+    def rank_of(self, user_id: int) -> Optional[int]:
+        """1-based rank, or None if the user isn't on the board."""
+        score = self.scores.get(user_id)
+        if score is None:
+            return None
+        return bisect_left(self.keys, (-score, user_id)) + 1
+
+    def top(self, k: int, offset: int = 0) -> List[Tuple[int, int, int]]:
+        """(rank, user_id, score) for ranks offset+1 .. offset+k."""
+        return [
+            (offset + i + 1, user_id, -neg_score)
+            for i, (neg_score, user_id) in enumerate(self.keys[offset:offset + k])
+        ]
+
+    def around(self, user_id: int, radius: int) -> List[Tuple[int, int, int]]:
+        """(rank, user_id, score) for the users up to ``radius`` places above and below a user."""
+        rank = self.rank_of(user_id)
+        if rank is None:
+            return []
+        start = max(rank - 1 - radius, 0)
+        return self.top(rank - start + radius, start)
+
+
+class RankIndex:
+    """Thread-safe BoardIndex per leaderboard type."""
+
+    def __init__(self):
+        self._boards: Dict[str, BoardIndex] = {}
+        self._lock = threading.Lock()
+
+    def is_loaded(self, leaderboard_type: str) -> bool:
+        with self._lock:
+            return leaderboard_type in self._boards
+
+    def load(self, db: Session, leaderboard_type: str) -> int:
+        """Replace one board with its leaderboard_entries rows. Returns the number of users."""
+        rows = db.query(LeaderboardEntry.user_id, LeaderboardEntry.score).filter(
+            LeaderboardEntry.leaderboard_type == leaderboard_type
+        ).all()
+        board = BoardIndex({user_id: score for user_id, score in rows if score and score > 0})
+        with self._lock:
+            self._boards[leaderboard_type] = board
+        return len(board)
+
+    def load_all(self, db: Session) -> Dict[str, int]:
+        return {leaderboard_type: self.load(db, leaderboard_type) for leaderboard_type in LEADERBOARD_TYPES}
+
+    def set_score(self, leaderboard_type: str, user_id: int, score: int):
+        """Move a user on a loaded board; boards that aren't loaded are left to the next load."""
+        with self._lock:
+            board = self._boards.get(leaderboard_type)
+            if board is not None:
+                board.set_score(user_id, score)
+
+    def rank_of(self, leaderboard_type: str, user_id: int) -> Optional[int]:
+        with self._lock:
+            board = self._boards.get(leaderboard_type)
+            return board.rank_of(user_id) if board is not None else None
+
+    def top(self, leaderboard_type: str, k: int, offset: int = 0) -> List[Tuple[int, int, int]]:
+        with self._lock:
+            board = self._boards.get(leaderboard_type)
+            return board.top(k, offset) if board is not None else []
+
+    def around(self, leaderboard_type: str, user_id: int, radius: int) -> List[Tuple[int, int, int]]:
+        with self._lock:
+            board = self._boards.get(leaderboard_type)
+            return board.around(user_id, radius) if board is not None else []
+
+    def clear(self):
+        with self._lock:
+            self._boards.clear()
+
+
+rank_index = RankIndex()
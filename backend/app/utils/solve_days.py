@@ -0,0 +1,142 @@
+"""
+Per-user solve-day bitmap.
+
+user_solve_days stores, for each user, the days on which they solved at
+least one problem as a bitmap: bit i is set when they solved something on day
+``start_day + i`` (day numbers are ``date.toordinal()``). Streaks and calendar
+heatmaps of any length are read from that one row instead of from
+submissions.
+
+Days are UTC calendar days, the same buckets the daily XP rollup uses, so a
+solve at 23:30 UTC and one at 00:30 UTC are always on consecutive days no
+matter the server's local time zone.
+"""
+
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+import logging
+
+from ..db.models import UserSolveDays, Submission
+
+logger = logging.getLogger(__name__)
+
+def utc_day(when: Optional[datetime] = None) -> date:
+    """The UTC calendar day of a naive UTC datetime (default now)."""
+    return (when or datetime.utcnow()).date()
+
+class SolveDayBitmap:
+    def __init__(self, start_day: Optional[int] = None, bits: int = 0):
+        self.start_day = start_day  # Ordinal of bit 0; None while empty
+        self.bits = bits
+
+    @classmethod
+    def from_row(cls, row: Optional[UserSolveDays]) -> "SolveDayBitmap":
+        if row is None or row.start_day is None:
+            return cls()
+        return cls(row.start_day, int.from_bytes(row.bitmap or b"", "little"))
+
+    def to_bytes(self) -> bytes:
+        return self.bits.to_bytes((self.bits.bit_length() + 7) // 8, "little")
+
+    def add(self, day: date) -> bool:
+        """Mark a day solved. Returns False if it already was."""
+        ordinal = day.toordinal()
+        if self.start_day is None:
+            self.start_day = ordinal
+        elif ordinal < self.start_day:
+            # Re-base so bit 0 is the earliest day
+            self.bits <<= self.start_day - ordinal
+            self.start_day = ordinal
+        bit = 1 << (ordinal - self.start_day)
+        if self.bits & bit:
+            return False
+        self.bits |= bit
+        return True
+
+    def has(self, day: date) -> bool:
+        if self.start_day is None:
+            return False
+        offset = day.toordinal() - self.start_day
+        return offset >= 0 and bool(self.bits >> offset & 1)
+
+    def days(self, start: date, end: date) -> List[date]:
+        """Solved days between two days inclusive."""
+        return [start + timedelta(days=i) for i in range((end - start).days + 1) if self.has(start + timedelta(days=i))]
+
+    def current_streak(self, today: Optional[date] = None) -> int:
+        """Consecutive solved days ending today, or yesterday if today has no solve yet."""
+        today = today or utc_day()
+        day = today if self.has(today) else today - timedelta(days=1)
+        streak = 0
+        while self.has(day):
+            streak += 1
+            day -= timedelta(days=1)
+        return streak
+
+    def longest_streak(self) -> int:
+        return max((len(run) for run in bin(self.bits)[2:].split("0")), default=0) if self.bits else 0
+
+    def total_days(self) -> int:
+        return bin(self.bits).count("1")
+
+    def last_day(self) -> Optional[date]:
+        if not self.bits:
+            return None
+        return date.fromordinal(self.start_day + self.bits.bit_length() - 1)
+
+def load_solve_days(db: Session, user_id: int) -> SolveDayBitmap:
+    """The user's solve days (primary-key lookup)."""
+    return SolveDayBitmap.from_row(db.get(UserSolveDays, user_id))
+
+def record_solve_day(db: Session, user_id: int, when: Optional[datetime] = None) -> tuple:
+    """
+    Mark the UTC day of ``when`` (default now) solved for the user. The caller commits.
+    Returns:
+        (bitmap, True if the day was newly marked)
+    """
+    row = db.get(UserSolveDays, user_id)
+    if row is None:
+        row = UserSolveDays(user_id=user_id)
+        db.add(row)
+    bitmap = SolveDayBitmap.from_row(row)
+    added = bitmap.add(utc_day(when))
+    if added:
+        row.start_day = bitmap.start_day
+        row.bitmap = bitmap.to_bytes()
+        row.updated_at = datetime.utcnow()
+    return bitmap, added
+
+def backfill_solve_days(db: Session, user_ids: Optional[List[int]] = None) -> int:
+    """
+    Rebuild user_solve_days from passing submissions. The caller commits.
+    Returns:
+        The number of users written
+    """
+    delete = db.query(UserSolveDays)
+    if user_ids is not None:
+        delete = delete.filter(UserSolveDays.user_id.in_(user_ids))
+    delete.delete(synchronize_session="fetch")
+
+    day = func.date(Submission.submission_time)
+    query = db.query(Submission.user_id, day).filter(
+        Submission.overall_status == "pass",
+        Submission.user_id.isnot(None)
+    )
+    if user_ids is not None:
+        query = query.filter(Submission.user_id.in_(user_ids))
+
+    bitmaps: Dict[int, SolveDayBitmap] = {}
+    for user_id, solved_day in query.distinct().all():
+        # SQLite's date() returns text
+        if isinstance(solved_day, str):
+            solved_day = date.fromisoformat(solved_day)
+        bitmaps.setdefault(user_id, SolveDayBitmap()).add(solved_day)
+
+    db.add_all(
+        UserSolveDays(user_id=user_id, start_day=bitmap.start_day, bitmap=bitmap.to_bytes(), updated_at=datetime.utcnow())
+        for user_id, bitmap in bitmaps.items()
+    )
+    logger.info(f"Backfilled solve days for {len(bitmaps)} users")
+    return len(bitmaps)
@@ -1,19 +1,26 @@
 """
 Streak calculation utilities for tracking user problem-solving streaks.
+
+Streaks and calendars are computed from the per-user solve-day bitmap in
+utils/solve_days.py, never from submissions. A day is a UTC calendar day.
 """
 
 import datetime
+from typing import Optional
 from sqlalchemy.orm import Session
 from ..db.models import User
+from .solve_days import load_solve_days, record_solve_day, utc_day
+from .achievement_progress import achievement_progress_cache
 
 
-def update_user_streak(user_id: int, db: Session) -> dict:
+def update_user_streak(user_id: int, db: Session, when: Optional[datetime.datetime] = None) -> dict:
     """
     Update user's streak after a successful problem solve.
     
     Args:
         user_id: ID of the user who solved a problem
         db: Database session
+        when: Naive UTC time of the solve (default now); its UTC day is the one marked
         
     Returns:
         dict: Updated streak information
@@ -33,42 +40,28 @@ def update_user_streak(user_id: int, db: Session) -> dict:
     except Exception as e:
         return {"error": f"Database error: {e}"}
     
-    today = datetime.date.today()
+    when = when or datetime.datetime.utcnow()
+    bitmap, added = record_solve_day(db, user_id, when)
     
-    # If user has never solved a problem before
-    if not user.last_solve_date:
-        user.current_streak = 1
-        user.longest_streak = 1
-        user.last_solve_date = datetime.datetime.now()
-    else:
-        last_solve = user.last_solve_date.date()
-        
-        # If already solved today, don't update streak
-        if last_solve == today:
-            return {
-                "current_streak": user.current_streak,
-                "longest_streak": user.longest_streak,
-                "streak_updated": False,
-                "message": "Already solved a problem today"
-            }
-        
-        # If solved yesterday, continue streak
-        elif last_solve == today - datetime.timedelta(days=1):
-            user.current_streak += 1
-            user.last_solve_date = datetime.datetime.now()
-        
-        # If gap in solving, reset streak
-        else:
-            user.current_streak = 1
-            user.last_solve_date = datetime.datetime.now()
-    
-    # Update longest streak if current streak is higher
-    if user.current_streak > user.longest_streak:
-        user.longest_streak = user.current_streak
+    # The User columns mirror the bitmap for the streak leaderboard and achievements
+    user.current_streak = bitmap.current_streak(utc_day())
+    user.longest_streak = max(user.longest_streak or 0, bitmap.longest_streak())
+    if not user.last_solve_date or when > user.last_solve_date:
+        user.last_solve_date = when
     
     db.commit()
+    # Streak achievements' progress comes from current_streak
+    achievement_progress_cache.invalidate(user_id)
     db.refresh(user)
     
+    if not added:
+        return {
+            "current_streak": user.current_streak,
+            "longest_streak": user.longest_streak,
+            "streak_updated": False,
+            "message": "Already solved a problem today"
+        }
+    
     return {
         "current_streak": user.current_streak,
         "longest_streak": user.longest_streak,
@@ -94,7 +87,6 @@ def get_user_streak_info(user_id: int, db: Session) -> dict:
             return {"error": "User not found"}
         
         # Check if streak columns exist by trying to access them
-        _ = user.current_streak
         _ = user.longest_streak
         _ = user.last_solve_date
         
@@ -103,30 +95,17 @@ def get_user_streak_info(user_id: int, db: Session) -> dict:
     except Exception as e:
         return {"error": f"Database error: {e}"}
     
-    today = datetime.date.today()
-    streak_active = False
-    
-    if user.last_solve_date:
-        last_solve = user.last_solve_date.date()
-        # Streak is active if solved today or yesterday
-        streak_active = last_solve >= today - datetime.timedelta(days=1)
-        
-        # If haven't solved today or yesterday, streak is broken
-        if last_solve < today - datetime.timedelta(days=1):
-            # Reset current streak to 0 but don't update database yet
-            # This will be updated when they solve their next problem
-            current_streak = 0
-        else:
-            current_streak = user.current_streak
-    else:
-        current_streak = 0
+    today = utc_day()
+    bitmap = load_solve_days(db, user_id)
+    last_solve_day = bitmap.last_day()
     
     return {
-        "current_streak": current_streak,
-        "longest_streak": user.longest_streak or 0,
+        # 0 once a day has been missed, even before the next solve updates the User columns
+        "current_streak": bitmap.current_streak(today),
+        "longest_streak": max(user.longest_streak or 0, bitmap.longest_streak()),
         "last_solve_date": user.last_solve_date.isoformat() if user.last_solve_date else None,
-        "streak_active": streak_active,
-        "days_since_last_solve": (today - user.last_solve_date.date()).days if user.last_solve_date else None
+        "streak_active": last_solve_day is not None and last_solve_day >= today - datetime.timedelta(days=1),
+        "days_since_last_solve": (today - last_solve_day).days if last_solve_day else None
     }
 
 
@@ -137,28 +116,14 @@ def get_streak_calendar_data(user_id: int, db: Session, days: int = 30) -> dict:
     Args:
         user_id: ID of the user
         db: Database session
-        days: Number of days to look back (default 30)
+        days: Number of UTC days to look back, ending today (default 30)
         
     Returns:
         dict: Calendar data with solve dates
     """
-    from ..db.models import Submission
-    
-    end_date = datetime.date.today()
+    end_date = utc_day()
     start_date = end_date - datetime.timedelta(days=days - 1)
-    
-    # Get all successful submissions in the date range
-    successful_submissions = db.query(Submission).filter(
-        Submission.user_id == user_id,
-        Submission.overall_status == "pass",  # Use overall_status for successful submissions
-        Submission.submission_time >= datetime.datetime.combine(start_date, datetime.time.min),
-        Submission.submission_time <= datetime.datetime.combine(end_date, datetime.time.max)
-    ).all()
-    
-    # Group by date
-    solve_dates = set()
-    for submission in successful_submissions:
-        solve_dates.add(submission.submission_time.date())
+    solve_dates = set(load_solve_days(db, user_id).days(start_date, end_date))
     
     # Create calendar data
     calendar_data = []
@@ -179,4 +144,4 @@ def get_streak_calendar_data(user_id: int, db: Session, days: int = 30) -> dict:
             "start": start_date.isoformat(),
             "end": end_date.isoformat()
         }
-    }
\ No newline at end of file
+    }
@@ -0,0 +1,283 @@
+"""
+Post-submission event pipeline.
+
+The submit path stores the submission, its stats, its XP and an event_outbox
+row for the ``submission_recorded`` event in one commit; the event is queued
+once that commit succeeds. Background worker threads run the handlers
+registered for the event (problem counters, leaderboards, streaks,
+achievements, notifications) in registration order, so the request never
+waits on them.
+
+Each handler runs in its own session and transaction together with a
+processed_events row keyed by the event's idempotency key and the handler
+name. A failed handler is retried up to SUBMISSION_EVENT_MAX_ATTEMPTS times,
+and an event delivered twice skips the handlers that already committed.
+Events are sharded by user id, so one user's events are handled in order.
+
+An outbox row is marked processed once every handler has committed. Rows still
+pending after a crash or restart, or whose handlers gave up, are queued again
+by replay() on startup; shutdown drains the queues first. Processed outbox rows
+and handler markers are pruned after SUBMISSION_EVENT_RETENTION_DAYS.
+"""
+
+import os
+import time
+import queue
+import asyncio
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import sqlalchemy as sa
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..db.base import SessionLocal
+from ..db.models import ProcessedEvent, EventOutbox
+
+SUBMISSION_EVENT_WORKERS = int(os.getenv("SUBMISSION_EVENT_WORKERS", "2"))
+SUBMISSION_EVENT_MAX_ATTEMPTS = int(os.getenv("SUBMISSION_EVENT_MAX_ATTEMPTS", "3"))
+SUBMISSION_EVENT_RETRY_SECONDS = float(os.getenv("SUBMISSION_EVENT_RETRY_SECONDS", "0.5"))
+SUBMISSION_EVENT_DRAIN_SECONDS = float(os.getenv("SUBMISSION_EVENT_DRAIN_SECONDS", "10"))
+SUBMISSION_EVENT_RETENTION_DAYS = int(os.getenv("SUBMISSION_EVENT_RETENTION_DAYS", "7"))
+PRUNE_INTERVAL_SECONDS = 3600
+
+logger = logging.getLogger(__name__)
+
+# Handlers get (session, event payload, results of the earlier handlers for this event)
+EventHandler = Callable[[Session, Dict[str, Any], Dict[str, Any]], Any]
+
+
+class EventPipeline:
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal, workers: int = SUBMISSION_EVENT_WORKERS,
+                 max_attempts: int = SUBMISSION_EVENT_MAX_ATTEMPTS, retry_delay: float = SUBMISSION_EVENT_RETRY_SECONDS):
+        self.session_factory = session_factory
+        self.workers = max(1, workers)
+        self.max_attempts = max(1, max_attempts)
+        self.retry_delay = retry_delay
+        self.loop: Optional[asyncio.AbstractEventLoop] = None  # For handlers that notify Socket.IO clients
+        self._handlers: Dict[str, List[Tuple[str, EventHandler]]] = {}
+        self._queues: List[queue.Queue] = []
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._last_prune = time.monotonic()
+        self.emitted = 0
+        self.replayed = 0
+        self.pruned = 0
+        self.processed = 0
+        self.skipped = 0
+        self.retries = 0
+        self.failed = 0
+
+    def register(self, event: str, name: str, handler: EventHandler):
+        """Add a handler for an event; handlers run in the order they were registered."""
+        self._handlers.setdefault(event, []).append((name, handler))
+
+    def attach_loop(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+
+    def _start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                events = queue.Queue()
+                thread = threading.Thread(target=self._worker_loop, args=(events,), name=f"submission-events-{i}", daemon=True)
+                thread.start()
+                self._queues.append(events)
+                self._threads.append(thread)
+
+    def enqueue(self, db: Session, event: str, key: str, payload: Dict[str, Any], shard: int = 0):
+        """
+        Write an event to the outbox in the caller's transaction and queue it
+        once that transaction commits, so the event exists exactly when the
+        data it describes does. Does not commit.
+        """
+        db.add(EventOutbox(event=event, idempotency_key=key, payload=payload, shard=shard))
+        sa.event.listen(db, "after_commit", lambda session: self.emit(event, key, payload, shard), once=True)
+
+    def emit(self, event: str, key: str, payload: Dict[str, Any], shard: int = 0):
+        """
+        Queue an event for the background workers. Call after the data it
+        describes has been committed; enqueue() also persists the event.
+        Args:
+            key: Idempotency key, unique per event occurrence (e.g. 'submission:42')
+            shard: Events with the same shard (e.g. the user id) are handled in order
+        """
+        if event not in self._handlers:
+            return
+        self._start()
+        self.emitted += 1
+        self._queues[shard % self.workers].put((event, key, payload))
+
+    def process(self, event: str, key: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Run every handler for an event on this thread.
+        Returns:
+            {handler name: its return value}; failed or already handled ones are missing
+        """
+        return self._process(event, key, payload)[0]
+
+    def _process(self, event: str, key: str, payload: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+        """process(), plus whether every handler has now run for the event."""
+        results: Dict[str, Any] = {}
+        complete = True
+        for name, handler in self._handlers.get(event, []):
+            for attempt in range(1, self.max_attempts + 1):
+                try:
+                    handled, result = self._run_once(name, handler, key, payload, results)
+                except Exception as e:
+                    if attempt < self.max_attempts:
+                        self.retries += 1
+                        logger.warning(f"{event} handler '{name}' failed for {key} (attempt {attempt}), retrying: {e}")
+                        time.sleep(self.retry_delay * attempt)
+                        continue
+                    self.failed += 1
+                    complete = False
+                    logger.error(f"{event} handler '{name}' gave up on {key} after {attempt} attempts: {e}")
+                    break
+                if handled:
+                    self.processed += 1
+                    results[name] = result
+                else:
+                    self.skipped += 1
+                break
+        return results, complete
+
+    def _run_once(self, name: str, handler: EventHandler, key: str, payload: Dict[str, Any],
+                  results: Dict[str, Any]) -> Tuple[bool, Any]:
+        db = self.session_factory()
+        try:
+            if db.get(ProcessedEvent, (key, name)) is not None:
+                return False, None
+            # The marker commits with the handler's own changes, or not at all
+            db.add(ProcessedEvent(idempotency_key=key, handler=name))
+            try:
+                db.flush()
+            except IntegrityError:
+                # Another delivery of the same event got there first
+                db.rollback()
+                return False, None
+            result = handler(db, payload, results)
+            db.commit()
+            return True, result
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _mark_processed(self, key: str):
+        db = self.session_factory()
+        try:
+            db.query(EventOutbox).filter(
+                EventOutbox.idempotency_key == key,
+                EventOutbox.processed_at.is_(None)
+            ).update({EventOutbox.processed_at: datetime.utcnow()}, synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            # The row stays pending; a replay finds every handler already done
+            db.rollback()
+            logger.error(f"Could not mark {key} processed: {e}")
+        finally:
+            db.close()
+
+    def _worker_loop(self, events: queue.Queue):
+        while True:
+            event, key, payload = events.get()
+            try:
+                _, complete = self._process(event, key, payload)
+                # Events with a failed handler stay pending for the next replay
+                if complete:
+                    self._mark_processed(key)
+                self._maybe_prune()
+            except Exception as e:
+                logger.error(f"Processing {event} {key} failed: {e}")
+            finally:
+                events.task_done()
+
+    def replay(self) -> int:
+        """
+        Queue every outbox event that hasn't finished, e.g. after a crash or restart.
+        Handlers that already committed are skipped when the events run again.
+        Returns:
+            The number of events queued
+        """
+        db = self.session_factory()
+        try:
+            pending = [
+                (row.event, row.idempotency_key, row.payload, row.shard)
+                for row in db.query(EventOutbox).filter(EventOutbox.processed_at.is_(None)).order_by(EventOutbox.id)
+            ]
+        finally:
+            db.close()
+        for event, key, payload, shard in pending:
+            self.emit(event, key, payload, shard)
+        self.replayed += len(pending)
+        return len(pending)
+
+    def drain(self, timeout: float = SUBMISSION_EVENT_DRAIN_SECONDS) -> bool:
+        """
+        Wait for the queued events to be handled. Blocking.
+        Returns:
+            False if events were still queued at the timeout (they are replayed on the next start)
+        """
+        deadline = time.monotonic() + timeout
+        while any(events.unfinished_tasks for events in self._queues):
+            if time.monotonic() >= deadline:
+                logger.warning(f"Stopped waiting for {self.stats()['pending']} queued events; they will be replayed")
+                return False
+            time.sleep(0.05)
+        return True
+
+    def prune(self, retention_days: int = SUBMISSION_EVENT_RETENTION_DAYS) -> int:
+        """
+        Delete processed outbox rows and handler markers older than the retention.
+        Markers of events that are still pending are kept.
+        Returns:
+            The number of rows deleted
+        """
+        cutoff = datetime.utcnow() - timedelta(days=retention_days)
+        db = self.session_factory()
+        try:
+            pending_keys = sa.select(EventOutbox.idempotency_key).where(EventOutbox.processed_at.is_(None))
+            deleted = db.query(ProcessedEvent).filter(
+                ProcessedEvent.processed_at < cutoff,
+                ProcessedEvent.idempotency_key.not_in(pending_keys)
+            ).delete(synchronize_session=False)
+            deleted += db.query(EventOutbox).filter(EventOutbox.processed_at < cutoff).delete(synchronize_session=False)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        self.pruned += deleted
+        return deleted
+
+    def _maybe_prune(self):
+        with self._lock:
+            if time.monotonic() - self._last_prune < PRUNE_INTERVAL_SECONDS:
+                return
+            self._last_prune = time.monotonic()
+        try:
+            self.prune()
+        except Exception as e:
+            logger.error(f"Pruning processed events failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "pending": sum(events.qsize() for events in self._queues),
+            "emitted": self.emitted,
+            "replayed": self.replayed,
+            "pruned": self.pruned,
+            "processed": self.processed,
+            "skipped": self.skipped,
+            "retries": self.retries,
+            "failed": self.failed
+        }
+
+
+submission_events = EventPipeline()
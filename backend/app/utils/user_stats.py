@@ -0,0 +1,270 @@
+"""
+Denormalized per-user submission stats.
+
+user_stats holds the counters that profile, achievements and the leaderboards
+used to recompute from the whole submissions table: total submissions,
+distinct problems solved overall and per difficulty, and first/last solve
+times. user_problem_status holds the same kind of state per (user, problem):
+attempts, first pass, best runtime and last status, so "has this user solved
+it" is a primary-key lookup. record_submission_stats updates both in the
+transaction that stores a submission, and backfill_user_stats rebuilds them
+from submissions (see backfill_user_stats.py in the backend root).
+"""
+
+from sqlalchemy.orm import Session
+from sqlalchemy import func, update, select, case
+from sqlalchemy.orm import aliased
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+import logging
+
+from ..db.models import UserStats, UserProblemStatus, Submission, Problem
+from .achievement_progress import achievement_progress_cache
+
+logger = logging.getLogger(__name__)
+
+DIFFICULTY_COLUMNS = {
+    "easy": UserStats.easy_solved,
+    "medium": UserStats.medium_solved,
+    "hard": UserStats.hard_solved
+}
+
+def _ensure_row(db: Session, user_id: int):
+    """Create the user's stats row if it doesn't exist, without racing a concurrent insert."""
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        db.execute(insert(UserStats).values(user_id=user_id).on_conflict_do_nothing(index_elements=[UserStats.user_id]))
+    elif db.get(UserStats, user_id) is None:
+        db.add(UserStats(user_id=user_id))
+        db.flush()
+
+def _ensure_problem_row(db: Session, user_id: int, problem_id: int):
+    """Create the user's status row for a problem if it doesn't exist, without racing a concurrent insert."""
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        db.execute(insert(UserProblemStatus).values(user_id=user_id, problem_id=problem_id).on_conflict_do_nothing(
+            index_elements=[UserProblemStatus.user_id, UserProblemStatus.problem_id]
+        ))
+    elif db.get(UserProblemStatus, (user_id, problem_id)) is None:
+        db.add(UserProblemStatus(user_id=user_id, problem_id=problem_id))
+        db.flush()
+
+def record_problem_status(db: Session, user_id: int, problem_id: int, status: str,
+                          runtime: Optional[float] = None, when: Optional[datetime] = None) -> bool:
+    """
+    Count one stored submission in the user's status row for the problem. The caller commits.
+    Args:
+        status: overall_status of the submission
+        runtime: Total execution time in seconds
+    Returns:
+        True if this was the user's first solve of the problem
+    """
+    when = when or datetime.utcnow()
+    passed = status == "pass"
+    _ensure_problem_row(db, user_id, problem_id)
+    row = (UserProblemStatus.user_id == user_id) & (UserProblemStatus.problem_id == problem_id)
+
+    values = {
+        UserProblemStatus.attempts: UserProblemStatus.attempts + 1,
+        UserProblemStatus.first_attempt_at: func.coalesce(UserProblemStatus.first_attempt_at, when),
+        UserProblemStatus.last_status: status,
+        UserProblemStatus.last_submission_at: when
+    }
+    if passed and runtime is not None:
+        best = UserProblemStatus.best_runtime
+        values[best] = case((best.is_(None) | (best > runtime), runtime), else_=best)
+    db.execute(update(UserProblemStatus).where(row).values(values).execution_options(synchronize_session=False))
+
+    first_solve = False
+    if passed:
+        # Only one submission can fill first_pass_at, so concurrent passes can't both count as first
+        result = db.execute(update(UserProblemStatus).where(row, UserProblemStatus.first_pass_at.is_(None)).values(
+            first_pass_at=when
+        ).execution_options(synchronize_session=False))
+        first_solve = result.rowcount == 1
+
+    loaded = db.identity_map.get(db.identity_key(UserProblemStatus, (user_id, problem_id)))
+    if loaded is not None:
+        db.expire(loaded)
+    return first_solve
+
+def has_solved(db: Session, user_id: int, problem_id: int) -> bool:
+    """Whether the user has already passed a problem (primary-key lookup)."""
+    status = db.get(UserProblemStatus, (user_id, problem_id))
+    return status is not None and status.first_pass_at is not None
+
+def get_solved_problem_ids(db: Session, user_id: int, problem_ids: Optional[List[int]] = None) -> Set[int]:
+    """Ids of the problems a user has solved, optionally limited to ``problem_ids``."""
+    query = db.query(UserProblemStatus.problem_id).filter(
+        UserProblemStatus.user_id == user_id,
+        UserProblemStatus.first_pass_at.isnot(None)
+    )
+    if problem_ids is not None:
+        if not problem_ids:
+            return set()
+        query = query.filter(UserProblemStatus.problem_id.in_(problem_ids))
+    return {problem_id for (problem_id,) in query.all()}
+
+def record_submission_stats(db: Session, user_id: int, problem: Problem, status: str,
+                            runtime: Optional[float] = None, when: Optional[datetime] = None) -> bool:
+    """
+    Count one stored submission in the user's stats and problem status. Call
+    before the Submission row itself is flushed; the caller commits.
+    Args:
+        problem: The submitted problem (for its difficulty)
+        status: overall_status of the submission
+        runtime: Total execution time in seconds
+    Returns:
+        True if this was the user's first solve of the problem
+    """
+    when = when or datetime.utcnow()
+    first_solve = record_problem_status(db, user_id, problem.id, status, runtime, when)
+    # Solved on the first try if this pass was the only attempt so far
+    first_try = first_solve and db.scalar(select(UserProblemStatus.attempts).where(
+        UserProblemStatus.user_id == user_id,
+        UserProblemStatus.problem_id == problem.id
+    )) == 1
+
+    _ensure_row(db, user_id)
+    # Increment in SQL so concurrent submissions don't lose updates
+    values = {
+        UserStats.total_submissions: UserStats.total_submissions + 1,
+        UserStats.first_submission_at: func.coalesce(UserStats.first_submission_at, when),
+        UserStats.updated_at: when
+    }
+    if first_solve:
+        values[UserStats.problems_solved] = UserStats.problems_solved + 1
+        values[UserStats.first_solve_at] = func.coalesce(UserStats.first_solve_at, when)
+        values[UserStats.last_solve_at] = when
+        if first_try:
+            values[UserStats.first_try_solves] = UserStats.first_try_solves + 1
+        column = DIFFICULTY_COLUMNS.get((problem.difficulty or "").lower())
+        if column is not None:
+            values[column] = column + 1
+    db.execute(update(UserStats).where(UserStats.user_id == user_id).values(values).execution_options(synchronize_session="fetch"))
+    # The achievements page shows these counters; recompute it once this commits
+    achievement_progress_cache.invalidate_on_commit(db, user_id)
+    return first_solve
+
+def get_user_stats(db: Session, user_id: int) -> UserStats:
+    """Single-row lookup of a user's stats; users without submissions get an unsaved all-zero row."""
+    row = db.get(UserStats, user_id)
+    if row is None:
+        row = UserStats(user_id=user_id, total_submissions=0, problems_solved=0, easy_solved=0, medium_solved=0,
+                        hard_solved=0, first_try_solves=0)
+    return row
+
+def get_solved_counts(db: Session, user_ids: List[int]) -> Dict[int, int]:
+    """problems_solved for several users in one lookup."""
+    counts = {user_id: 0 for user_id in user_ids}
+    if user_ids:
+        counts.update(db.query(UserStats.user_id, UserStats.problems_solved).filter(UserStats.user_id.in_(user_ids)).all())
+    return counts
+
+def backfill_user_stats(db: Session, user_ids: Optional[List[int]] = None) -> int:
+    """
+    Recompute user_stats and user_problem_status from the submissions table,
+    for all users or just ``user_ids``. Used to fill the table for existing history and to repair
+    drift. The caller commits.
+    Returns:
+        The number of rows written
+    """
+    backfill_problem_status(db, user_ids)
+
+    def only_users(query, column):
+        return query.filter(column.in_(user_ids)) if user_ids is not None else query
+
+    only_users(db.query(UserStats), UserStats.user_id).delete(synchronize_session="fetch")
+
+    totals = only_users(db.query(
+        Submission.user_id,
+        func.count(Submission.id),
+        func.min(Submission.submission_time)
+    ).filter(Submission.user_id.isnot(None)), Submission.user_id).group_by(Submission.user_id).all()
+
+    # First passing submission per (user, problem)
+    first_passes = only_users(db.query(
+        Submission.user_id,
+        Problem.difficulty,
+        func.min(Submission.submission_time)
+    ).join(Problem, Submission.problem_id == Problem.id).filter(
+        Submission.overall_status == "pass"
+    ), Submission.user_id).group_by(Submission.user_id, Submission.problem_id, Problem.difficulty).all()
+
+    rows = {
+        user_id: UserStats(user_id=user_id, total_submissions=total, first_submission_at=first_at,
+                           problems_solved=0, easy_solved=0, medium_solved=0, hard_solved=0, first_try_solves=0)
+        for user_id, total, first_at in totals
+    }
+    for user_id, difficulty, solved_at in first_passes:
+        row = rows[user_id]
+        row.problems_solved += 1
+        column = DIFFICULTY_COLUMNS.get((difficulty or "").lower())
+        if column is not None:
+            setattr(row, column.key, getattr(row, column.key) + 1)
+        if solved_at is not None:
+            row.first_solve_at = min(row.first_solve_at or solved_at, solved_at)
+            row.last_solve_at = max(row.last_solve_at or solved_at, solved_at)
+
+    # Problems whose first attempt passed, from the status rows rebuilt above
+    db.flush()
+    first_tries = only_users(db.query(UserProblemStatus.user_id, func.count()).filter(
+        UserProblemStatus.first_pass_at == UserProblemStatus.first_attempt_at
+    ), UserProblemStatus.user_id).group_by(UserProblemStatus.user_id).all()
+    for user_id, count in first_tries:
+        if user_id in rows:
+            rows[user_id].first_try_solves = count
+
+    db.add_all(rows.values())
+    logger.info(f"Backfilled stats for {len(rows)} users")
+    return len(rows)
+
+def backfill_problem_status(db: Session, user_ids: Optional[List[int]] = None) -> int:
+    """
+    Recompute user_problem_status from the submissions table, for all users or
+    just ``user_ids``. The caller commits.
+    Returns:
+        The number of rows written
+    """
+    delete = db.query(UserProblemStatus)
+    if user_ids is not None:
+        delete = delete.filter(UserProblemStatus.user_id.in_(user_ids))
+    delete.delete(synchronize_session="fetch")
+
+    passed = Submission.overall_status == "pass"
+    latest = aliased(Submission)
+    last_status = select(latest.overall_status).where(
+        latest.user_id == Submission.user_id,
+        latest.problem_id == Submission.problem_id
+    ).order_by(latest.submission_time.desc(), latest.id.desc()).limit(1).correlate(Submission).scalar_subquery()
+
+    query = db.query(
+        Submission.user_id,
+        Submission.problem_id,
+        func.count(Submission.id),
+        func.min(Submission.submission_time),
+        func.min(case((passed, Submission.submission_time))),
+        func.min(case((passed, Submission.execution_time))),
+        func.max(Submission.submission_time),
+        last_status
+    ).filter(Submission.user_id.isnot(None), Submission.problem_id.isnot(None))
+    if user_ids is not None:
+        query = query.filter(Submission.user_id.in_(user_ids))
+    rows = query.group_by(Submission.user_id, Submission.problem_id).all()
+
+    db.add_all(
+        UserProblemStatus(user_id=user_id, problem_id=problem_id, attempts=attempts, first_attempt_at=first_at,
+                          first_pass_at=first_pass_at, best_runtime=best_runtime, last_status=status,
+                          last_submission_at=last_at)
+        for user_id, problem_id, attempts, first_at, first_pass_at, best_runtime, last_at, status in rows
+    )
+    logger.info(f"Backfilled {len(rows)} problem status rows")
+    return len(rows)
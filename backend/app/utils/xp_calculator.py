@@ -33,13 +33,7 @@ def should_award_xp(user_id: int, problem_id: int, db) -> bool:
     Returns:
         True if XP should be awarded, False otherwise
     """
-    from ..db.models import Submission
+    from .user_stats import has_solved
     
-    # Check if user has already successfully solved this problem
-    previous_success = db.query(Submission).filter(
-        Submission.user_id == user_id,
-        Submission.problem_id == problem_id,
-        Submission.overall_status == 'pass'
-    ).first()
-    
-    return previous_success is None
\ No newline at end of file
+    # Primary-key lookup in user_problem_status instead of scanning submissions
+    return not has_solved(db, user_id, problem_id)
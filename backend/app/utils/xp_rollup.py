@@ -0,0 +1,103 @@
+"""
+Daily per-user XP rollup.
+
+Every XP award from a submission is also added to the user's bucket for that
+UTC day in user_daily_xp, so period leaderboards sum at most one small row per
+user per day of the window instead of scanning the submissions table.
+"""
+
+from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from datetime import date, datetime, timedelta
+from typing import Optional, Tuple
+import logging
+
+from ..db.models import UserDailyXP, Submission
+
+logger = logging.getLogger(__name__)
+
+CALENDAR_PERIODS = ("week", "month")
+
+def record_daily_xp(db: Session, user_id: int, xp: int, when: Optional[datetime] = None):
+    """
+    Add XP to a user's bucket for the UTC day of ``when`` (default now). The caller commits.
+    Uses a single upsert on PostgreSQL and SQLite so concurrent awards don't race.
+    """
+    if not xp or xp <= 0:
+        return
+    day = (when or datetime.utcnow()).date()
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        statement = insert(UserDailyXP).values(user_id=user_id, day=day, xp=xp)
+        statement = statement.on_conflict_do_update(
+            index_elements=[UserDailyXP.user_id, UserDailyXP.day],
+            set_={"xp": UserDailyXP.xp + statement.excluded.xp}
+        )
+        db.execute(statement)
+        return
+
+    row = db.get(UserDailyXP, (user_id, day))
+    if row is None:
+        db.add(UserDailyXP(user_id=user_id, day=day, xp=xp))
+    else:
+        row.xp += xp
+
+def rolling_window(days: int, now: Optional[datetime] = None) -> Tuple[date, date]:
+    """The last ``days`` UTC days, today included, as inclusive (start, end) days."""
+    today = (now or datetime.utcnow()).date()
+    return today - timedelta(days=days - 1), today
+
+def calendar_window(period: str, now: Optional[datetime] = None) -> Tuple[date, date]:
+    """The current calendar week (from Monday) or month up to today, as inclusive (start, end) days."""
+    today = (now or datetime.utcnow()).date()
+    if period == "week":
+        return today - timedelta(days=today.weekday()), today
+    if period == "month":
+        return today.replace(day=1), today
+    raise ValueError(f"Unknown calendar period: {period}")
+
+def period_xp_select(start_day: date, end_day: date):
+    """SELECT of (user_id, score) for XP earned between two days inclusive, for set-based rebuilds."""
+    xp = func.sum(UserDailyXP.xp)
+    return select(UserDailyXP.user_id.label("user_id"), xp.label("score")).where(
+        UserDailyXP.day >= start_day,
+        UserDailyXP.day <= end_day
+    ).group_by(UserDailyXP.user_id).having(xp > 0)
+
+def period_xp_query(db: Session, start_day: date, end_day: date):
+    """(user_id, xp) rows of XP earned between two days inclusive, highest first."""
+    xp = func.sum(UserDailyXP.xp).label("xp")
+    return db.query(UserDailyXP.user_id, xp).filter(
+        UserDailyXP.day >= start_day,
+        UserDailyXP.day <= end_day
+    ).group_by(UserDailyXP.user_id).having(xp > 0).order_by(xp.desc(), UserDailyXP.user_id)
+
+def backfill_daily_xp(db: Session) -> int:
+    """
+    Rebuild user_daily_xp from the submissions table, e.g. for history from
+    before the rollup existed. The caller commits.
+    Returns:
+        The number of buckets written
+    """
+    db.query(UserDailyXP).delete(synchronize_session=False)
+    day = func.date(Submission.submission_time)
+    rows = db.query(
+        Submission.user_id,
+        day.label("day"),
+        func.sum(Submission.xp_awarded).label("xp")
+    ).filter(
+        Submission.xp_awarded > 0,
+        Submission.user_id.isnot(None)
+    ).group_by(Submission.user_id, day).all()
+
+    for user_id, bucket_day, xp in rows:
+        # SQLite's date() returns text
+        if isinstance(bucket_day, str):
+            bucket_day = date.fromisoformat(bucket_day)
+        db.add(UserDailyXP(user_id=user_id, day=bucket_day, xp=int(xp)))
+    logger.info(f"Backfilled {len(rows)} daily XP buckets")
+    return len(rows)
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Rebuild the user_stats, user_problem_status and user_solve_days tables from the
+submissions table.
+
+Fills the tables for history from before it existed and repairs any drift.
+Pass user ids to repair only those users:
+
+    python backfill_user_stats.py            # every user
+    python backfill_user_stats.py 12 57      # just users 12 and 57
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.db.base import SessionLocal
+from app.utils.user_stats import backfill_user_stats
+from app.utils.solve_days import backfill_solve_days
+
+def main(user_ids=None):
+    db = SessionLocal()
+    try:
+        print(f"🔄 Rebuilding user stats for {'users ' + ', '.join(map(str, user_ids)) if user_ids else 'all users'}...")
+        rows = backfill_user_stats(db, user_ids)
+        day_rows = backfill_solve_days(db, user_ids)
+        db.commit()
+        print(f"✅ Wrote stats for {rows} users and solve days for {day_rows} users")
+    except Exception as e:
+        print(f"❌ Error rebuilding user stats: {e}")
+        db.rollback()
+        sys.exit(1)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or None)
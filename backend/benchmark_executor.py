@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the code executor.
+
+Runs the reference solutions of the seeded problems (app/db/problems_seed.json)
+through CodeExecutor and writes a JSON report:
+
+    cold_start       - one call in a fresh interpreter, a fresh sandbox worker and a warm worker
+    per_case         - extra time each additional test case adds to a submission
+    latency          - run_all_test_cases latency per problem (p50/p95/p99)
+    throughput       - submissions per second with N submissions in flight
+
+Reports use sorted keys so two of them diff cleanly; progress goes to stderr.
+Compare against an older report with --compare; the exit code is 1 when a
+latency or throughput metric regressed by more than --max-regression percent.
+
+Usage:
+    python benchmark_executor.py --output report.json
+    python benchmark_executor.py --iterations 50 --concurrency 1,4,16 --compare baseline.json
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import platform
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from app.code_runner.executor import CodeExecutor
+from app.code_runner.worker_pool import POOL_ENABLED, POOL_SIZE, WorkerPool, get_worker_pool
+
+REPORT_VERSION = 1
+SEED_PATH = Path(__file__).parent / "app" / "db" / "problems_seed.json"
+TIMEOUT = 5
+MEMORY_LIMIT_MB = 128
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Linear-interpolated percentile of a list of samples."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Latency summary of timing samples, in milliseconds."""
+    return {
+        'samples': len(samples),
+        'mean_ms': round(sum(samples) / len(samples) * 1000, 3) if samples else 0.0,
+        'p50_ms': round(percentile(samples, 50) * 1000, 3),
+        'p95_ms': round(percentile(samples, 95) * 1000, 3),
+        'p99_ms': round(percentile(samples, 99) * 1000, 3),
+        'max_ms': round(max(samples) * 1000, 3) if samples else 0.0
+    }
+
+
+def load_problems(titles: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Seeded problems that can be benchmarked: ones with test cases and a reference solution.
+    Returns dicts with title, code, function_name and test_cases.
+    """
+    with open(SEED_PATH) as seed_file:
+        seed = json.load(seed_file)
+    problems = []
+    for problem in seed:
+        if titles and problem['title'] not in titles:
+            continue
+        match = re.search(r"def (\w+)\(", problem.get('reference_solution') or "")
+        if not problem.get('test_cases') or not match:
+            continue
+        problems.append({
+            'title': problem['title'],
+            'code': problem['reference_solution'],
+            'function_name': match.group(1),
+            'test_cases': problem['test_cases']
+        })
+    return problems
+
+
+def timed(fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - started, result
+
+
+def bench_cold_start(problem: Dict[str, Any], iterations: int) -> Dict[str, Any]:
+    """Latency of a single call with nothing warm, with a fresh worker and with a warm worker."""
+    test_input = problem['test_cases'][0]['input']
+    cold_executor = CodeExecutor(timeout=TIMEOUT, memory_limit_mb=MEMORY_LIMIT_MB, use_pool=False)
+    fresh_interpreter = [
+        timed(cold_executor.execute_python_function, problem['code'], problem['function_name'], test_input)[0]
+        for _ in range(iterations)
+    ]
+
+    # A worker's first request pays for the interpreter start plus the first fork
+    fresh_worker = []
+    for _ in range(max(1, iterations // 4)):
+        pool = WorkerPool(size=1, memory_limit_mb=MEMORY_LIMIT_MB)
+        try:
+            fresh_worker.append(timed(pool.run, problem['code'], problem['function_name'], test_input, TIMEOUT)[0])
+        finally:
+            pool.close()
+
+    report = {
+        'fresh_interpreter': summarize(fresh_interpreter),
+        'fresh_worker': summarize(fresh_worker)
+    }
+    if get_worker_pool(MEMORY_LIMIT_MB) is not None:
+        warm_executor = CodeExecutor(timeout=TIMEOUT, memory_limit_mb=MEMORY_LIMIT_MB)
+        report['warm_worker'] = summarize([
+            timed(warm_executor.execute_python_function, problem['code'], problem['function_name'], test_input)[0]
+            for _ in range(iterations)
+        ])
+    return report
+
+
+def bench_per_case(problem: Dict[str, Any], iterations: int, cases: int = 32) -> Dict[str, Any]:
+    """Marginal cost of one more test case: (time for N cases - time for 1 case) / (N - 1)."""
+    executor = CodeExecutor(timeout=TIMEOUT, memory_limit_mb=MEMORY_LIMIT_MB)
+    one = problem['test_cases'][:1]
+    many = (problem['test_cases'] * cases)[:cases]
+    single = [timed(executor.run_all_test_cases, problem['code'], one, problem['function_name'])[0] for _ in range(iterations)]
+    full = [timed(executor.run_all_test_cases, problem['code'], many, problem['function_name'])[0] for _ in range(iterations)]
+    return {
+        'cases': cases,
+        'single_case_p50_ms': round(percentile(single, 50) * 1000, 3),
+        'all_cases_p50_ms': round(percentile(full, 50) * 1000, 3),
+        'per_case_overhead_ms': round((percentile(full, 50) - percentile(single, 50)) / (cases - 1) * 1000, 3)
+    }
+
+
+def bench_latency(problem: Dict[str, Any], iterations: int, parallel: bool) -> Dict[str, Any]:
+    """End-to-end run_all_test_cases latency for one problem."""
+    executor = CodeExecutor(timeout=TIMEOUT, memory_limit_mb=MEMORY_LIMIT_MB, parallel=parallel)
+    samples = []
+    failures = 0
+    for _ in range(iterations):
+        elapsed, results = timed(executor.run_all_test_cases, problem['code'], problem['test_cases'], problem['function_name'])
+        samples.append(elapsed)
+        if results['overall_status'] != 'pass':
+            failures += 1
+    return dict(summarize(samples), failures=failures)
+
+
+def bench_throughput(problems: List[Dict[str, Any]], concurrency: int, iterations: int) -> Dict[str, Any]:
+    """Run concurrency * iterations submissions, concurrency at a time, over all problems."""
+    executor = CodeExecutor(timeout=TIMEOUT, memory_limit_mb=MEMORY_LIMIT_MB)
+    jobs = [problems[i % len(problems)] for i in range(concurrency * iterations)]
+
+    def submit(problem):
+        return timed(executor.run_all_test_cases, problem['code'], problem['test_cases'], problem['function_name'])
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as threads:
+        outcomes = list(threads.map(submit, jobs))
+    elapsed = time.perf_counter() - started
+    return dict(
+        summarize([sample for sample, _ in outcomes]),
+        concurrency=concurrency,
+        submissions=len(jobs),
+        submissions_per_second=round(len(jobs) / elapsed, 2) if elapsed else 0.0,
+        failures=sum(1 for _, results in outcomes if results['overall_status'] != 'pass')
+    )
+
+
+def run_benchmark(iterations: int = 20, concurrency: Optional[List[int]] = None, titles: Optional[List[str]] = None,
+                  label: str = "") -> Dict[str, Any]:
+    """
+    Run every benchmark and return the report.
+    Args:
+        iterations: Samples per measurement
+        concurrency: Numbers of in-flight submissions to measure throughput at
+        titles: Only benchmark these seeded problems
+        label: Free-form tag stored in the report (e.g. a commit hash)
+    Returns:
+        The report dict
+    """
+    concurrency = concurrency or [1, 4, 8]
+    problems = load_problems(titles)
+    if not problems:
+        raise ValueError("No benchmarkable problems found in the seed file")
+
+    print(f"🏁 Benchmarking {len(problems)} problems, {iterations} iterations each", file=sys.stderr)
+    # Warm the shared pool first so the cold start numbers below are the only cold ones
+    get_worker_pool(MEMORY_LIMIT_MB)
+    print("⏱️  Cold start...", file=sys.stderr)
+    cold_start = bench_cold_start(problems[0], iterations)
+    print("⏱️  Per test case overhead...", file=sys.stderr)
+    per_case = {problem['title']: bench_per_case(problem, iterations) for problem in problems}
+    print("⏱️  Latency...", file=sys.stderr)
+    latency = {
+        problem['title']: {
+            'sequential': bench_latency(problem, iterations, parallel=False),
+            'parallel': bench_latency(problem, iterations, parallel=True)
+        }
+        for problem in problems
+    }
+    throughput = {}
+    for level in concurrency:
+        print(f"⏱️  Throughput at {level} concurrent submissions...", file=sys.stderr)
+        throughput[str(level)] = bench_throughput(problems, level, iterations)
+
+    return {
+        'version': REPORT_VERSION,
+        'label': label,
+        'created_at': datetime.datetime.utcnow().isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'pool_enabled': POOL_ENABLED,
+            'pool_size': POOL_SIZE
+        },
+        'config': {
+            'iterations': iterations,
+            'concurrency': concurrency,
+            'problems': [problem['title'] for problem in problems],
+            'timeout': TIMEOUT,
+            'memory_limit_mb': MEMORY_LIMIT_MB
+        },
+        'cold_start': cold_start,
+        'per_case': per_case,
+        'latency': latency,
+        'throughput': throughput
+    }
+
+
+def flatten(report: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    """Numeric leaves of the measurement sections, keyed by dotted path."""
+    metrics = {}
+    for key, value in report.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            metrics.update(flatten(value, path + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            metrics[path] = value
+    return metrics
+
+
+def compare_reports(baseline: Dict[str, Any], current: Dict[str, Any], max_regression: float) -> List[str]:
+    """
+    Print metric changes between two reports.
+    Returns the latency metrics (*_ms) that got slower, or throughput metrics
+    that dropped, by more than max_regression percent.
+    """
+    sections = ('cold_start', 'per_case', 'latency', 'throughput')
+    old = flatten({key: baseline.get(key, {}) for key in sections})
+    new = flatten({key: current.get(key, {}) for key in sections})
+    regressions = []
+    for path in sorted(set(old) & set(new)):
+        if not old[path]:
+            continue
+        change = (new[path] - old[path]) / old[path] * 100
+        print(f"  {path}: {old[path]} -> {new[path]} ({change:+.1f}%)")
+        if path.endswith('_ms') and change > max_regression:
+            regressions.append(path)
+        elif path.endswith('submissions_per_second') and -change > max_regression:
+            regressions.append(path)
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the code executor")
+    parser.add_argument("--iterations", type=int, default=20, help="samples per measurement")
+    parser.add_argument("--concurrency", default="1,4,8", help="comma-separated numbers of concurrent submissions")
+    parser.add_argument("--problem", action="append", dest="problems", help="only benchmark this seeded problem (repeatable)")
+    parser.add_argument("--label", default="", help="tag stored in the report, e.g. a commit hash")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="baseline report to compare against")
+    parser.add_argument("--max-regression", type=float, default=25.0, help="allowed slowdown in percent for --compare")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(
+        iterations=args.iterations,
+        concurrency=[int(level) for level in args.concurrency.split(",") if level.strip()],
+        titles=args.problems,
+        label=args.label
+    )
+    data = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write(data + "\n")
+        print(f"📄 Report written to {args.output}")
+    else:
+        print(data)
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        print(f"📊 Compared with {args.compare}:")
+        regressions = compare_reports(baseline, report, args.max_regression)
+        if regressions:
+            print(f"❌ {len(regressions)} metrics regressed by more than {args.max_regression}%:")
+            for path in regressions:
+                print(f"  {path}")
+            return 1
+        print("✅ No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,34 @@
+"""Add first_try_solves to user stats
+
+Revision ID: 0a7e4c2b9d18
+Revises: f6c83a1d0b57
+Create Date: 2026-10-17 20:05:43.881902
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0a7e4c2b9d18'
+down_revision: Union[str, Sequence[str], None] = 'f6c83a1d0b57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add user_stats.first_try_solves and fill it from user_problem_status."""
+    op.add_column('user_stats', sa.Column('first_try_solves', sa.Integer(), nullable=False, server_default='0'))
+    op.execute("""
+        UPDATE user_stats SET first_try_solves = (
+            SELECT COUNT(*) FROM user_problem_status ps
+            WHERE ps.user_id = user_stats.user_id AND ps.first_pass_at = ps.first_attempt_at
+        )
+    """)
+
+
+def downgrade() -> None:
+    """Remove user_stats.first_try_solves."""
+    op.drop_column('user_stats', 'first_try_solves')
@@ -0,0 +1,34 @@
+"""Add processed events table for idempotent post-submission handlers
+
+Revision ID: 1b9d5e3f7a26
+Revises: 0a7e4c2b9d18
+Create Date: 2026-10-17 21:12:08.447195
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1b9d5e3f7a26'
+down_revision: Union[str, Sequence[str], None] = '0a7e4c2b9d18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add processed_events."""
+    op.create_table(
+        'processed_events',
+        sa.Column('idempotency_key', sa.String(), nullable=False),
+        sa.Column('handler', sa.String(), nullable=False),
+        sa.Column('processed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('idempotency_key', 'handler')
+    )
+
+
+def downgrade() -> None:
+    """Remove processed_events."""
+    op.drop_table('processed_events')
@@ -0,0 +1,36 @@
+"""Add user_solve_days bitmap for streaks and calendars
+
+Revision ID: 2c6f8a0e4b31
+Revises: 1b9d5e3f7a26
+Create Date: 2026-10-17 22:03:41.512866
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2c6f8a0e4b31'
+down_revision: Union[str, Sequence[str], None] = '1b9d5e3f7a26'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add user_solve_days (filled from submissions on the next app start)."""
+    op.create_table(
+        'user_solve_days',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('start_day', sa.Integer(), nullable=True),
+        sa.Column('bitmap', sa.LargeBinary(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade() -> None:
+    """Remove user_solve_days."""
+    op.drop_table('user_solve_days')
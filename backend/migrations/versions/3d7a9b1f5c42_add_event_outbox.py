@@ -0,0 +1,43 @@
+"""Add event outbox and index processed events for pruning
+
+Revision ID: 3d7a9b1f5c42
+Revises: 2c6f8a0e4b31
+Create Date: 2026-10-17 23:18:26.904512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3d7a9b1f5c42'
+down_revision: Union[str, Sequence[str], None] = '2c6f8a0e4b31'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add event_outbox and an index on processed_events.processed_at."""
+    op.create_table(
+        'event_outbox',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('event', sa.String(), nullable=False),
+        sa.Column('idempotency_key', sa.String(), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('shard', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('processed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('idempotency_key')
+    )
+    op.create_index('ix_event_outbox_processed_at', 'event_outbox', ['processed_at'])
+    op.create_index('ix_processed_events_processed_at', 'processed_events', ['processed_at'])
+
+
+def downgrade() -> None:
+    """Remove event_outbox and the processed_events index."""
+    op.drop_index('ix_processed_events_processed_at', table_name='processed_events')
+    op.drop_index('ix_event_outbox_processed_at', table_name='event_outbox')
+    op.drop_table('event_outbox')
@@ -0,0 +1,37 @@
+"""Add problem test bundles table
+
+Revision ID: b7d2e91c4a10
+Revises: 95e4c89ab143
+Create Date: 2026-10-17 10:12:41.502113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d2e91c4a10'
+down_revision: Union[str, Sequence[str], None] = '95e4c89ab143'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add precompiled test-case bundles. Rows are built lazily for existing problems."""
+    op.create_table(
+        'problem_test_bundles',
+        sa.Column('problem_id', sa.Integer(), nullable=False),
+        sa.Column('format', sa.Integer(), nullable=False),
+        sa.Column('digest', sa.String(length=64), nullable=False),
+        sa.Column('bundle', sa.JSON(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['problem_id'], ['problems.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('problem_id')
+    )
+
+
+def downgrade() -> None:
+    """Remove precompiled test-case bundles."""
+    op.drop_table('problem_test_bundles')
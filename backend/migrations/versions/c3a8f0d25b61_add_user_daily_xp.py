@@ -0,0 +1,44 @@
+"""Add daily per-user XP rollup table
+
+Revision ID: c3a8f0d25b61
+Revises: b7d2e91c4a10
+Create Date: 2026-10-17 14:03:27.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3a8f0d25b61'
+down_revision: Union[str, Sequence[str], None] = 'b7d2e91c4a10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add user_daily_xp and fill it from existing submissions."""
+    op.create_table(
+        'user_daily_xp',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('xp', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'day')
+    )
+    op.create_index('ix_user_daily_xp_day', 'user_daily_xp', ['day'], unique=False)
+    op.execute("""
+        INSERT INTO user_daily_xp (user_id, day, xp)
+        SELECT user_id, DATE(submission_time), SUM(xp_awarded)
+        FROM submissions
+        WHERE xp_awarded > 0 AND user_id IS NOT NULL
+        GROUP BY user_id, DATE(submission_time)
+    """)
+
+
+def downgrade() -> None:
+    """Remove user_daily_xp."""
+    op.drop_index('ix_user_daily_xp_day', table_name='user_daily_xp')
+    op.drop_table('user_daily_xp')
@@ -0,0 +1,66 @@
+"""Add denormalized user stats table
+
+Revision ID: d91c47a3e2f8
+Revises: c3a8f0d25b61
+Create Date: 2026-10-17 16:41:09.734520
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd91c47a3e2f8'
+down_revision: Union[str, Sequence[str], None] = 'c3a8f0d25b61'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add user_stats and fill it from existing submissions."""
+    op.create_table(
+        'user_stats',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('total_submissions', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('problems_solved', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('easy_solved', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('medium_solved', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('hard_solved', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('first_submission_at', sa.DateTime(), nullable=True),
+        sa.Column('first_solve_at', sa.DateTime(), nullable=True),
+        sa.Column('last_solve_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+    op.execute("""
+        INSERT INTO user_stats (user_id, total_submissions, problems_solved, easy_solved, medium_solved, hard_solved,
+                                first_submission_at, first_solve_at, last_solve_at, updated_at)
+        SELECT t.user_id, t.total, COALESCE(f.solved, 0), COALESCE(f.easy, 0), COALESCE(f.medium, 0), COALESCE(f.hard, 0),
+               t.first_at, f.first_solve, f.last_solve, CURRENT_TIMESTAMP
+        FROM (
+            SELECT user_id, COUNT(*) AS total, MIN(submission_time) AS first_at
+            FROM submissions WHERE user_id IS NOT NULL GROUP BY user_id
+        ) t
+        LEFT JOIN (
+            SELECT p.user_id, COUNT(*) AS solved,
+                   SUM(CASE WHEN LOWER(p.difficulty) = 'easy' THEN 1 ELSE 0 END) AS easy,
+                   SUM(CASE WHEN LOWER(p.difficulty) = 'medium' THEN 1 ELSE 0 END) AS medium,
+                   SUM(CASE WHEN LOWER(p.difficulty) = 'hard' THEN 1 ELSE 0 END) AS hard,
+                   MIN(p.solved_at) AS first_solve, MAX(p.solved_at) AS last_solve
+            FROM (
+                SELECT s.user_id, s.problem_id, pr.difficulty, MIN(s.submission_time) AS solved_at
+                FROM submissions s JOIN problems pr ON pr.id = s.problem_id
+                WHERE s.overall_status = 'pass'
+                GROUP BY s.user_id, s.problem_id, pr.difficulty
+            ) p
+            GROUP BY p.user_id
+        ) f ON f.user_id = t.user_id
+    """)
+
+
+def downgrade() -> None:
+    """Remove user_stats."""
+    op.drop_table('user_stats')
@@ -0,0 +1,57 @@
+"""Add per-(user, problem) solve status table
+
+Revision ID: e5b20f7c9a34
+Revises: d91c47a3e2f8
+Create Date: 2026-10-17 18:02:51.218407
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b20f7c9a34'
+down_revision: Union[str, Sequence[str], None] = 'd91c47a3e2f8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add user_problem_status and fill it from existing submissions."""
+    op.create_table(
+        'user_problem_status',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('problem_id', sa.Integer(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('first_attempt_at', sa.DateTime(), nullable=True),
+        sa.Column('first_pass_at', sa.DateTime(), nullable=True),
+        sa.Column('best_runtime', sa.Float(), nullable=True),
+        sa.Column('last_status', sa.String(), nullable=True),
+        sa.Column('last_submission_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['problem_id'], ['problems.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'problem_id')
+    )
+    op.create_index('ix_user_problem_status_problem', 'user_problem_status', ['problem_id'])
+    op.execute("""
+        INSERT INTO user_problem_status (user_id, problem_id, attempts, first_attempt_at, first_pass_at,
+                                         best_runtime, last_status, last_submission_at)
+        SELECT s.user_id, s.problem_id, COUNT(*), MIN(s.submission_time),
+               MIN(CASE WHEN s.overall_status = 'pass' THEN s.submission_time END),
+               MIN(CASE WHEN s.overall_status = 'pass' THEN s.execution_time END),
+               (SELECT l.overall_status FROM submissions l
+                WHERE l.user_id = s.user_id AND l.problem_id = s.problem_id
+                ORDER BY l.submission_time DESC, l.id DESC LIMIT 1),
+               MAX(s.submission_time)
+        FROM submissions s
+        WHERE s.user_id IS NOT NULL AND s.problem_id IS NOT NULL
+        GROUP BY s.user_id, s.problem_id
+    """)
+
+
+def downgrade() -> None:
+    """Remove user_problem_status."""
+    op.drop_index('ix_user_problem_status_problem', table_name='user_problem_status')
+    op.drop_table('user_problem_status')
@@ -0,0 +1,61 @@
+"""Add indexes for the hot submission, social and forum query patterns
+
+Revision ID: f6c83a1d0b57
+Revises: e5b20f7c9a34
+Create Date: 2026-10-17 19:14:27.503611
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6c83a1d0b57'
+down_revision: Union[str, Sequence[str], None] = 'e5b20f7c9a34'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (index name, table, columns), in step with the __table_args__ in app/db/models.py
+INDEXES = [
+    ('ix_submissions_user_status_problem', 'submissions', ['user_id', 'overall_status', 'problem_id']),
+    ('ix_submissions_user_problem_time', 'submissions', ['user_id', 'problem_id', 'submission_time']),
+    ('ix_submissions_problem_status', 'submissions', ['problem_id', 'overall_status']),
+    ('ix_submissions_time_user', 'submissions', ['submission_time', 'user_id']),
+    ('ix_bookmarks_user_created', 'bookmarks', ['user_id', 'created_at']),
+    ('ix_friendships_requester_status', 'friendships', ['requester_id', 'status']),
+    ('ix_friendships_addressee_status', 'friendships', ['addressee_id', 'status']),
+    ('ix_user_achievements_user', 'user_achievements', ['user_id', 'achievement_id']),
+    ('ix_challenges_challenger_created', 'challenges', ['challenger_id', 'created_at']),
+    ('ix_challenges_challenged_created', 'challenges', ['challenged_id', 'created_at']),
+    ('ix_challenge_results_challenge', 'challenge_results', ['challenge_id']),
+    ('ix_forum_threads_category_updated', 'forum_threads', ['category_id', 'updated_at']),
+    ('ix_forum_replies_thread_created', 'forum_replies', ['thread_id', 'created_at']),
+    ('ix_forum_votes_reply', 'forum_votes', ['reply_id']),
+    ('ix_code_snippets_user_created', 'code_snippets', ['user_id', 'created_at']),
+    ('ix_snippet_likes_snippet', 'snippet_likes', ['snippet_id']),
+    ('ix_snippet_comments_snippet_created', 'snippet_comments', ['snippet_id', 'created_at']),
+]
+
+
+def _existing_indexes(inspector, table):
+    return {index['name'] for index in inspector.get_indexes(table)}
+
+
+def upgrade() -> None:
+    """Create the indexes, skipping tables that don't exist and indexes that create_all already made."""
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+    for name, table, columns in INDEXES:
+        if table in tables and name not in _existing_indexes(inspector, table):
+            op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    """Drop the indexes."""
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+    for name, table, _ in reversed(INDEXES):
+        if table in tables and name in _existing_indexes(inspector, table):
+            op.drop_index(name, table_name=table)
@@ -0,0 +1,9 @@
+from fastapi.testclient import TestClient
+from app.main import app
+
+client = TestClient(app)
+
+def test_list_problems_with_stale_token_is_anonymous():
+    # A bad token in storage must not lock users out of the public list
+    resp = client.get("/api/problems/", headers={"Authorization": "Bearer not-a-valid-token"})
+    assert resp.status_code == 200
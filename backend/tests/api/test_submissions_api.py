@@ -19,4 +19,10 @@ def test_submit_code_unauthenticated():
         "language": "python"
     })
     assert resp.status_code == 401
-    assert "Not authenticated" in resp.text 
\ No newline at end of file
+    assert "Not authenticated" in resp.text
+
+
+def test_get_submission_job_unauthenticated():
+    resp = client.get("/api/submissions/jobs/some-job")
+    assert resp.status_code == 401
+    assert "Not authenticated" in resp.text
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+from app.db.models import User, Problem, UserAchievement
+from app.utils.achievements import initialize_default_achievements, check_achievements, get_achievement_counters, get_user_achievements
+from app.utils.achievement_progress import achievement_progress_cache
+from app.utils.user_stats import record_submission_stats
+
+
+def test_counter_streak_and_first_try_conditions(db):
+    problems = [Problem(id=i, title=str(i), description="", difficulty="Easy") for i in range(1, 7)]
+    db.add_all([User(id=1, username="a", total_xp=0, current_streak=3, longest_streak=3)] + problems)
+    db.commit()
+    initialize_default_achievements(db)
+
+    start = datetime(2026, 1, 1)
+    # Five problems passed on the first try, one only after a failure
+    for i, problem in enumerate(problems[:5]):
+        record_submission_stats(db, 1, problem, "pass", runtime=1.0, when=start + timedelta(minutes=i))
+    record_submission_stats(db, 1, problems[5], "fail", when=start + timedelta(minutes=10))
+    record_submission_stats(db, 1, problems[5], "pass", when=start + timedelta(minutes=11))
+    db.commit()
+
+    counters = get_achievement_counters(db, 1)
+    assert counters["problems_solved"] == 6
+    assert counters["first_try_solves"] == 5
+    assert counters["longest_streak"] == 3
+
+    earned = {a["name"] for a in check_achievements(1, "submission_success", db, execution_time=0.5, difficulty="Easy")}
+    assert earned == {"First Steps", "Problem Solver", "On Fire", "Speed Demon", "Perfectionist"}
+    assert db.get(User, 1).total_xp == 50 + 100 + 200 + 100 + 300
+
+    # Nothing is awarded twice, and a manual check never awards speed
+    assert check_achievements(1, "manual_check", db) == []
+    assert db.query(UserAchievement).count() == 5
+
+
+def test_progress_is_cached_until_the_next_submission(db):
+    achievement_progress_cache.clear()
+    problems = [Problem(id=i, title=str(i), description="", difficulty="Medium") for i in range(1, 3)]
+    db.add_all([User(id=1, username="a", total_xp=0)] + problems)
+    db.commit()
+    initialize_default_achievements(db)
+
+    def progress():
+        return {a["name"]: a["progress"] for a in get_user_achievements(1, db)["achievements"]}
+
+    assert progress()["Problem Solver"] == 0
+    record_submission_stats(db, 1, problems[0], "pass")
+    # Still the cached page until the submission commits
+    assert progress()["Problem Solver"] == 0
+    db.commit()
+    page = progress()
+    assert page["Problem Solver"] == 1
+    assert page["Medium Challenger"] == 1
+    assert page["Perfectionist"] == 1
+    # Callers get their own copy of the cached page
+    first = get_user_achievements(1, db)
+    first["achievements"].clear()
+    assert get_user_achievements(1, db)["achievements"]
+
+
+def test_progress_cache_is_dropped_when_the_streak_updates(db):
+    from app.utils.streak_calculator import update_user_streak
+    achievement_progress_cache.clear()
+    db.add(User(id=1, username="a", total_xp=0, current_streak=0, longest_streak=0))
+    db.commit()
+    initialize_default_achievements(db)
+
+    def progress():
+        return {a["name"]: a["progress"] for a in get_user_achievements(1, db)["achievements"]}
+
+    assert progress()["On Fire"] == 0
+    update_user_streak(1, db)
+    assert progress()["On Fire"] == 1
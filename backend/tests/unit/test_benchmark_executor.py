@@ -0,0 +1,20 @@
+import benchmark_executor
+
+
+def test_percentile_interpolates():
+    assert benchmark_executor.percentile([1.0, 2.0, 3.0, 4.0], 50) == 2.5
+    assert benchmark_executor.percentile([5.0], 99) == 5.0
+
+def test_seed_problems_pass_their_own_tests():
+    report = benchmark_executor.run_benchmark(iterations=2, concurrency=[2], titles=['Two Sum', 'Valid Parentheses'])
+    assert set(report['latency']) == {'Two Sum', 'Valid Parentheses'}
+    assert all(entry['sequential']['failures'] == 0 for entry in report['latency'].values())
+    assert report['throughput']['2']['submissions'] == 4
+    assert report['throughput']['2']['failures'] == 0
+
+def test_compare_flags_slower_latency():
+    baseline = {'latency': {'Two Sum': {'sequential': {'p95_ms': 10.0}}}, 'throughput': {'4': {'submissions_per_second': 100.0}}}
+    current = {'latency': {'Two Sum': {'sequential': {'p95_ms': 20.0}}}, 'throughput': {'4': {'submissions_per_second': 50.0}}}
+    assert benchmark_executor.compare_reports(baseline, current, 25.0) == \
+        ['latency.Two Sum.sequential.p95_ms', 'throughput.4.submissions_per_second']
+    assert benchmark_executor.compare_reports(baseline, baseline, 25.0) == []
@@ -0,0 +1,70 @@
+import datetime
+from app.code_runner.executor import CodeExecutor
+from app.code_runner.harness import parse_input
+from app.code_runner.case_bundle import build_test_bundle, bundle_cases, canonicalize_output
+
+executor = CodeExecutor(timeout=2)
+
+ADD_CODE = """
+def solution(a, b):
+    return a + b
+"""
+
+def test_bundle_pre_parses_inputs():
+    bundle = build_test_bundle([{'input': '[1, 2]\n3', 'output': '6'}, {'input': 'inf', 'output': 'x'}])
+    assert bundle['cases'][0]['args'] == parse_input('[1, 2]\n3')
+    # Non-finite floats can't be stored as JSON, so the harness parses them itself
+    assert bundle['cases'][1]['args'] is None
+
+def test_canonical_comparison_matches_text_comparison():
+    pairs = [
+        ('42', '42'), ('42', '43'), ('[1,2,3]', '[1, 2, 3]'), ('[1,2,3]', '[1,2,4]'),
+        ('3.140', '3.14'), ('3.14', '2.71'), ('true', 'True'), ('1', 'true'),
+        ('hello\n[1, 2]', '[1,2]'), ('a\nb', 'a\nb'), ('1 2 3', '[1,2,3]'),
+        ('inf', 'inf'), ('5', 'inf'), ('NaN', 'NaN'), ('[NaN]', '[NaN]'), ('', '')
+    ]
+    for actual, expected in pairs:
+        assert executor.validate_output(actual, expected, canonicalize_output(expected)) == \
+            executor.validate_output(actual, expected), (actual, expected)
+
+def test_bundle_cases_only_match_same_test_cases():
+    test_cases = [{'input': '1\n2', 'output': '3'}, {'input': '2\n2', 'output': '4'}]
+    bundle = build_test_bundle(test_cases)
+    assert bundle_cases(bundle, test_cases) == bundle['cases']
+    assert bundle_cases(bundle, test_cases[:1]) == bundle['cases'][:1]
+    assert bundle_cases(bundle, [{'input': '1\n2', 'output': '4'}]) is None
+    assert bundle_cases(dict(bundle, format=0), test_cases) is None
+
+def test_run_with_bundle_matches_run_without():
+    test_cases = [{'input': '1\n2', 'output': '3'}, {'input': '"a"\n"b"', 'output': 'ab'}, {'input': '1\n1', 'output': '3'}]
+    bundled = executor.run_all_test_cases(ADD_CODE, test_cases, bundle=build_test_bundle(test_cases))
+    plain = executor.run_all_test_cases(ADD_CODE, test_cases)
+    assert [(r['output'], r['passed']) for r in bundled['test_case_results']] == \
+        [(r['output'], r['passed']) for r in plain['test_case_results']]
+    assert bundled['overall_status'] == 'partial'
+
+def test_get_test_bundle_uses_stamp_and_leaves_caller_transaction_alone(db, monkeypatch):
+    from app.db.models import Problem, ProblemTestBundle
+    from app.code_runner import case_bundle
+    test_cases = [{'input': '1\n2', 'output': '3'}]
+    db.add(Problem(id=1, title="p", description="", difficulty="Easy"))
+    db.commit()
+
+    # A problem from before bundles: built and saved without committing the caller's pending changes
+    db.add(Problem(id=2, title="pending", description="", difficulty="Easy"))
+    bundle = case_bundle.get_test_bundle(db, 1, test_cases)
+    db.rollback()
+    assert db.get(Problem, 2) is None
+    assert db.get(ProblemTestBundle, 1).digest == bundle['digest']
+
+    # Later runs come from the memo without hashing the test cases
+    monkeypatch.setattr(case_bundle, "test_set_digest", None)
+    assert case_bundle.get_test_bundle(db, 1, test_cases) is bundle
+    monkeypatch.undo()
+
+    # A rebuild by another process moves the stamp, so its bundle replaces the memoized one
+    rebuilt = case_bundle.build_test_bundle([{'input': '2\n2', 'output': '4'}])
+    row = db.get(ProblemTestBundle, 1)
+    row.bundle, row.updated_at = rebuilt, row.updated_at + datetime.timedelta(seconds=1)
+    db.commit()
+    assert case_bundle.get_test_bundle(db, 1, test_cases) == rebuilt
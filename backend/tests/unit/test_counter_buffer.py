@@ -0,0 +1,68 @@
+from sqlalchemy.orm import sessionmaker
+from app.db.models import User, Problem, ForumCategory, ForumThread
+from app.utils.counter_buffer import CounterBuffer
+
+
+def test_increments_are_summed_and_written_in_one_flush(db):
+    db.add_all([User(id=1, username="a"), ForumCategory(id=1, name="c")] +
+               [Problem(id=i, title=str(i), description="", difficulty="Easy", view_count=0, attempt_count=0, solve_count=0) for i in (1, 2)])
+    db.add(ForumThread(id=1, category_id=1, author_id=1, title="t", content="", view_count=None))
+    db.commit()
+    buffer = CounterBuffer(session_factory=sessionmaker(bind=db.get_bind()))
+
+    for _ in range(50):
+        buffer.increment(Problem, 1, "view_count")
+    buffer.increment(Problem, 1, "attempt_count", 3)
+    buffer.increment(Problem, 2, "solve_count")
+    buffer.increment(ForumThread, 1, "view_count", 2)
+    assert buffer.pending(Problem, 1, "view_count") == 50
+
+    assert buffer.flush() == 3
+    assert buffer.flush() == 0
+    db.expire_all()
+    assert (db.get(Problem, 1).view_count, db.get(Problem, 1).attempt_count) == (50, 3)
+    assert db.get(Problem, 2).solve_count == 1
+    assert db.get(ForumThread, 1).view_count == 2
+    assert buffer.pending(Problem, 1, "view_count") == 0
+
+
+def test_failed_flush_keeps_increments_and_on_commit_waits_for_commit(db):
+    db.add(Problem(id=1, title="p", description="", difficulty="Easy", view_count=0))
+    db.commit()
+    working = sessionmaker(bind=db.get_bind())
+
+    def broken():
+        raise RuntimeError("database down")
+
+    buffer = CounterBuffer(session_factory=broken)
+    buffer.increment(Problem, 1, "view_count")
+    assert buffer.flush() == 0
+    assert buffer.pending(Problem, 1, "view_count") == 1
+
+    buffer.session_factory = working
+    buffer.increment_on_commit(db, Problem, 1, "view_count")
+    db.rollback()
+    assert buffer.pending(Problem, 1, "view_count") == 1
+    db.commit()
+    assert buffer.pending(Problem, 1, "view_count") == 2
+    buffer.stop()
+    db.expire_all()
+    assert db.get(Problem, 1).view_count == 2
+
+
+def test_pending_counts_increments_a_flush_is_writing(db):
+    db.add(Problem(id=1, title="p", description="", difficulty="Easy", view_count=0))
+    db.commit()
+    working = sessionmaker(bind=db.get_bind())
+    seen = []
+
+    def observed():
+        # Runs after the flush took the increments, before they are written
+        seen.append(buffer.pending(Problem, 1, "view_count"))
+        return working()
+
+    buffer = CounterBuffer(session_factory=observed)
+    buffer.increment(Problem, 1, "view_count")
+    assert buffer.flush() == 1
+    assert seen == [1]
+    assert buffer.pending(Problem, 1, "view_count") == 0
@@ -0,0 +1,44 @@
+from app.db.models import User, Friendship, Problem, Submission
+from app.utils.friends_leaderboard import get_friends_leaderboard, friends_leaderboard_cache
+from app.utils.leaderboard_updater import apply_xp_change
+from app.utils.user_stats import backfill_user_stats
+
+
+def add_user(db, user_id, xp):
+    db.add(User(id=user_id, username=f"user{user_id}", total_xp=xp))
+
+
+def test_one_query_board_with_cache_invalidation(db):
+    friends_leaderboard_cache.clear()
+    for user_id, xp in [(1, 50), (2, 80), (3, 10), (4, 999)]:
+        add_user(db, user_id, xp)
+    db.add_all([
+        Friendship(requester_id=1, addressee_id=2, status="accepted"),
+        Friendship(requester_id=3, addressee_id=1, status="accepted"),
+        Friendship(requester_id=1, addressee_id=4, status="pending"),
+        Problem(id=1, title="a", description="", difficulty="easy"),
+        Problem(id=2, title="b", description="", difficulty="easy")
+    ])
+    for problem_id, status in [(1, "pass"), (1, "pass"), (2, "pass"), (2, "fail")]:
+        db.add(Submission(user_id=2, problem_id=problem_id, code="", language="python", result=status, overall_status=status))
+    db.commit()
+    backfill_user_stats(db)
+    db.commit()
+
+    board = get_friends_leaderboard(db, 1)
+    assert [(row["rank"], row["id"], row["total_xp"], row["problems_solved"]) for row in board] == [
+        (1, 2, 80, 2), (2, 1, 50, 0), (3, 3, 10, 0)
+    ]
+    assert get_friends_leaderboard(db, 1) is board
+
+    # An XP change of a friend drops the boards that show them once it commits
+    user3 = db.get(User, 3)
+    user3.total_xp = 100
+    apply_xp_change(db, user3)
+    assert friends_leaderboard_cache.get(1) is board
+    db.commit()
+    assert friends_leaderboard_cache.get(1) is None
+    assert [row["id"] for row in get_friends_leaderboard(db, 1)] == [3, 2, 1]
+
+    friends_leaderboard_cache.invalidate_users([4])
+    assert friends_leaderboard_cache.get(1) is not None
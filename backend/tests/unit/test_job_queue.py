@@ -0,0 +1,70 @@
+import asyncio
+import threading
+import pytest
+from app.code_runner.job_queue import JobQueue, QueueFullError
+
+
+def test_job_runs_and_reports_progress():
+    job_queue = JobQueue(workers=1, max_pending=4)
+    events = []
+
+    def handler(job):
+        for i, value in enumerate(job.payload['values']):
+            job.report_progress(i, {'value': value})
+        return sum(job.payload['values'])
+
+    job_queue.register_handler('sum', handler)
+
+    async def main():
+        job = job_queue.submit('sum', {'values': [1, 2, 3]}, total=3,
+                               listener=lambda job, event, data: events.append(event))
+        await job.wait()
+        return job
+
+    job = asyncio.run(main())
+    assert job.status == 'completed'
+    assert job.result == 6
+    assert job.completed == 3
+    assert events == ['progress', 'progress', 'progress', 'completed']
+    assert job_queue.get_job(job.id) is job
+
+
+def test_failed_job_keeps_status_code():
+    job_queue = JobQueue(workers=1, max_pending=4)
+
+    class NotFound(Exception):
+        status_code = 404
+        detail = "missing"
+
+    def handler(job):
+        raise NotFound()
+
+    job_queue.register_handler('boom', handler)
+
+    async def main():
+        job = job_queue.submit('boom', {})
+        await job.wait()
+        return job
+
+    job = asyncio.run(main())
+    assert job.status == 'failed'
+    assert job.status_code == 404
+    assert job.error == "missing"
+
+
+def test_queue_rejects_when_full():
+    job_queue = JobQueue(workers=1, max_pending=1)
+    release = threading.Event()
+    started = threading.Event()
+
+    def handler(job):
+        started.set()
+        release.wait(5)
+
+    job_queue.register_handler('block', handler)
+    job_queue.submit('block', {})
+    started.wait(5)
+    job_queue.submit('block', {})
+    with pytest.raises(QueueFullError):
+        job_queue.submit('block', {})
+    release.set()
@@ -0,0 +1,29 @@
+from app.utils.leaderboard_cache import LeaderboardCache
+
+
+def test_bump_invalidates_only_that_board():
+    cache = LeaderboardCache()
+    body, etag = cache.put("global", cache.version("global"), 0, 50, [{"rank": 1}])
+    cache.put("weekly", cache.version("weekly"), 0, 50, [])
+    assert cache.get("global", 0, 50) == (body, etag)
+    assert cache.get("global", 50, 50) is None
+
+    cache.bump("global")
+    assert cache.get("global", 0, 50) is None
+    assert cache.get("weekly", 0, 50) is not None
+
+
+def test_page_read_before_a_bump_is_not_served():
+    cache = LeaderboardCache()
+    version = cache.version("global")
+    cache.bump("global")  # a rebuild commits while the page is being read
+    cache.put("global", version, 0, 50, [{"rank": 1}])
+    assert cache.get("global", 0, 50) is None
+
+
+def test_etag_follows_content_and_entries_expire():
+    cache = LeaderboardCache(ttl=-1)
+    _, first = cache.put("global", 0, 0, 50, [{"rank": 1, "total_xp": 10}])
+    _, second = cache.put("global", 0, 0, 50, [{"rank": 1, "total_xp": 20}])
+    assert first != second
+    assert cache.get("global", 0, 50) is None
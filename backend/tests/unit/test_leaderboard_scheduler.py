@@ -0,0 +1,42 @@
+import asyncio
+import threading
+from app.utils.leaderboard_scheduler import LeaderboardScheduler
+
+
+def test_triggers_during_a_run_are_coalesced():
+    release = threading.Event()
+    calls = []
+
+    def refresh(leaderboard_types):
+        calls.append(leaderboard_types)
+        release.wait(5)
+        return {t: {"success": True, "users_updated": 3} for t in leaderboard_types}
+
+    async def scenario():
+        scheduler = LeaderboardScheduler(interval=3600, refresh=refresh)
+        await scheduler.start()
+        while not scheduler.running:
+            await asyncio.sleep(0.01)
+        # Several requests while the startup run is still going become one run
+        waiters = [asyncio.ensure_future(scheduler.refresh(["weekly"])) for _ in range(3)]
+        scheduler.trigger(["global"])
+        await asyncio.sleep(0.05)
+        release.set()
+        results = await asyncio.gather(*waiters)
+        await scheduler.stop()
+        return scheduler, results
+
+    scheduler, results = asyncio.run(scenario())
+    assert calls == [["global", "weekly", "monthly"], ["global", "weekly"]]
+    assert all(result is results[0] for result in results)
+    assert results[0]["rows"] == {"global": 3, "weekly": 3}
+    stats = scheduler.stats()
+    assert stats["runs"] == 2 and stats["coalesced"] == 3
+    assert stats["last_run"]["leaderboard_types"] == ["global", "weekly"]
+    assert stats["last_run"]["duration"] >= 0
+
+
+def test_refresh_without_a_running_scheduler_runs_inline():
+    scheduler = LeaderboardScheduler(refresh=lambda types: {t: {"success": False} for t in types})
+    result = asyncio.run(scheduler.refresh(["monthly"]))
+    assert result["leaderboard_types"] == ["monthly"] and not result["success"]
@@ -0,0 +1,133 @@
+import random
+from app.db.models import User, LeaderboardEntry
+from app.utils.leaderboard_updater import apply_xp_change, update_global_leaderboard
+from app.utils.rank_index import rank_index
+
+
+def board(db, leaderboard_type="global"):
+    entries = db.query(LeaderboardEntry).filter(
+        LeaderboardEntry.leaderboard_type == leaderboard_type
+    ).order_by(LeaderboardEntry.rank).all()
+    return [(entry.rank, entry.user_id, entry.score) for entry in entries]
+
+
+def assert_consistent(db):
+    entries = board(db)
+    assert [rank for rank, _, _ in entries] == list(range(1, len(entries) + 1))
+    scores = [score for _, _, score in entries]
+    assert scores == sorted(scores, reverse=True)
+    users = {user.id: user for user in db.query(User).all()}
+    for rank, user_id, score in entries:
+        assert users[user_id].total_xp == score
+        assert users[user_id].global_rank == rank
+    assert {user_id for _, user_id, _ in entries} == {u.id for u in users.values() if u.total_xp > 0}
+
+
+def test_xp_changes_match_a_full_rebuild(db):
+    rng = random.Random(7)
+    users = [User(username=f"user{i}", total_xp=rng.choice([0, 10, 20, 50, 100])) for i in range(30)]
+    db.add_all(users)
+    db.commit()
+    update_global_leaderboard(db)
+
+    for _ in range(200):
+        user = rng.choice(users)
+        user.total_xp = max(0, user.total_xp + rng.choice([-50, -3, 3, 10, 50, 200]))
+        apply_xp_change(db, user)
+        db.commit()
+        for u in users:
+            db.refresh(u)
+        assert_consistent(db)
+
+    incremental = [score for _, _, score in board(db)]
+    assert [score for _, _, score in rank_index.top("global", 100)] == incremental
+    update_global_leaderboard(db)
+    assert [score for _, _, score in board(db)] == incremental
+    # After a rebuild the index and the table agree on ties too
+    assert rank_index.top("global", 100) == board(db)
+
+
+def test_ties_are_ordered_by_user_id_like_a_rebuild(db):
+    rank_index.clear()
+    rng = random.Random(3)
+    # Few distinct scores, so most moves land on a tie
+    users = [User(username=f"user{i}", total_xp=rng.choice([0, 10, 20])) for i in range(12)]
+    db.add_all(users)
+    db.commit()
+    update_global_leaderboard(db)
+
+    for _ in range(100):
+        user = rng.choice(users)
+        user.total_xp = max(0, user.total_xp + rng.choice([-10, 10]))
+        apply_xp_change(db, user)
+        db.commit()
+        incremental = board(db)
+        assert incremental == rank_index.top("global", 100)
+        for rank, user_id, _ in incremental:
+            assert rank_index.rank_of("global", user_id) == rank
+
+    incremental = board(db)
+    update_global_leaderboard(db)
+    assert board(db) == incremental
+
+
+def test_period_xp_updates_weekly_board(db):
+    rank_index.clear()
+    first, second = User(username="a", total_xp=100), User(username="b", total_xp=50)
+    db.add_all([first, second])
+    db.add_all([
+        LeaderboardEntry(user_id=1, leaderboard_type="weekly", score=100, rank=1),
+        LeaderboardEntry(user_id=2, leaderboard_type="weekly", score=50, rank=2)
+    ])
+    db.commit()
+    second.total_xp += 80
+    ranks = apply_xp_change(db, second, period_xp=80)
+    db.commit()
+    assert ranks["weekly"] == 1
+    assert board(db, "weekly") == [(1, 2, 130), (2, 1, 100)]
+    # The index wasn't loaded, so it waits for the next load instead of guessing
+    assert not rank_index.is_loaded("weekly")
+    # The global board hasn't been built yet, so it is left for the rebuild
+    assert ranks["global"] is None
+    assert board(db) == []
+
+
+def test_rebuild_without_window_functions(db, monkeypatch):
+    db.add_all([User(username=f"user{i}", total_xp=xp) for i, xp in enumerate([30, 50, 30, 0])])
+    db.commit()
+    update_global_leaderboard(db)
+    with_window = board(db)
+
+    db.query(User).filter(User.username == "user1").update({User.total_xp: 0})
+    db.commit()
+    monkeypatch.setattr("app.utils.leaderboard_updater._supports_window_functions", lambda db: False)
+    assert update_global_leaderboard(db)["users_updated"] == 2
+    assert board(db) == [(rank, user_id, 30) for rank, (_, user_id, _) in enumerate(with_window[1:], 1)]
+    # Users who left the board lose their cached rank
+    assert db.query(User).filter(User.username == "user1").one().global_rank is None
+
+
+def test_failed_move_is_rolled_back_and_raised(db, monkeypatch):
+    import pytest
+    from app.utils import leaderboard_updater
+    rank_index.clear()
+    users = [User(username=f"user{i}", total_xp=xp) for i, xp in enumerate([30, 20, 10])]
+    db.add_all(users)
+    db.commit()
+    update_global_leaderboard(db)
+    before = board(db)
+
+    original = leaderboard_updater._shift_ranks
+    def shift_then_fail(*args):
+        original(*args)
+        raise RuntimeError("boom")
+    monkeypatch.setattr(leaderboard_updater, "_shift_ranks", shift_then_fail)
+
+    users[2].total_xp = 40
+    with pytest.raises(RuntimeError):
+        apply_xp_change(db, users[2])
+    # The partial shift was undone and the caller's own change can still commit
+    db.commit()
+    assert board(db) == before
+    assert db.get(User, users[2].id).total_xp == 40
+    assert rank_index.rank_of("global", users[2].id) == 3
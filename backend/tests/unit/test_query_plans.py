@@ -0,0 +1,70 @@
+"""
+Query-plan regression tests: the hot query shapes must be answered from an
+index, not a full table scan. Runs on SQLite always, and on PostgreSQL when
+TEST_POSTGRES_URL points at a scratch database (everything is rolled back).
+"""
+
+import os
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, desc, func, select, text
+
+from app.db.base import Base
+from app.db.models import Bookmark, Friendship, ForumReply, ForumVote, SnippetComment, SnippetLike, Submission
+
+SINCE = datetime(2026, 1, 1)
+
+# (expected index, statement) for each hot query shape
+HOT_QUERIES = [
+    ("ix_submissions_user_status_problem",
+     select(func.count(func.distinct(Submission.problem_id))).where(Submission.user_id == 1, Submission.overall_status == "pass")),
+    ("ix_submissions_user_problem_time",
+     select(Submission.id).where(Submission.user_id == 1, Submission.problem_id == 2).order_by(Submission.submission_time.desc())),
+    ("ix_submissions_problem_status",
+     select(func.count()).where(Submission.problem_id == 2, Submission.overall_status == "pass")),
+    ("ix_submissions_time_user",
+     select(Submission.user_id).where(Submission.submission_time >= SINCE)),
+    ("ix_friendships_addressee_status",
+     select(Friendship.requester_id).where(Friendship.addressee_id == 1, Friendship.status == "accepted")),
+    ("ix_friendships_requester_status",
+     select(Friendship.addressee_id).where(Friendship.requester_id == 1, Friendship.status == "accepted")),
+    ("ix_bookmarks_user_created",
+     select(Bookmark.problem_id).where(Bookmark.user_id == 1).order_by(Bookmark.created_at.desc())),
+    ("ix_forum_replies_thread_created",
+     select(ForumReply.id).where(ForumReply.thread_id == 1).order_by(ForumReply.created_at)),
+    ("ix_forum_votes_reply",
+     select(ForumVote.id).where(ForumVote.reply_id == 1)),
+    ("ix_snippet_likes_snippet",
+     select(func.count()).where(SnippetLike.snippet_id == 1)),
+    ("ix_snippet_comments_snippet_created",
+     select(SnippetComment.id).where(SnippetComment.snippet_id == 1).order_by(desc(SnippetComment.created_at))),
+]
+
+
+def compiled(connection, statement):
+    return str(statement.compile(connection, compile_kwargs={"literal_binds": True}))
+
+
+@pytest.mark.parametrize("index, statement", HOT_QUERIES, ids=[index for index, _ in HOT_QUERIES])
+def test_sqlite_uses_index(db, index, statement):
+    connection = db.connection()
+    plan = " ".join(row[-1] for row in connection.execute(text("EXPLAIN QUERY PLAN " + compiled(connection, statement))))
+    assert index in plan, plan
+
+
+@pytest.mark.skipif(not os.getenv("TEST_POSTGRES_URL"), reason="TEST_POSTGRES_URL not set")
+def test_postgres_uses_indexes():
+    engine = create_engine(os.environ["TEST_POSTGRES_URL"])
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        try:
+            Base.metadata.create_all(connection)
+            # Empty tables are cheapest to scan; make the planner show which index it would use
+            connection.execute(text("SET LOCAL enable_seqscan = off"))
+            for index, statement in HOT_QUERIES:
+                plan = " ".join(row[0] for row in connection.execute(text("EXPLAIN " + compiled(connection, statement))))
+                assert index in plan, (index, plan)
+        finally:
+            transaction.rollback()
+    engine.dispose()
@@ -0,0 +1,30 @@
+import random
+from app.utils.rank_index import BoardIndex
+
+
+def test_matches_a_full_sort():
+    rng = random.Random(3)
+    board = BoardIndex()
+    scores = {}
+    for _ in range(500):
+        user_id = rng.randrange(40)
+        score = rng.choice([0, 5, 10, 20, 40, 80])
+        board.set_score(user_id, score)
+        if score > 0:
+            scores[user_id] = score
+        else:
+            scores.pop(user_id, None)
+
+    expected = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+    assert board.top(len(expected) + 5) == [(rank, uid, score) for rank, (uid, score) in enumerate(expected, 1)]
+    for rank, (user_id, _) in enumerate(expected, 1):
+        assert board.rank_of(user_id) == rank
+    assert board.rank_of(1000) is None
+
+
+def test_around_is_clipped_at_the_ends():
+    board = BoardIndex({user_id: 100 - user_id for user_id in range(1, 11)})
+    assert [uid for _, uid, _ in board.around(1, 2)] == [1, 2, 3]
+    assert [uid for _, uid, _ in board.around(5, 2)] == [3, 4, 5, 6, 7]
+    assert [rank for rank, _, _ in board.around(10, 2)] == [8, 9, 10]
+    assert board.around(99, 2) == []
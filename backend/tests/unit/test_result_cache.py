@@ -0,0 +1,47 @@
+from app.code_runner.executor import CodeExecutor
+from app.code_runner import result_cache
+from app.code_runner.result_cache import ResultCache
+
+ADD_CODE = "def solution(a, b):\n    return a + b\n"
+TEST_CASES = [{'input': '1\n2', 'output': '3'}, {'input': '2\n2', 'output': '4'}]
+
+
+def test_repeat_run_is_served_from_cache():
+    cache = ResultCache(max_entries=8, ttl_seconds=60)
+    executor = CodeExecutor(timeout=2, cache=cache)
+    first = executor.run_all_test_cases(ADD_CODE, TEST_CASES)
+    # Trailing whitespace and line endings don't change the key
+    second = executor.run_all_test_cases(ADD_CODE.replace("\n", "  \r\n"), TEST_CASES)
+    assert second == first
+    assert cache.stats()['hits'] == 1
+
+
+def test_changed_test_cases_miss_cache():
+    cache = ResultCache(max_entries=8, ttl_seconds=60)
+    executor = CodeExecutor(timeout=2, cache=cache)
+    executor.run_all_test_cases(ADD_CODE, TEST_CASES)
+    changed = TEST_CASES + [{'input': '3\n3', 'output': '6'}]
+    result = executor.run_all_test_cases(ADD_CODE, changed)
+    assert result['total_test_cases'] == 3
+    assert cache.stats()['hits'] == 0
+
+
+def test_invalidate_test_set_and_lru_eviction():
+    cache = ResultCache(max_entries=2, ttl_seconds=60)
+    keys = []
+    for i in range(3):
+        key, digest = cache.make_key(f"code{i}", 'solution', TEST_CASES)
+        cache.put(key, digest, {'n': i})
+        keys.append(key)
+    assert cache.get(keys[0]) is None
+    assert cache.get(keys[2]) == {'n': 2}
+    assert cache.invalidate_test_set(result_cache.test_set_digest(TEST_CASES)) == 2
+    assert cache.stats()['entries'] == 0
+
+
+def test_timeouts_are_not_cached():
+    cache = ResultCache(max_entries=8, ttl_seconds=60)
+    executor = CodeExecutor(timeout=1, cache=cache)
+    loop_code = "def solution(a, b):\n    while True:\n        pass\n"
+    executor.run_all_test_cases(loop_code, TEST_CASES[:1])
+    assert cache.stats()['entries'] == 0
@@ -0,0 +1,60 @@
+from datetime import date, datetime, timedelta
+from app.db.models import User, Problem, Submission
+from app.utils.solve_days import SolveDayBitmap, load_solve_days, backfill_solve_days, utc_day
+from app.utils.streak_calculator import update_user_streak, get_user_streak_info, get_streak_calendar_data
+
+
+def test_bitmap_streaks_and_rebase():
+    bitmap = SolveDayBitmap()
+    start = date(2026, 3, 10)
+    for offset in (5, 6, 7, 0, 1, 9):
+        assert bitmap.add(start + timedelta(days=offset))
+    assert not bitmap.add(start + timedelta(days=6))
+
+    assert bitmap.start_day == start.toordinal()
+    assert bitmap.longest_streak() == 3
+    assert bitmap.total_days() == 6
+    assert bitmap.last_day() == start + timedelta(days=9)
+    # Today without a solve yet still counts the run ending yesterday
+    assert bitmap.current_streak(start + timedelta(days=7)) == 3
+    assert bitmap.current_streak(start + timedelta(days=8)) == 3
+    assert bitmap.current_streak(start + timedelta(days=11)) == 0
+    assert SolveDayBitmap(bitmap.start_day, int.from_bytes(bitmap.to_bytes(), "little")).days(start, start + timedelta(days=2)) == [start, start + timedelta(days=1)]
+
+
+def test_streak_and_calendar_come_from_utc_solve_days(db):
+    db.add(User(id=1, username="a", total_xp=0, current_streak=0, longest_streak=0))
+    db.commit()
+    now = datetime.utcnow()
+    today = utc_day(now)
+
+    # Two days ago, late yesterday and early today (UTC) make one three-day run
+    for when in (now - timedelta(days=2), datetime.combine(today, datetime.min.time()) - timedelta(minutes=30), now):
+        assert update_user_streak(1, db, when=when)["streak_updated"]
+    again = update_user_streak(1, db, when=now)
+    assert not again["streak_updated"] and again["current_streak"] == 3
+
+    user = db.get(User, 1)
+    assert (user.current_streak, user.longest_streak) == (3, 3)
+    info = get_user_streak_info(1, db)
+    assert info["current_streak"] == 3 and info["streak_active"] and info["days_since_last_solve"] == 0
+
+    calendar = get_streak_calendar_data(1, db, 365)
+    assert len(calendar["calendar_data"]) == 365
+    assert calendar["total_solve_days"] == 3
+    assert calendar["calendar_data"][-1] == {"date": today.isoformat(), "solved": True, "is_today": True}
+
+
+def test_backfill_reads_passing_submissions(db):
+    db.add_all([User(id=1, username="a", total_xp=0), Problem(id=1, title="p", description="", difficulty="Easy")])
+    start = datetime(2026, 1, 1, 12)
+    for offset, status in ((0, "pass"), (1, "pass"), (1, "pass"), (2, "fail"), (4, "pass")):
+        db.add(Submission(user_id=1, problem_id=1, code="", language="python", result=status,
+                          overall_status=status, submission_time=start + timedelta(days=offset)))
+    db.commit()
+
+    assert backfill_solve_days(db) == 1
+    db.commit()
+    bitmap = load_solve_days(db, 1)
+    assert bitmap.days(start.date(), start.date() + timedelta(days=4)) == [start.date(), start.date() + timedelta(days=1), start.date() + timedelta(days=4)]
+    assert bitmap.longest_streak() == 2
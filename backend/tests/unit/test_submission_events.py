@@ -0,0 +1,179 @@
+from sqlalchemy.orm import sessionmaker
+import datetime
+from app.db.models import User, Problem, ProcessedEvent, UserAchievement, EventOutbox
+from app.utils.submission_events import EventPipeline, submission_events
+from app.utils.achievements import initialize_default_achievements
+from app.utils.counter_buffer import counter_buffer
+
+
+def make_pipeline(db, **kwargs):
+    return EventPipeline(session_factory=sessionmaker(bind=db.get_bind()), retry_delay=0, **kwargs)
+
+
+def test_handlers_run_in_order_once_per_key(db):
+    pipeline = make_pipeline(db)
+    calls = []
+    pipeline.register("e", "first", lambda session, event, results: calls.append("first") or event["n"] + 1)
+    pipeline.register("e", "second", lambda session, event, results: calls.append("second") or results["first"] * 2)
+
+    assert pipeline.process("e", "k1", {"n": 1}) == {"first": 2, "second": 4}
+    # Redelivery of the same event is a no-op
+    assert pipeline.process("e", "k1", {"n": 1}) == {}
+    assert calls == ["first", "second"]
+    assert pipeline.stats()["skipped"] == 2
+    assert db.query(ProcessedEvent).count() == 2
+
+
+def test_failed_handler_is_retried_and_rolled_back(db):
+    db.add(Problem(id=1, title="p", description="", difficulty="Easy", attempt_count=0))
+    db.commit()
+    pipeline = make_pipeline(db, max_attempts=2)
+    attempts = []
+
+    def flaky(session, event, results):
+        attempts.append(1)
+        session.query(Problem).filter(Problem.id == 1).update({Problem.attempt_count: Problem.attempt_count + 1})
+        if len(attempts) == 1:
+            raise RuntimeError("boom")
+
+    def broken(session, event, results):
+        raise RuntimeError("always")
+
+    pipeline.register("e", "flaky", flaky)
+    pipeline.register("e", "broken", broken)
+    pipeline.register("e", "after", lambda session, event, results: "ran")
+
+    assert pipeline.process("e", "k", {}) == {"flaky": None, "after": "ran"}
+    db.expire_all()
+    # The failed attempt's update was rolled back with its marker
+    assert db.get(Problem, 1).attempt_count == 1
+    assert {row.handler for row in db.query(ProcessedEvent)} == {"flaky", "after"}
+    assert pipeline.stats()["retries"] == 2
+    assert pipeline.stats()["failed"] == 1
+
+
+def test_submission_is_stored_in_one_commit_and_side_effects_follow(db, monkeypatch):
+    from app.api.routes.submissions import _record_submission
+    db.add_all([User(id=1, username="a", total_xp=0), Problem(id=1, title="p", description="", difficulty="Easy", attempt_count=0, solve_count=0)])
+    db.commit()
+    initialize_default_achievements(db)
+    emitted = []
+    monkeypatch.setattr(submission_events, "emit", lambda event, key, payload, shard=0: emitted.append((event, key, payload)))
+    monkeypatch.setattr(submission_events, "session_factory", sessionmaker(bind=db.get_bind()))
+    monkeypatch.setattr(counter_buffer, "session_factory", sessionmaker(bind=db.get_bind()))
+
+    commits = []
+    monkeypatch.setattr(db, "commit", lambda original=db.commit: commits.append(1) or original())
+    user, problem = db.get(User, 1), db.get(Problem, 1)
+    results = {"overall_status": "pass", "total_execution_time": 0.2,
+               "test_case_results": [{"passed": True, "error": None}]}
+    out = _record_submission(db, user, problem, {"sample_only": False, "code": "", "language": "python"}, results)
+    assert len(commits) == 1
+    assert out.xp_awarded > 0 and out.newly_earned_achievements == []
+
+    event, key, payload = emitted[0]
+    assert key == f"submission:{out.id}"
+    # The event was committed with the submission
+    assert db.query(EventOutbox).filter(EventOutbox.idempotency_key == key).one().processed_at is None
+    handled = submission_events.process(event, key, payload)
+    assert {a["name"] for a in handled["achievements"]} >= {"First Steps", "Speed Demon"}
+    counter_buffer.flush()
+    db.expire_all()
+    assert (db.get(Problem, 1).attempt_count, db.get(Problem, 1).solve_count) == (1, 1)
+    assert db.get(User, 1).current_streak == 1
+    assert db.query(UserAchievement).count() == len(handled["achievements"])
+
+
+
+def test_skipped_cases_are_not_reported_as_errors(db):
+    from app.api.routes.submissions import _record_submission
+    db.add_all([User(id=1, username="a", total_xp=0), Problem(id=1, title="p", description="", difficulty="Easy", attempt_count=0, solve_count=0)])
+    db.commit()
+    # A wrong answer, then a case skipped by a fail-fast run (cached before skips lost their error text)
+    results = {"overall_status": "fail", "total_execution_time": 0.1,
+               "test_case_results": [{"passed": False, "error": None},
+                                     {"passed": False, "error": "Skipped because an earlier test case failed", "skipped": True}]}
+    out = _record_submission(db, db.get(User, 1), db.get(Problem, 1), {"sample_only": True, "code": "", "language": "python"}, results)
+    assert out.error_message is None
+
+
+def test_outbox_events_survive_a_restart_and_are_pruned(db):
+    # Committed, but the process stopped before any worker ran it
+    make_pipeline(db).enqueue(db, "e", "k1", {"n": 1})
+    db.commit()
+
+    restarted = make_pipeline(db, max_attempts=1)
+    calls = []
+    restarted.register("e", "handler", lambda session, event, results: calls.append(event["n"]))
+    assert restarted.replay() == 1
+    assert restarted.drain(timeout=5)
+    assert calls == [1]
+    db.expire_all()
+    assert db.query(EventOutbox).one().processed_at is not None
+    assert restarted.replay() == 0
+
+    # An event whose handler gave up stays pending, with the markers of what did run
+    restarted.register("e", "broken", lambda session, event, results: 1 / 0)
+    restarted.enqueue(db, "e", "k2", {"n": 2})
+    db.commit()
+    assert restarted.drain(timeout=5)
+    db.expire_all()
+    assert db.query(EventOutbox).filter(EventOutbox.idempotency_key == "k2").one().processed_at is None
+
+    old = datetime.datetime.utcnow() - datetime.timedelta(days=30)
+    db.query(ProcessedEvent).update({ProcessedEvent.processed_at: old})
+    db.query(EventOutbox).filter(EventOutbox.processed_at.isnot(None)).update({EventOutbox.processed_at: old})
+    db.commit()
+    # k1's outbox row and marker go; k2 is pending, so its marker stays
+    assert restarted.prune(retention_days=7) == 2
+    assert {row.idempotency_key for row in db.query(ProcessedEvent)} == {"k2"}
+    assert restarted.replay() == 1
+
+
+def test_leaderboard_failure_is_retried(db, monkeypatch):
+    from app.api.routes import submissions
+    db.add(User(id=1, username="a", total_xp=10))
+    db.commit()
+    pipeline = make_pipeline(db, max_attempts=2)
+    failures = []
+
+    def apply_once_failing(session, user, period_xp=0):
+        if not failures:
+            failures.append(1)
+            raise RuntimeError("boom")
+        return {"global": 1}
+
+    monkeypatch.setattr(submissions, "apply_xp_change", apply_once_failing)
+    pipeline.register("e", "leaderboards", submissions._update_leaderboards)
+    assert pipeline.process("e", "k", {"xp_awarded": 10, "user_id": 1}) == {"leaderboards": {"global": 1}}
+    assert pipeline.stats()["retries"] == 1
+
+
+def test_streak_extending_resolve_checks_streak_achievements(db, monkeypatch):
+    from app.utils.streak_calculator import update_user_streak
+    db.add(User(id=1, username="a", total_xp=0, current_streak=0, longest_streak=0))
+    db.commit()
+    initialize_default_achievements(db)
+    now = datetime.datetime.utcnow()
+    for days_ago in (2, 1):
+        update_user_streak(1, db, when=now - datetime.timedelta(days=days_ago))
+    monkeypatch.setattr(submission_events, "session_factory", sessionmaker(bind=db.get_bind()))
+
+    # Passing again on an already solved problem: no first solve, but a third day in a row
+    handled = submission_events.process("submission_recorded", "submission:99", {
+        'submission_id': 99, 'user_id': 1, 'problem_id': 1, 'difficulty': 'Easy',
+        'first_solve': False, 'passed': True, 'submitted_at': now.isoformat(),
+        'xp_awarded': 0, 'execution_time': 0.1, 'job_id': None
+    })
+    assert handled["streak"]["current_streak"] == 3
+    assert [a["name"] for a in handled["achievements"]] == ["On Fire"]
+
+
+def test_replayed_resolve_still_checks_streak_achievements(db):
+    from app.api.routes.submissions import _check_achievements
+    # The streak handler already committed on an earlier attempt, so there is no streak result
+    db.add(User(id=1, username="a", total_xp=0, current_streak=3, longest_streak=3))
+    db.commit()
+    initialize_default_achievements(db)
+    earned = _check_achievements(db, {'user_id': 1, 'first_solve': False, 'passed': True}, {})
+    assert [a["name"] for a in earned] == ["On Fire"]
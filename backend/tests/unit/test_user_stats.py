@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+from app.db.models import User, Problem, Submission, UserStats, UserProblemStatus
+from app.utils.user_stats import record_submission_stats, backfill_user_stats, get_user_stats, get_solved_problem_ids
+from app.utils.xp_calculator import should_award_xp
+
+
+def submit(db, problem, status, when, runtime=0.5):
+    """Store a submission the way the routes do: stats first, then the row."""
+    first = record_submission_stats(db, 1, problem, status, runtime=runtime, when=when)
+    db.add(Submission(user_id=1, problem_id=problem.id, code="", language="python", result=status,
+                      overall_status=status, submission_time=when, execution_time=runtime))
+    db.commit()
+    return first
+
+
+def snapshot(row):
+    return (row.total_submissions, row.problems_solved, row.easy_solved, row.medium_solved, row.hard_solved,
+            row.first_try_solves, row.first_submission_at, row.first_solve_at, row.last_solve_at)
+
+
+def test_maintained_counters_match_a_backfill(db):
+    easy = Problem(id=1, title="a", description="", difficulty="Easy")
+    hard = Problem(id=2, title="b", description="", difficulty="hard")
+    db.add_all([User(id=1, username="a"), easy, hard])
+    db.commit()
+    assert get_user_stats(db, 1).problems_solved == 0
+
+    start = datetime(2026, 1, 1)
+    results = [submit(db, problem, status, start + timedelta(hours=i))
+               for i, (problem, status) in enumerate([(easy, "fail"), (easy, "pass"), (easy, "pass"), (hard, "pass")])]
+    assert results == [False, True, False, True]
+
+    maintained = snapshot(get_user_stats(db, 1))
+    assert maintained == (4, 2, 1, 0, 1, 1, start, start + timedelta(hours=1), start + timedelta(hours=3))
+
+    db.query(UserStats).update({UserStats.problems_solved: 99})
+    db.commit()
+    assert backfill_user_stats(db, [1]) == 1
+    db.commit()
+    assert snapshot(get_user_stats(db, 1)) == maintained
+
+
+def test_problem_status_tracks_first_pass_and_best_runtime(db):
+    problem = Problem(id=1, title="a", description="", difficulty="Medium")
+    db.add_all([User(id=1, username="a"), problem, Problem(id=2, title="b", description="", difficulty="Easy")])
+    db.commit()
+    assert should_award_xp(1, 1, db)
+
+    start = datetime(2026, 1, 1)
+    submit(db, problem, "fail", start, runtime=0.1)
+    assert should_award_xp(1, 1, db)
+    assert submit(db, problem, "pass", start + timedelta(hours=1), runtime=0.9)
+    assert not submit(db, problem, "pass", start + timedelta(hours=2), runtime=0.4)
+    submit(db, problem, "error", start + timedelta(hours=3), runtime=0.05)
+    assert not should_award_xp(1, 1, db)
+    assert get_solved_problem_ids(db, 1) == {1}
+    assert get_solved_problem_ids(db, 1, [2]) == set()
+
+    def snapshot():
+        row = db.get(UserProblemStatus, (1, 1))
+        return (row.attempts, row.first_attempt_at, row.first_pass_at, row.best_runtime, row.last_status, row.last_submission_at)
+
+    maintained = snapshot()
+    assert maintained == (4, start, start + timedelta(hours=1), 0.4, "error", start + timedelta(hours=3))
+
+    db.query(UserProblemStatus).delete()
+    db.commit()
+    backfill_user_stats(db, [1])
+    db.commit()
+    assert snapshot() == maintained
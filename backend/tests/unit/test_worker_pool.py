@@ -0,0 +1,224 @@
+import pytest
+from app.code_runner.executor import CodeExecutor
+from app.code_runner.worker_pool import WorkerPool
+from app.code_runner.case_bundle import canonicalize_output
+
+ADD_CODE = """
+def solution(a, b):
+    return a + b
+"""
+
+LOOP_CODE = """
+def solution(x):
+    while True:
+        pass
+"""
+
+GLOBAL_STATE_CODE = """
+counter = globals().setdefault('counter', [])
+counter.append(1)
+def solution():
+    return len(counter)
+"""
+
+@pytest.fixture
+def pool():
+    pool = WorkerPool(size=1, memory_limit_mb=128, max_runs=3)
+    yield pool
+    pool.close()
+
+def test_pool_runs_function(pool):
+    response = pool.run(ADD_CODE, 'solution', '1\n2', timeout=2)
+    assert response['returncode'] == 0
+    assert response['stdout'].strip() == '3'
+    assert not response['timed_out']
+
+def test_pool_runs_are_isolated(pool):
+    for _ in range(2):
+        response = pool.run(GLOBAL_STATE_CODE, 'solution', '', timeout=2)
+        assert response['stdout'].strip() == '1'
+
+def test_pool_times_out_and_recycles(pool):
+    response = pool.run(LOOP_CODE, 'solution', '1', timeout=1)
+    assert response['timed_out']
+    # The worker that timed out is replaced and the pool keeps serving
+    response = pool.run(ADD_CODE, 'solution', '2\n3', timeout=2)
+    assert response['stdout'].strip() == '5'
+
+def test_pool_recycles_after_max_runs(pool):
+    pool.warm()
+    first = pool._idle[0]
+    for _ in range(3):
+        pool.run(ADD_CODE, 'solution', '1\n1', timeout=2)
+    assert first not in pool._idle
+    assert pool._live == 1
+
+def test_pool_matches_cold_execution():
+    pooled = CodeExecutor(timeout=2, memory_limit_mb=128)
+    cold = CodeExecutor(timeout=2, memory_limit_mb=128, use_pool=False)
+    for code, args in ((ADD_CODE, '4\n5'), ("def solution(x):\n    raise ValueError('bad')\n", '1')):
+        a = pooled.execute_python_function(code, 'solution', args)
+        b = cold.execute_python_function(code, 'solution', args)
+        assert (a['success'], a['output'], a['error']) == (b['success'], b['output'], b['error'])
+
+SLOW_SECOND_CASE_CODE = """
+def solution(a, b):
+    if a == 5:
+        while True:
+            pass
+    return a + b
+"""
+
+def test_pool_batch_per_case_timeout(pool):
+    results = pool.run_batch(SLOW_SECOND_CASE_CODE, 'solution', ['1\n2', '5\n5', '3\n4'], timeout=1)
+    assert [r['timed_out'] for r in results] == [False, True, False]
+    assert results[0]['stdout'].strip() == '3'
+    assert results[2]['stdout'].strip() == '7'
+
+def test_pool_batch_resumes_after_child_exit(pool):
+    code = "import os\ndef solution(a):\n    if a == 2:\n        os._exit(3)\n    return a\n"
+    results = pool.run_batch(code, 'solution', ['1', '2', '3'], timeout=2)
+    assert [r['returncode'] for r in results] == [0, 3, 0]
+    assert results[2]['stdout'].strip() == '3'
+
+def test_pool_batch_timeout_survives_bare_except(pool):
+    # Swallows the timeout and returns what looks like a right answer
+    code = (
+        "import time\n"
+        "def solution(a):\n"
+        "    if a == 2:\n"
+        "        try:\n"
+        "            while True:\n"
+        "                pass\n"
+        "        except:\n"
+        "            return a\n"
+        "    return a\n"
+    )
+    results = pool.run_batch(code, 'solution', ['1', '2', '3'], timeout=1)
+    assert [r['timed_out'] for r in results] == [False, True, False]
+    assert results[2]['stdout'].strip() == '3'
+    # The next case got its own budget, not what was left of the runaway one
+    assert results[2]['time'] < 1
+
+def test_pool_batch_cases_do_not_share_module_state(pool):
+    code = "calls = []\ndef solution(a):\n    calls.append(a)\n    return len(calls)\n"
+    results = pool.run_batch(code, 'solution', ['1', '2', '3'], timeout=2)
+    assert [r['stdout'].strip() for r in results] == ['1', '1', '1']
+
+def test_run_all_test_cases_batch_matches_cold():
+    test_cases = [{'input': '1\n2', 'output': '3'}, {'input': '5\n5', 'output': '10'}, {'input': '0\n0', 'output': '1'}]
+    batched = CodeExecutor(timeout=1).run_all_test_cases(SLOW_SECOND_CASE_CODE, test_cases)
+    cold = CodeExecutor(timeout=1, use_pool=False).run_all_test_cases(SLOW_SECOND_CASE_CODE, test_cases)
+    assert [(r['passed'], r['output'], r['error']) for r in batched['test_case_results']] == \
+        [(r['passed'], r['output'], r['error']) for r in cold['test_case_results']]
+    assert batched['overall_status'] == cold['overall_status'] == 'partial'
+
+def test_run_all_test_cases_parallel_keeps_order():
+    test_cases = [{'input': f'{i}\n{i}', 'output': str(2 * i)} for i in range(12)]
+    results = CodeExecutor(timeout=2, parallel=True).run_all_test_cases(ADD_CODE, test_cases)
+    assert results['overall_status'] == 'pass'
+    assert [r['output'] for r in results['test_case_results']] == [str(2 * i) for i in range(12)]
+
+def test_run_all_test_cases_fail_fast_skips_remaining():
+    test_cases = [{'input': '1\n1', 'output': '2'}, {'input': '1\n1', 'output': '3'}] + \
+        [{'input': '2\n2', 'output': '4'} for _ in range(6)]
+    results = CodeExecutor(timeout=2).run_all_test_cases(ADD_CODE, test_cases, fail_fast=True)
+    statuses = [r.get('skipped', False) for r in results['test_case_results']]
+    assert statuses == [False, False] + [True] * 6
+    assert results['passed_test_cases'] == 1
+    assert results['skipped_test_cases'] == 6
+    assert results['overall_status'] == 'partial'
+    assert all(r['error'] is None for r in results['test_case_results'][2:])
+
+# Writes a line that isn't a signed record to every fd it can, result pipes included
+FORGING_CODE = """
+import os
+def solution(a):
+    if a == 2:
+        for fd in range(3, 64):
+            try:
+                os.write(fd, b'{"index": 0, "record": {}}\\n')
+            except OSError:
+                pass
+    return a
+"""
+
+def test_pool_batch_rejects_forged_records(pool):
+    results = pool.run_batch(FORGING_CODE, 'solution', ['1', '2', '3'], timeout=2)
+    assert [r['returncode'] for r in results] == [0, 1, 0]
+    assert 'result channel' in results[1]['stderr']
+    assert results[2]['stdout'].strip() == '3'
+
+def test_cold_run_rejects_forged_metrics():
+    result = CodeExecutor(timeout=2, use_pool=False).execute_python_function(FORGING_CODE, 'solution', '2')
+    assert not result['success']
+    assert 'result channel' in result['error']
+
+def test_pool_batch_stop_on_fail(pool):
+    expected = [canonicalize_output(text) for text in ['2', '[3]', '4', '5']]
+    results = pool.run_batch(ADD_CODE, 'solution', ['1\n1', '1\n2', '1\n1', '2\n3'], timeout=2, expected=expected)
+    # Nothing after the wrong answer ran
+    assert [r['stdout'].strip() for r in results] == ['2', '3']
+
+def test_pool_batch_stop_on_fail_after_child_exit(pool):
+    code = "import os\ndef solution(a):\n    if a == 2:\n        os._exit(3)\n    return a\n"
+    expected = [canonicalize_output(text) for text in ['1', '2', '3']]
+    results = pool.run_batch(code, 'solution', ['1', '2', '3'], timeout=2, expected=expected)
+    assert [r['returncode'] for r in results] == [0, 3]
+
+def test_async_run_does_not_block_event_loop():
+    import asyncio
+
+    code = "import time\ndef solution(a):\n    time.sleep(0.5)\n    return a\n"
+
+    async def main():
+        ticks = []
+
+        async def ticker():
+            for _ in range(5):
+                ticks.append(asyncio.get_running_loop().time())
+                await asyncio.sleep(0.05)
+
+        results, _ = await asyncio.gather(
+            CodeExecutor(timeout=2).run_all_test_cases_async(code, [{'input': '1', 'output': '1'}]),
+            ticker()
+        )
+        return results, ticks
+
+    results, ticks = asyncio.run(main())
+    assert results['overall_status'] == 'pass'
+    assert ticks[-1] - ticks[0] < 0.45
+
+def test_metrics_reported_for_pool_batch_and_cold():
+    code = "def solution(n):\n    data = bytearray(n * 1024 * 1024)\n    return len(data)\n"
+    test_cases = [{'input': '32', 'output': str(32 * 1024 * 1024)}]
+    for executor in (CodeExecutor(timeout=2), CodeExecutor(timeout=2, use_pool=False)):
+        single = executor.execute_python_function(code, 'solution', '32')
+        assert single['memory_usage'] >= 32
+        assert single['cpu_time'] is not None and single['function_time'] is not None
+        results = executor.run_all_test_cases(code, test_cases)
+        case = results['test_case_results'][0]
+        assert case['memory_usage'] >= 32
+        assert case['execution_time'] <= case['wall_time']
+        assert results['peak_memory_usage'] == case['memory_usage']
+
+def test_stream_yields_each_result_before_summary():
+    import asyncio
+    import time
+
+    code = "import time\ndef solution(a):\n    time.sleep(0.1 * a)\n    return a\n"
+    test_cases = [{'input': str(i), 'output': str(i)} for i in (0, 3, 3)]
+
+    async def main():
+        started = time.monotonic()
+        events = []
+        async for event in CodeExecutor(timeout=2).stream_all_test_cases(code, test_cases):
+            events.append((event, time.monotonic() - started))
+        return events
+
+    events = asyncio.run(main())
+    assert [e['event'] for e, _ in events] == ['result', 'result', 'result', 'summary']
+    assert [e['index'] for e, _ in events[:3]] == [0, 1, 2]
+    # The first result arrives long before the suite finishes
+    assert events[0][1] < events[-1][1] - 0.4
+    assert events[-1][0]['summary']['overall_status'] == 'pass'
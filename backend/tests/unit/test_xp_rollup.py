@@ -0,0 +1,43 @@
+from datetime import date, datetime, timedelta
+from app.db.models import User, Problem, Submission, UserDailyXP, LeaderboardEntry
+from app.utils.xp_rollup import record_daily_xp, backfill_daily_xp, rolling_window, calendar_window, period_xp_query
+from app.utils.leaderboard_updater import update_weekly_leaderboard
+
+
+def test_record_daily_xp_upserts_one_bucket_per_day(db):
+    db.add(User(id=1, username="a"))
+    db.commit()
+    today = datetime.utcnow()
+    record_daily_xp(db, 1, 10, today)
+    record_daily_xp(db, 1, 15, today)
+    record_daily_xp(db, 1, 5, today - timedelta(days=1))
+    record_daily_xp(db, 1, 0, today)
+    db.commit()
+    buckets = {row.day: row.xp for row in db.query(UserDailyXP).all()}
+    assert buckets == {today.date(): 25, today.date() - timedelta(days=1): 5}
+
+
+def test_windows():
+    wednesday = datetime(2026, 10, 14, 23, 59)
+    assert rolling_window(7, wednesday) == (date(2026, 10, 8), date(2026, 10, 14))
+    assert calendar_window("week", wednesday) == (date(2026, 10, 12), date(2026, 10, 14))
+    assert calendar_window("month", wednesday) == (date(2026, 10, 1), date(2026, 10, 14))
+
+
+def test_weekly_board_matches_submission_history(db):
+    now = datetime.utcnow()
+    db.add_all([User(id=1, username="a"), User(id=2, username="b"), Problem(id=1, title="p", description="d", difficulty="easy")])
+    for user_id, xp, days_ago in [(1, 10, 0), (1, 20, 3), (1, 100, 10), (2, 40, 1), (2, 5, 6)]:
+        db.add(Submission(user_id=user_id, problem_id=1, code="", language="python", result="pass",
+                          submission_time=now - timedelta(days=days_ago), xp_awarded=xp))
+    db.commit()
+    assert backfill_daily_xp(db) == 5
+    db.commit()
+
+    start, end = rolling_window(7)
+    assert period_xp_query(db, start, end).all() == [(2, 45), (1, 30)]
+
+    assert update_weekly_leaderboard(db)["success"]
+    entries = db.query(LeaderboardEntry).filter(LeaderboardEntry.leaderboard_type == "weekly").order_by(LeaderboardEntry.rank).all()
+    assert [(entry.user_id, entry.score) for entry in entries] == [(2, 45), (1, 30)]
+    assert db.get(User, 2).weekly_rank == 1 and db.get(User, 1).weekly_rank == 2